@@ -1,16 +1,17 @@
 import json
-import boto3
 import uuid
 import logging
 import os
 from datetime import datetime, timedelta
 
+import aws_clients
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+# DynamoDB table, from the shared client layer
+TABLE_NAME = os.environ['TABLE_NAME']
+aws_clients.prime_on_init(tables=[TABLE_NAME])
 
 # Sample availability slots (9 AM to 5 PM, every hour)
 def generate_available_slots(days_ahead=7):
@@ -28,10 +29,16 @@ def generate_available_slots(days_ahead=7):
     
     return available_slots
 
-# Mock appointments database (would be a real database in production)
-AVAILABLE_APPOINTMENTS = generate_available_slots()
+# Mock appointments database (would be a real database in production). The slots are
+# generated on first use rather than at import.
+AVAILABLE_APPOINTMENTS = {}
 BOOKED_APPOINTMENTS = {}
 
+def appointment_slots():
+    if not AVAILABLE_APPOINTMENTS:
+        AVAILABLE_APPOINTMENTS.update(generate_available_slots())
+    return AVAILABLE_APPOINTMENTS
+
 def lambda_handler(event, context):
     """
     Lambda handler for the Amazon Bedrock agent to handle vehicle test drive bookings
@@ -120,7 +127,7 @@ def get_available_appointments(event):
     # Filter appointments by date if provided
     available_dates = {}
     
-    for date, slots in AVAILABLE_APPOINTMENTS.items():
+    for date, slots in appointment_slots().items():
         if ((not start_date or date >= start_date) and 
             (not end_date or date <= end_date) and
             slots):  # Only include dates with available slots
@@ -195,7 +202,7 @@ def book_appointment(event):
         }
     
     # Check if the appointment slot is available
-    if appointment_date not in AVAILABLE_APPOINTMENTS:
+    if appointment_date not in appointment_slots():
         return {
             'messageVersion': '1.0',
             'response': {
@@ -215,7 +222,7 @@ def book_appointment(event):
             }
         }
     
-    if appointment_time not in AVAILABLE_APPOINTMENTS[appointment_date]:
+    if appointment_time not in appointment_slots()[appointment_date]:
         return {
             'messageVersion': '1.0',
             'response': {
@@ -239,7 +246,7 @@ def book_appointment(event):
     booking_id = str(uuid.uuid4())
     
     # Remove the time slot from available appointments
-    AVAILABLE_APPOINTMENTS[appointment_date].remove(appointment_time)
+    appointment_slots()[appointment_date].remove(appointment_time)
     
     # Add to booked appointments
     if appointment_date not in BOOKED_APPOINTMENTS:
@@ -268,7 +275,7 @@ def book_appointment(event):
     
     try:
         # Write to DynamoDB
-        table.put_item(Item=booking_item)
+        aws_clients.table(TABLE_NAME).put_item(Item=booking_item)
         logger.info(f"Successfully wrote booking {booking_id} to DynamoDB")
     except Exception as e:
         logger.error(f"Error writing to DynamoDB: {str(e)}")
@@ -1,9 +1,12 @@
 import json
-import boto3
 import uuid
 import os
 from datetime import datetime
 
+import aws_clients
+
+aws_clients.prime_on_init(tables=[os.environ.get('TABLE_NAME')])
+
 def lambda_handler(event, context):
     agent = event['agent']
     actionGroup = event['actionGroup']
@@ -25,9 +28,8 @@ def lambda_handler(event, context):
     # Write to DynamoDB if we have both required fields
     if email_address and enquiry_text:
         try:
-            # Initialize DynamoDB client
-            dynamodb = boto3.resource('dynamodb')
-            table = dynamodb.Table(os.environ['TABLE_NAME'])
+            # DynamoDB table, built once per container by the shared client layer
+            table = aws_clients.table(os.environ['TABLE_NAME'])
             
             # Create item to insert
             timestamp = datetime.utcnow().isoformat()
@@ -1,13 +1,21 @@
 import json
 import os
+import time
 import uuid
 import logging
-import boto3
-import urllib.request
-import urllib.parse
-import urllib.error
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import aws_clients
+from http_compression import supported_encodings
+from inventory_index import inventory_json, list_ordering
+from inventory_recommend import parse_recommendation, recommend_json, recommendation_query
+from inventory_snapshot import SNAPSHOT_BUCKET, get_snapshot
+from inventory_store import (
+    DEFAULT_PAGE_LIMIT, FILTER_NAMES, DecimalEncoder, InvalidFilter, compact_car, cursor_after, cursor_ordering,
+    parse_filters, parse_ids, parse_page, parse_view
+)
+from metrics import put_metrics
 
 # Set up logging
 logger = logging.getLogger()
@@ -17,6 +25,59 @@ logger.setLevel(logging.INFO)
 API_URL = os.environ.get('API_GATEWAY_URL')
 REGION = os.environ.get('AWS_REGION')  
 
+# "dynamodb" reads the car inventory table directly in process, skipping the API Gateway hop
+# and the inventory API's Lambda invocation. "api" calls the inventory API.
+INVENTORY_ACCESS_MODE = os.environ.get('INVENTORY_ACCESS_MODE', 'api').lower()
+TABLE_NAME = os.environ.get('TABLE_NAME')
+
+# Connection pool settings for the API access mode
+HTTP_POOL_SIZE = int(os.environ.get('INVENTORY_API_POOL_SIZE', '4'))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('INVENTORY_API_CONNECT_TIMEOUT_SECONDS', '2'))
+HTTP_READ_TIMEOUT_SECONDS = float(os.environ.get('INVENTORY_API_READ_TIMEOUT_SECONDS', '10'))
+
+# Cars per page of getCars results, unless the agent asks for another limit. The agent gets a
+# next_cursor to ask for the following page.
+PAGE_SIZE = int(os.environ.get('INVENTORY_PAGE_SIZE', str(DEFAULT_PAGE_LIMIT)))
+
+# View of the cars in getCars and getCarsByIds results unless the agent asks for another
+# (inventory_store.VIEWS). The compact view keeps each car's listing details and leaves out
+# the rest, which costs prompt tokens on every car. getCarById always returns the full car.
+LIST_VIEW = os.environ.get('INVENTORY_LIST_VIEW', 'compact')
+
+# Bedrock fails the agent's turn if an action group Lambda response is over 25KB. Larger
+# inventory results are cut down to fit (see fit_to_budget), a step at a time: the compact
+# view, then the cars that fit with a cursor or IDs to continue from, then a summary. A
+# truncated list is only sent if it holds at least MIN_TRUNCATED_CARS cars.
+RESPONSE_BUDGET_BYTES = int(os.environ.get('INVENTORY_RESPONSE_BUDGET_BYTES', str(25 * 1024)))
+MIN_TRUNCATED_CARS = 3
+
+# Content codings accepted from the inventory API. Compressed responses are decoded by urllib3
+# (decode_content), so call_api always gets plain JSON.
+ACCEPT_ENCODING = ', '.join(supported_encodings())
+
+# Per-container HTTP connection pool and SigV4 signer, built on first use
+http_pool = None
+signer = None
+
+# Warm inventory cache: the latest result for each inventory API path (list, page, batch or
+# single car), in both access modes, so repeat calls in a conversation are served from the
+# container. Results are reused for INVENTORY_CACHE_TTL_SECONDS, so prices are never more
+# out of date than that. After that, API results are revalidated with their ETag (a 304 costs
+# a round trip but not the body) and table results are read again; a TTL of 0 revalidates on
+# every call. The least recently used results are dropped beyond INVENTORY_CACHE_MAX_BYTES
+# (0 turns the cache off). With INVENTORY_CACHE_REVALIDATE, results are also dropped as soon
+# as the inventory snapshot's version (which changes with any change to the inventory) moves on.
+CACHE_TTL_SECONDS = float(os.environ.get('INVENTORY_CACHE_TTL_SECONDS', '60'))
+CACHE_MAX_BYTES = int(os.environ.get('INVENTORY_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+CACHE_REVALIDATE = os.environ.get('INVENTORY_CACHE_REVALIDATE', 'false').lower() == 'true'
+inventory_cache = {}
+cache_stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+if INVENTORY_ACCESS_MODE == 'dynamodb':
+    aws_clients.prime_on_init(services=['dynamodb', 's3'] if SNAPSHOT_BUCKET else ['dynamodb'])
+else:
+    aws_clients.prime_on_init(credentials=True)
+
 def validate_car_id(car_id):
     """Validate if provided car_id is a valid UUID"""
     try:
@@ -25,67 +86,183 @@ def validate_car_id(car_id):
     except (ValueError, TypeError):
         return None
 
+def get_http_pool():
+    """
+    Get the container's HTTP connection pool for the inventory API.
+    
+    Connections are kept alive (with TCP keep-alive) and reused across invocations, so only
+    the first call in a container pays for the TCP and TLS handshakes.
+    """
+    global http_pool
+    if http_pool is None:
+        # urllib3 ships with botocore; imported on first use to keep it out of init
+        import socket
+        import urllib3
+        from urllib3.connection import HTTPConnection
+        
+        http_pool = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=HTTP_POOL_SIZE,
+            retries=False,
+            timeout=urllib3.Timeout(connect=HTTP_CONNECT_TIMEOUT_SECONDS, read=HTTP_READ_TIMEOUT_SECONDS),
+            socket_options=HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        )
+    return http_pool
+
+def get_signer():
+    """
+    Get the container's SigV4 signer for the inventory API.
+    
+    It holds the shared session's refreshable credentials, so it picks up rotated
+    credentials without being rebuilt.
+    """
+    global signer
+    if signer is None:
+        # botocore's signer is imported on first use to keep it out of init
+        from botocore.auth import SigV4Auth
+        
+        signer = SigV4Auth(aws_clients.credentials(), 'execute-api', REGION)
+    return signer
+
+def inventory_version():
+    """The inventory snapshot's version, if results are revalidated against it and there is one"""
+    if not CACHE_REVALIDATE:
+        return None
+    snapshot = get_snapshot()
+    return snapshot['version'] if snapshot else None
+
+def forget_response(path):
+    """Drop a result from the inventory cache"""
+    entry = inventory_cache.pop(path, None)
+    if entry:
+        cache_stats['bytes'] -= entry['size']
+
+def remember_response(path, body_json, etag=None, version=None):
+    """Keep a result in the inventory cache, as the most recently used"""
+    forget_response(path)
+    size = len(path) + len(body_json.encode('utf-8'))
+    if size > CACHE_MAX_BYTES:
+        return
+    inventory_cache[path] = {
+        'body_json': body_json, 'etag': etag, 'version': version, 'stored_at': time.time(), 'size': size
+    }
+    cache_stats['bytes'] += size
+    while cache_stats['bytes'] > CACHE_MAX_BYTES:
+        forget_response(next(iter(inventory_cache)))
+        cache_stats['evictions'] += 1
+
+def cached(path, fetch):
+    """
+    Look up an inventory API path through the inventory cache.
+
+    :param path: The inventory API path, with its query string, which keys the cache.
+    :param fetch: Function fetching the result on a miss (call_api or query_table).
+    :return: The result, as from fetch.
+    """
+    version = inventory_version()
+    entry = inventory_cache.get(path)
+    fresh = entry and time.time() - entry['stored_at'] < CACHE_TTL_SECONDS and (
+        not version or not entry['version'] or entry['version'] == version)
+
+    if fresh:
+        inventory_cache[path] = inventory_cache.pop(path)
+        cache_stats['hits'] += 1
+        outcome = 'hit'
+        result = {
+            'statusCode': 200,
+            'apiPath': f"/{path.lstrip('/').split('?')[0]}",
+            'httpMethod': 'GET',
+            'body_json': entry['body_json']
+        }
+    else:
+        result = fetch()
+        outcome = 'revalidated' if result.get('not_modified') else 'miss'
+        cache_stats['revalidated' if outcome == 'revalidated' else 'misses'] += 1
+        if result.get('statusCode') == 200 and result.get('body_json'):
+            remember_response(path, result['body_json'], result.get('etag'), version)
+        else:
+            forget_response(path)
+
+    logger.info(f"Inventory cache {outcome} for {path} (hits {cache_stats['hits']}, "
+                f"revalidated {cache_stats['revalidated']}, misses {cache_stats['misses']}, "
+                f"evictions {cache_stats['evictions']}, {len(inventory_cache)} results, {cache_stats['bytes']} bytes)")
+    return result
+
 def call_api(path, method='GET'):
     """Make a request to the API Gateway endpoint with IAM authentication"""
     url = f"{API_URL.rstrip('/')}/{path.lstrip('/')}"
-    api_path = f"/{path.lstrip('/')}"
+    api_path = f"/{path.lstrip('/').split('?')[0]}"
     
     logger.info(f"Making {method} request to {url}")
     
     try:
-        # Create a session with boto3
-        session = boto3.Session()
-        credentials = session.get_credentials()
+        from botocore.awsrequest import AWSRequest
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING
+        }
+        # Revalidate the result of the last call, if any
+        cached_entry = inventory_cache.get(path) if method == 'GET' else None
+        if cached_entry and cached_entry['etag']:
+            headers['If-None-Match'] = cached_entry['etag']
         
         # Create a signed request
         request = AWSRequest(
             method=method,
             url=url,
-            headers={
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
+            headers=headers
         )
         
         # Sign the request with SigV4
-        SigV4Auth(credentials, 'execute-api', REGION).add_auth(request)
+        get_signer().add_auth(request)
         
-        # Convert the signed request headers to format expected by urllib
-        headers = dict(request.headers)
-        
-        # Make the API call using urllib
-        req = urllib.request.Request(
-            url=request.url,
-            headers=headers,
-            method=request.method
+        # Make the API call over a pooled keep-alive connection
+        response = get_http_pool().request(
+            request.method,
+            request.url,
+            headers=dict(request.headers)
         )
+        response_body = response.data.decode('utf-8')
         
-        with urllib.request.urlopen(req) as response:
-            response_body = response.read().decode('utf-8')
-            status_code = response.status
-            
+        if response.status == 304 and cached_entry:
+            logger.info(f"{api_path} not modified, using the cached response")
             return {
-                'statusCode': status_code,
+                'statusCode': 200,
                 'apiPath': api_path,
                 'httpMethod': method,
-                'body': json.loads(response_body) if response_body else {}
+                'body_json': cached_entry['body_json'],
+                'etag': cached_entry['etag'],
+                'not_modified': True
             }
+        
+        if response.status >= 400:
+            error_body = {}
+            try:
+                error_body = json.loads(response_body)
+            except Exception as read_error:
+                logger.error(f"Error parsing error response: {str(read_error)}")
             
-    except urllib.error.HTTPError as e:
-        error_body = {}
-        try:
-            error_body = json.loads(e.read().decode('utf-8'))
-        except Exception as read_error:
-            logger.error(f"Error parsing HTTPError response: {str(read_error)}")
-            
+            error = f"HTTP Error {response.status}: {response.reason}"
+            return {
+                'statusCode': response.status,
+                'apiPath': api_path,
+                'httpMethod': method,
+                'error': error,
+                'message': error_body.get('message', error),
+                'body': error_body
+            }
+        
+        # The API's JSON body is passed on to the agent as is
         return {
-            'statusCode': e.code,
+            'statusCode': response.status,
             'apiPath': api_path,
             'httpMethod': method,
-            'error': str(e),
-            'message': error_body.get('message', str(e)),
-            'body': error_body
+            'body_json': response_body or '{}',
+            'etag': response.headers.get('ETag')
         }
+        
     except Exception as e:
         logger.error(f"Error calling API: {str(e)}")
         return {
@@ -96,12 +273,87 @@ def call_api(path, method='GET'):
             'message': f"Error calling API: {str(e)}"
         }
 
-def get_all_cars():
-    """Retrieve all cars from inventory via API Gateway"""
-    return call_api('/cars')
+def query_table(car_id=None, filters=None, car_ids=None, page=None, view='full', recommendation=None):
+    """
+    Look up the inventory directly in DynamoDB, returning the same result as call_api.
+
+    :param recommendation: Optional request from parse_recommendation, to recommend cars
+        rather than list them.
+    """
+    api_path = f"/cars/{car_id}" if car_id else '/cars/recommend' if recommendation else '/cars'
+    
+    logger.info(f"Querying {TABLE_NAME} for {api_path}")
+    
+    try:
+        # getCars always asks for a page, so the full unfiltered list (which the inventory API
+        # serves from the snapshot) is never looked up here. Pages come from the columnar index,
+        # itself loaded from the snapshot.
+        if recommendation:
+            status_code, body_json = recommend_json(TABLE_NAME, recommendation)
+        else:
+            status_code, body_json = inventory_json(TABLE_NAME, car_id, filters, car_ids, page, view)
+        return {
+            'statusCode': status_code,
+            'apiPath': api_path,
+            'httpMethod': 'GET',
+            'body_json': body_json
+        }
+    except InvalidFilter as e:
+        return bad_request(str(e), api_path)
+    except Exception as e:
+        logger.error(f"Error querying inventory table: {str(e)}")
+        return {
+            'statusCode': 500,
+            'apiPath': api_path,
+            'httpMethod': 'GET',
+            'error': str(e),
+            'message': f"Error querying inventory table: {str(e)}"
+        }
+
+def bad_request(message, api_path='/cars'):
+    """The inventory API's 400 response, returned by both modes for invalid parameters"""
+    return {
+        'statusCode': 400,
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'error': "HTTP Error 400: Bad Request",
+        'message': message,
+        'body': {'message': message}
+    }
+
+def get_all_cars(parameters=None):
+    """
+    Retrieve a page of the cars matching the filter parameters (all cars if there are none)
+    via API Gateway or directly from DynamoDB. Filtering happens there, so only matching cars
+    are returned to the agent.
+    
+    Only the first PAGE_SIZE cars are fetched, unless the parameters give another limit. The
+    response's next_cursor is passed back as the cursor parameter for the next page. Cars are
+    in the LIST_VIEW, unless the parameters give another view. Pages are kept in the warm
+    inventory cache for CACHE_TTL_SECONDS.
+    """
+    parameters = dict(parameters or {})
+    parameters['limit'] = parameters.get('limit') or PAGE_SIZE
+    try:
+        filters = parse_filters(parameters)
+        page = parse_page(parameters, filters)
+        view = parse_view(parameters, LIST_VIEW)
+    except InvalidFilter as e:
+        return bad_request(str(e))
+    
+    query = {name: str(filters[name]) for name in FILTER_NAMES if name in filters}
+    query['limit'] = str(page['limit'])
+    query['view'] = view
+    if parameters.get('cursor'):
+        query['cursor'] = str(parameters['cursor']).strip()
+    path = f"/cars?{urlencode(query)}"
+    
+    if INVENTORY_ACCESS_MODE == 'dynamodb':
+        return cached(path, lambda: query_table(filters=filters, page=page, view=view))
+    return cached(path, lambda: call_api(path))
 
 def get_car_by_id(car_id):
-    """Retrieve a car by ID via API Gateway"""
+    """Retrieve a car by ID via API Gateway or directly from DynamoDB, through the inventory cache"""
     # Validate car_id format
     valid_car_id = validate_car_id(car_id)
     if not valid_car_id:
@@ -112,10 +364,142 @@ def get_car_by_id(car_id):
             'message': f"Invalid car ID format: {car_id}"
         }
     
-    return call_api(f'/cars/{valid_car_id}')
+    path = f'/cars/{valid_car_id}'
+    if INVENTORY_ACCESS_MODE == 'dynamodb':
+        return cached(path, lambda: query_table(valid_car_id))
+    return cached(path, lambda: call_api(path))
+
+def get_cars_by_ids(ids, view=None):
+    """
+    Retrieve several cars by ID in one lookup (a single BatchGetItem), via API Gateway or
+    directly from DynamoDB, rather than one call per car. Unknown IDs are left out.
+
+    :param ids: Comma separated car IDs.
+    :param view: "full" or "compact"; defaults to LIST_VIEW.
+    """
+    try:
+        car_ids = parse_ids(ids)
+        view = parse_view({'view': view}, LIST_VIEW)
+    except InvalidFilter as e:
+        return bad_request(str(e), '/cars/batch')
+    if not car_ids:
+        return bad_request("Missing required parameter: ids", '/cars/batch')
+    
+    valid_car_ids = [validate_car_id(car_id) for car_id in car_ids]
+    invalid = [car_id for car_id, valid in zip(car_ids, valid_car_ids) if not valid]
+    if invalid:
+        return bad_request(f"Invalid car ID format: {', '.join(invalid)}", '/cars/batch')
+    
+    path = f"/cars?{urlencode({'ids': ','.join(valid_car_ids), 'view': view})}"
+    if INVENTORY_ACCESS_MODE == 'dynamodb':
+        return cached(path, lambda: query_table(car_ids=valid_car_ids, view=view))
+    return cached(path, lambda: call_api(path))
+
+def recommend_cars(parameters=None):
+    """
+    Recommend the cars best matching the customer's preferences (the prefer parameter), among
+    those passing the filter parameters, via API Gateway or directly in process. The cars are
+    ranked in the inventory rather than by the agent, which only gets the best few (limit),
+    each with its match_score. Cars are in the LIST_VIEW, unless the parameters give another view.
+    """
+    try:
+        recommendation = parse_recommendation(parameters, LIST_VIEW)
+    except InvalidFilter as e:
+        return bad_request(str(e), '/cars/recommend')
+    
+    path = f"/cars/recommend?{urlencode(recommendation_query(recommendation))}"
+    if INVENTORY_ACCESS_MODE == 'dynamodb':
+        return cached(path, lambda: query_table(recommendation=recommendation))
+    return cached(path, lambda: call_api(path))
+
+def encoded_size(text):
+    """Bytes a text takes as a JSON string in the Lambda response"""
+    return len(json.dumps(text).encode('utf-8'))
+
+def summarise_cars(cars):
+    """Aggregate summary of a list of cars: how many, by make, and the price, year and mileage ranges"""
+    summary = {'cars': len(cars), 'makes': {}}
+    for car in cars:
+        make = car.get('make', 'Unknown')
+        summary['makes'][make] = summary['makes'].get(make, 0) + 1
+    for field in ('price_gbp', 'year', 'mileage'):
+        values = [car[field] for car in cars if isinstance(car.get(field), (int, Decimal))]
+        if values:
+            summary[field] = {'min': min(values), 'max': max(values)}
+    return summary
+
+def fit_to_budget(body_json, event, budget):
+    """
+    Cut a list of cars down to fit the response budget, a step at a time.
+
+    - compact: every car, in the compact view.
+    - truncated: as many compact cars as fit, with the next_cursor of the page starting after
+      them (getCars), or the remaining_ids to look up (getCarsByIds). Recommendations keep
+      the best matches, with their match_score.
+    - summary: an aggregate summary of the cars (see summarise_cars), with the next_cursor
+      of the original page.
+
+    :param budget: Bytes the body may take as a JSON string.
+    :return: Tuple of (body JSON, tier).
+    """
+    data = json.loads(body_json, parse_float=Decimal)
+    page = data if isinstance(data, dict) and isinstance(data.get('cars'), list) else None
+    cars = page['cars'] if page else data if isinstance(data, list) else None
+    if cars is None:
+        message = "The result is too large to return. Ask the customer to narrow the search."
+        return json.dumps({'message': message}), 'summary'
+    next_cursor = page.get('next_cursor') if page else None
+    ranked = event.get('apiPath') == '/cars/recommend'
+
+    compact = [compact_car(car) for car in cars]
+    if ranked:
+        compact = [dict(car, match_score=match['match_score']) for car, match in zip(compact, cars)]
+    body = json.dumps(dict(page, cars=compact) if page else compact, cls=DecimalEncoder)
+    if encoded_size(body) <= budget:
+        return body, 'compact'
+
+    parameters = parse_parameters(event)
+    ids = parse_ids(parameters.get('ids')) if not page else []
+    filters = parse_filters(parameters) if page else None
+    # The cursor after the cars kept continues in the order the page was read in: that of the
+    # page's own cursors, if it has any, or else the order lists are read in
+    ordering = cursor_ordering(next_cursor, filters) or cursor_ordering(parameters.get('cursor'), filters) or \
+        list_ordering()
+
+    def truncated(count):
+        kept = {'cars': compact[:count], 'truncated': True}
+        if ranked:
+            kept['candidates'] = page['candidates']
+        elif page:
+            kept['next_cursor'] = cursor_after(cars[count - 1], filters, ordering)
+        else:
+            listed = {car.get('id') for car in compact[:count]}
+            kept['remaining_ids'] = ','.join([car_id for car_id in ids if car_id not in listed])
+        return json.dumps(kept, cls=DecimalEncoder)
+
+    # The most cars that fit, by binary search (the body grows with each car kept)
+    low, high = 0, len(compact) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if encoded_size(truncated(middle)) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    if low >= MIN_TRUNCATED_CARS:
+        return truncated(low), 'truncated'
+
+    message = "Too many vehicles to list. Ask the customer to narrow the search, e.g. by make, price or fuel type."
+    body = {'summary': summarise_cars(cars), 'message': message}
+    if page and not ranked:
+        body['next_cursor'] = next_cursor
+    return json.dumps(body, cls=DecimalEncoder), 'summary'
 
 def format_bedrock_response(result, event):
-    """Format response in the structure expected by Bedrock Agent"""
+    """
+    Format response in the structure expected by Bedrock Agent, cutting lists of cars down to
+    fit RESPONSE_BUDGET_BYTES (see fit_to_budget). The size tier of each successful response
+    is recorded as a metric.
+    """
     # Prepare the response body
     response_body = {}
     
@@ -127,9 +511,12 @@ def format_bedrock_response(result, event):
         response_body = {'message': result['message']}
         if 'error' in result:
             response_body['error'] = result['error']
+    
+    # Inventory responses arrive already serialised
+    body_json = result.get('body_json') or json.dumps(response_body, cls=DecimalEncoder)
 
     # Format the complete response structure for Bedrock
-    return {
+    response = {
         "messageVersion": "1.0",
         "response": {
             "actionGroup": event['actionGroup'],
@@ -138,11 +525,29 @@ def format_bedrock_response(result, event):
             "httpStatusCode": result.get('statusCode', 200),
             "responseBody": {
                 "application/json": {
-                    "body": json.dumps(response_body)
+                    "body": body_json
                 }
             }
         }
     }
+    if result.get('statusCode', 200) != 200:
+        return response
+
+    # Everything but the body counts against the budget too
+    size = len(json.dumps(response).encode('utf-8'))
+    tier = 'within_budget'
+    if size > RESPONSE_BUDGET_BYTES:
+        body_budget = RESPONSE_BUDGET_BYTES - (size - encoded_size(body_json))
+        body_json, tier = fit_to_budget(body_json, event, body_budget)
+        response['response']['responseBody']['application/json']['body'] = body_json
+        logger.warning(f"Response of {size} bytes is over the {RESPONSE_BUDGET_BYTES} byte budget, sent as {tier}")
+    put_metrics(
+        {'InventoryResponses': 1, 'InventoryResponseBytes': size},
+        dimensions={'SizeTier': tier},
+        units={'InventoryResponses': 'Count', 'InventoryResponseBytes': 'Bytes'},
+        rollup=True
+    )
+    return response
 
 def parse_parameters(event):
     """Parse input parameters from Bedrock Agent request"""
@@ -208,8 +613,12 @@ def lambda_handler(event, context):
         # Execute appropriate action based on parameters
         if car_id:
             result = get_car_by_id(car_id)
+        elif event.get('apiPath') == '/cars/recommend':
+            result = recommend_cars(parameters)
+        elif event.get('apiPath') == '/cars/batch' or parameters.get('ids'):
+            result = get_cars_by_ids(parameters.get('ids'), parameters.get('view'))
         else:
-            result = get_all_cars()
+            result = get_all_cars(parameters)
         
         # Format the response for Bedrock Agent
         response = format_bedrock_response(result, event)
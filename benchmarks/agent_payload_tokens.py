@@ -0,0 +1,120 @@
+"""
+Size of the inventory results query_inventory gives the agent, in the full and compact views.
+
+For getCars (a page of cars), getCarsByIds and getCarById, the action group response body
+is built in both views (getCarById is always full) and measured in bytes and prompt tokens.
+Offline, tokens are estimated by splitting the JSON into words, runs of up to three digits
+and single punctuation marks, roughly as a BPE tokenizer does; it is the ratio between the
+views that matters. With --live, Bedrock's CountTokens API counts them for --model-id.
+
+Runs the action group in its direct DynamoDB mode against an in-memory table loaded from
+inventory_seed. The compact view must hold the same cars as the full view; the benchmark
+checks this.
+
+Usage:
+    python benchmarks/agent_payload_tokens.py --page-size 20
+    python benchmarks/agent_payload_tokens.py --live --model-id anthropic.claude-3-5-sonnet-20241022-v2:0
+"""
+import argparse
+import json
+import re
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(text):
+    """Rough prompt token count of a text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+def count_tokens(model_id):
+    """A function counting a text's input tokens with Bedrock's CountTokens API"""
+    import aws_clients
+
+    def count(text):
+        response = aws_clients.client('bedrock-runtime').count_tokens(
+            modelId=model_id,
+            input={'converse': {'messages': [{'role': 'user', 'content': [{'text': text}]}]}}
+        )
+        return response['inputTokens']
+    return count
+
+def action_group_event(api_path, parameters):
+    """A Bedrock Agent event for the query_vehicle_inventory action group"""
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'benchmark'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in parameters.items()]
+    }
+
+def response_body(query_inventory, api_path, parameters):
+    response = query_inventory.lambda_handler(action_group_event(api_path, parameters), None)
+    assert response['response']['httpStatusCode'] == 200, response
+    return response['response']['responseBody']['application/json']['body']
+
+def car_ids(body):
+    # A page of cars, a list of cars or a single car
+    cars = json.loads(body)
+    if isinstance(cars, dict):
+        cars = cars.get('cars', [cars])
+    return [car['id'] for car in cars]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the agent's inventory payloads in the full and compact views")
+    parser.add_argument('--page-size', type=int, default=20, help="Cars per getCars page")
+    parser.add_argument('--ids', type=int, default=5, help="Cars per getCarsByIds lookup")
+    parser.add_argument('--live', action='store_true', help="Count tokens with Bedrock CountTokens")
+    parser.add_argument('--model-id', default='anthropic.claude-3-5-sonnet-20241022-v2:0',
+                        help="Model whose tokenizer CountTokens uses (with --live)")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_ACCESS_MODE='dynamodb', INVENTORY_PAGE_SIZE=str(args.page_size))
+    import aws_clients
+
+    items = load_seed_items(max(args.page_size, args.ids))
+    aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items, indexes={}))
+    tokens = count_tokens(args.model_id) if args.live else estimate_tokens
+
+    import query_inventory
+
+    valid_ids = [item['id'] for item in items if query_inventory.validate_car_id(item['id'])]
+    operations = (
+        ('getCars', '/cars', {}),
+        ('getCarsByIds', '/cars/batch', {'ids': ','.join(valid_ids[:args.ids])}),
+        ('getCarById', '/cars/{car_id}', {'car_id': valid_ids[0]})
+    )
+
+    results = []
+    for operation, api_path, parameters in operations:
+        full = response_body(query_inventory, api_path, dict(parameters, view='full'))
+        compact = response_body(query_inventory, api_path, parameters)
+        if car_ids(full) != car_ids(compact):
+            raise AssertionError(f"The compact {operation} result holds different cars")
+        results.append({
+            'operation': operation,
+            'cars': len(car_ids(full)),
+            'full_bytes': len(full.encode('utf-8')),
+            'full_tokens': tokens(full),
+            'compact_bytes': len(compact.encode('utf-8')),
+            'compact_tokens': tokens(compact)
+        })
+
+    print(f"{'Operation':13} {'Cars':>5} {'full bytes':>11} {'full tokens':>12} {'compact bytes':>14} "
+          f"{'compact tokens':>15} {'saving':>7}")
+    for result in results:
+        saving = 1 - result['compact_tokens'] / result['full_tokens']
+        print(f"{result['operation']:13} {result['cars']:5} {result['full_bytes']:11} {result['full_tokens']:12} "
+              f"{result['compact_bytes']:14} {result['compact_tokens']:15} {saving:7.0%}")
+    print(f"Tokens {'counted with CountTokens for ' + args.model_id if args.live else 'estimated'}; "
+          "getCarById is always full")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+How query_inventory keeps its responses within Bedrock's 25KB action group limit.
+
+For getCars pages of each size, in the full and compact views, and a getCarsByIds lookup
+of 100 cars, reports the response size before and after format_bedrock_response's budget,
+the size tier applied, the cars kept and the time taken to format the response. Every
+response sent must be within the budget; the benchmark checks this.
+
+Runs the action group in its direct DynamoDB mode against an in-memory table replicated from
+inventory_seed.
+
+Usage:
+    python benchmarks/agent_response_budget.py --limits 20 50 100 --budget-bytes 25600
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+def action_group_event(api_path, parameters):
+    """A Bedrock Agent event for the query_vehicle_inventory action group"""
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'benchmark'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in parameters.items()]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the action group response budget tiers")
+    parser.add_argument('--limits', type=int, nargs='+', default=[20, 50, 100], help="getCars page sizes")
+    parser.add_argument('--budget-bytes', type=int, default=25 * 1024, help="Response budget")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_ACCESS_MODE='dynamodb', INVENTORY_RESPONSE_BUDGET_BYTES=str(args.budget_bytes))
+    import aws_clients
+
+    items = load_seed_items(1000)
+    aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items, indexes={}))
+
+    import query_inventory
+
+    valid_ids = [item['id'] for item in items if query_inventory.validate_car_id(item['id'])]
+    operations = [
+        (f'getCars {limit} {view}', '/cars', {'limit': str(limit), 'view': view})
+        for limit in args.limits for view in ('compact', 'full')
+    ]
+    operations.append(('getCarsByIds 100 full', '/cars/batch', {'ids': ','.join(valid_ids[:100]), 'view': 'full'}))
+
+    results = []
+    for name, api_path, parameters in operations:
+        event = action_group_event(api_path, parameters)
+        result = query_inventory.get_cars_by_ids(parameters['ids'], parameters['view']) if 'ids' in parameters \
+            else query_inventory.get_all_cars(parameters)
+
+        # The EMF metric record printed with each response names the tier
+        metric_output = io.StringIO()
+        with contextlib.redirect_stdout(metric_output):
+            start_time = time.perf_counter()
+            response = query_inventory.format_bedrock_response(result, event)
+            format_ms = (time.perf_counter() - start_time) * 1000
+        metric = json.loads(metric_output.getvalue().strip().splitlines()[-1])
+
+        size = len(json.dumps(response).encode('utf-8'))
+        if size > args.budget_bytes:
+            raise AssertionError(f"The {name} response of {size} bytes is over the budget")
+        body = json.loads(response['response']['responseBody']['application/json']['body'])
+        cars = body.get('cars', []) if isinstance(body, dict) else body
+        results.append({
+            'operation': name,
+            'original_bytes': metric['InventoryResponseBytes'],
+            'tier': metric['SizeTier'],
+            'sent_bytes': size,
+            'cars': len(cars),
+            'format_ms': format_ms
+        })
+
+    print(f"{'Operation':24} {'original bytes':>15} {'tier':>14} {'sent bytes':>11} {'cars':>5} {'format ms':>10}")
+    for result in results:
+        print(f"{result['operation']:24} {result['original_bytes']:15} {result['tier']:>14} {result['sent_bytes']:11} "
+              f"{result['cars']:5} {result['format_ms']:10.2f}")
+    print(f"Every response within the {args.budget_bytes} byte budget")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Cold start benchmark for the Lambda handler modules.
+
+Each handler module is imported in a fresh Python process, the way a new Lambda execution
+environment runs it during init, and the import and init time is measured. Every function
+is measured in both cold start modes:
+
+- prime: the function's AWS clients are built during init, as every function did before
+  the shared client layer made them lazy.
+- lazy: boto3 is only imported, and clients only built, on first use. The deferred cost
+  paid by the first request that needs a client is reported separately.
+
+Lazy mode only moves that cost from init to the first request that needs a client, so the
+time to first response (init plus first use) is reported for each mode alongside the init
+saving. The net saving is what a cold start's first response gains overall.
+
+With --baseline, the same modules are also measured at an earlier git revision (e.g. the
+initial commit), extracted to a temporary directory.
+
+No AWS calls are made, so the benchmark runs offline.
+
+Usage:
+    python benchmarks/cold_start.py --runs 7
+    python benchmarks/cold_start.py --baseline $(git rev-list --max-parents=0 HEAD)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dummy configuration matching the environment each function gets in the CDK stack
+COMMON_ENVIRONMENT = {
+    'AWS_REGION': 'eu-west-2',
+    'AWS_DEFAULT_REGION': 'eu-west-2',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_EC2_METADATA_DISABLED': 'true'
+}
+AGENT_TURN_ENVIRONMENT = {
+    'AGENT_ID': 'AGENT',
+    'AGENT_ALIAS': 'ALIAS',
+    'ANSWER_CACHE_TABLE': 'agent-answer-cache',
+    'INTENT_ROUTER_ENABLED': 'true',
+    'TODAYS_DATE_FUNCTION': 'GetTodaysDate',
+    'QUERY_INVENTORY_FUNCTION': 'QueryInventory',
+    'SESSION_CONTEXT_ENABLED': 'true',
+    'INVENTORY_TABLE_NAME': 'car-inventory',
+    'AGENT_JOBS_TABLE': 'agent-jobs',
+    'AGENT_WORKER_FUNCTION': 'AgentWorker'
+}
+
+# (function, code directory, handler module, environment)
+FUNCTIONS = [
+    ('GetCarsFunction', 'functions', 'get_vehicle_inventory',
+     {'TABLE_NAME': 'car-inventory', 'INVENTORY_SNAPSHOT_BUCKET': 'inventory-snapshot'}),
+    ('ExportInventoryFunction', 'functions', 'export_inventory',
+     {'TABLE_NAME': 'car-inventory', 'EXPORT_BUCKET': 'inventory-exports'}),
+    ('InventorySnapshotFunction', 'functions', 'build_inventory_snapshot',
+     {'TABLE_NAME': 'car-inventory', 'INVENTORY_SNAPSHOT_BUCKET': 'inventory-snapshot'}),
+    ('KnowledgeBaseIngestionFunction', 'functions', 'kb_ingestion',
+     {'KNOWLEDGE_BASE_ID': 'KB', 'DATA_SOURCE_ID': 'DS', 'ANSWER_CACHE_TABLE': 'agent-answer-cache'}),
+    ('InvokeAgentFunction', 'functions', 'agent_invoker', AGENT_TURN_ENVIRONMENT),
+    ('StreamAgentFunction', 'functions', 'agent_streamer', AGENT_TURN_ENVIRONMENT),
+    ('StreamAuthorizerFunction', 'functions', 'stream_authorizer',
+     {'COGNITO_USER_POOL_ID': 'POOL', 'COGNITO_CLIENT_ID': 'CLIENT'}),
+    ('BookTestDrive', 'agent_functions', 'book_test_drive', {'TABLE_NAME': 'test-drive-bookings'}),
+    ('QueryInventory', 'agent_functions', 'query_inventory', {'API_GATEWAY_URL': 'https://example.com/prod'}),
+    ('CaptureEnquiry', 'agent_functions', 'capture_enquiry', {'TABLE_NAME': 'customer-enquiries'}),
+    ('GetTodaysDate', 'agent_functions', 'get_todays_date', {})
+]
+
+# Runs in the child process: time the import, then the deferred client construction
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+init_ms = (time.perf_counter() - start) * 1000
+first_use_ms = 0.0
+if 'aws_clients' in sys.modules:
+    import aws_clients
+    start = time.perf_counter()
+    aws_clients.prime(**aws_clients.prime_targets)
+    first_use_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({'initMs': init_ms, 'firstUseMs': first_use_ms}))
+"""
+
+def measure(tree, code_dir, module, environment, mode, runs):
+    """Import a handler module in fresh processes, returning the median init and first use times"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith('AWS_')}
+    env.update(COMMON_ENVIRONMENT)
+    env.update(environment)
+    env['COLD_START_MODE'] = mode
+    env['PYTHONPATH'] = os.path.join(tree, 'layers', 'shared', 'python')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, module],
+            cwd=os.path.join(tree, code_dir), env=env, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        'initMs': statistics.median(s['initMs'] for s in samples),
+        'firstUseMs': statistics.median(s['firstUseMs'] for s in samples)
+    }
+
+def extract_revision(ref, directory):
+    """Extract a git revision of the repository into a directory"""
+    archive = subprocess.run(['git', 'archive', ref], cwd=REPO_DIR, capture_output=True, check=True)
+    subprocess.run(['tar', '-x', '-C', directory], input=archive.stdout, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import and init time of each Lambda handler module")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per measurement (the median is reported)")
+    parser.add_argument('--baseline', help="Git revision to also measure, e.g. the initial commit")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        if args.baseline:
+            extract_revision(args.baseline, baseline_dir)
+
+        results = []
+        for name, code_dir, module, environment in FUNCTIONS:
+            result = {
+                'function': name,
+                'module': module,
+                'prime': measure(REPO_DIR, code_dir, module, environment, 'prime', args.runs),
+                'lazy': measure(REPO_DIR, code_dir, module, environment, 'lazy', args.runs)
+            }
+            if args.baseline:
+                if os.path.exists(os.path.join(baseline_dir, code_dir, f"{module}.py")):
+                    result['baseline'] = measure(baseline_dir, code_dir, module, environment, 'lazy', args.runs)
+                else:
+                    result['baseline'] = None
+            results.append(result)
+
+    def total(measurement):
+        return measurement['initMs'] + measurement['firstUseMs']
+
+    header = (f"{'Function':32} {'prime init':>11} {'lazy init':>10} {'init saving':>12} {'first use':>10}"
+              f" {'prime total':>12} {'lazy total':>11} {'net saving':>11}")
+    if args.baseline:
+        header += f" {'baseline':>9} {'net saving':>11}"
+    print(header)
+    print("(milliseconds; init saving is the init time no longer paid in lazy mode, first use what the first"
+          " request pays for it instead, total the time to first response and net saving the difference in totals)")
+
+    for result in results:
+        prime, lazy = result['prime'], result['lazy']
+        line = (f"{result['function']:32} {prime['initMs']:11.1f} {lazy['initMs']:10.1f}"
+                f" {prime['initMs'] - lazy['initMs']:12.1f} {lazy['firstUseMs']:10.1f}"
+                f" {total(prime):12.1f} {total(lazy):11.1f} {total(prime) - total(lazy):11.1f}")
+        if args.baseline:
+            baseline = result['baseline']
+            line += f" {total(baseline):9.1f} {total(baseline) - total(lazy):11.1f}" if baseline else f" {'-':>9} {'-':>11}"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
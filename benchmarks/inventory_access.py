@@ -0,0 +1,122 @@
+"""
+Latency of the query_inventory action group's two inventory access modes.
+
+- api: a SigV4 signed HTTPS call to the inventory API, which runs get_vehicle_inventory.
+- dynamodb: the same lookup run in process against the car inventory table.
+
+Offline (the default), the inventory API is a local HTTPS stand-in and the table is an
+in-memory stand-in loaded from inventory_seed, so the benchmark measures the overhead the
+API path adds in the function itself (signing, TLS handshake, HTTP and a second round of
+serialisation). The API Gateway hop and the inventory Lambda invocation come on top of
+that in AWS. Use --live to measure both modes against a deployed stack instead.
+
+Both modes must return identical action group responses; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_access.py --iterations 200
+    API_GATEWAY_URL=... TABLE_NAME=... python benchmarks/inventory_access.py --live
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import time
+
+from local_inventory import InMemoryDynamoDBClient, LocalInventoryApi, add_code_paths, load_seed_items, setup_offline_environment
+
+# Filters for the search operation ("petrol automatics under £40k")
+SEARCH_FILTERS = {'fuel_type': 'Petrol', 'transmission': 'Automatic', 'price_max': '40000'}
+
+def action_group_event(car_id=None, filters=None):
+    """A Bedrock Agent event for the query_vehicle_inventory action group"""
+    parameters = [{'name': 'car_id', 'type': 'string', 'value': car_id}] if car_id else []
+    parameters += [{'name': name, 'type': 'string', 'value': value} for name, value in (filters or {}).items()]
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'benchmark'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': '/cars/{car_id}' if car_id else '/cars',
+        'httpMethod': 'GET',
+        'parameters': parameters
+    }
+
+def run(query_inventory, mode, event, iterations):
+    """Call the action group in the given mode, returning the latencies (ms) and the last response"""
+    query_inventory.INVENTORY_ACCESS_MODE = mode
+    latencies = []
+    response = None
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        response = query_inventory.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return latencies, response
+
+def summarise(latencies):
+    ordered = sorted(latencies)
+    return {
+        'mean': statistics.mean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the query_inventory API and direct DynamoDB access modes")
+    parser.add_argument('--iterations', type=int, default=100, help="Calls per mode and operation")
+    parser.add_argument('--cars', type=int, help="Cars in the offline table (default: the 20 seed cars)")
+    parser.add_argument('--live', action='store_true',
+                        help="Use the deployed API (API_GATEWAY_URL) and table (TABLE_NAME) with your AWS credentials")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.live:
+            add_code_paths()
+            import query_inventory
+
+            # Look up a real car ID to fetch
+            query_inventory.INVENTORY_ACCESS_MODE = 'dynamodb'
+            car_id = json.loads(query_inventory.get_all_cars()['body_json'])['cars'][0]['id']
+        else:
+            setup_offline_environment()
+            import aws_clients
+
+            items = load_seed_items(args.cars)
+            aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items))
+            api = stack.enter_context(LocalInventoryApi())
+            os.environ['API_GATEWAY_URL'] = api.url
+            car_id = items[0]['id']
+
+            import query_inventory
+
+        # Measure the access modes themselves, not the inventory cache
+        query_inventory.CACHE_MAX_BYTES = 0
+
+        results = []
+        operations = (
+            ('list', action_group_event()),
+            ('search', action_group_event(filters=SEARCH_FILTERS)),
+            ('get', action_group_event(car_id))
+        )
+        for operation, event in operations:
+            responses = {}
+            for mode in ('api', 'dynamodb'):
+                # The first call pays for client construction and imports; leave it out
+                run(query_inventory, mode, event, 1)
+                latencies, responses[mode] = run(query_inventory, mode, event, args.iterations)
+                results.append(dict(summarise(latencies), operation=operation, mode=mode))
+
+            if responses['api'] != responses['dynamodb']:
+                raise AssertionError(f"The api and dynamodb modes returned different {operation} responses")
+
+    print(f"{'Operation':10} {'Mode':10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for result in results:
+        print(f"{result['operation']:10} {result['mode']:10} {result['mean']:9.2f} {result['p50']:9.2f} {result['p95']:9.2f}")
+    print("Responses identical in both modes")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
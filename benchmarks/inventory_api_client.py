@@ -0,0 +1,115 @@
+"""
+Per-call overhead of query_inventory's HTTP client for the inventory API.
+
+- before: the original call_api, which created a boto3 Session, fetched credentials, built a
+  SigV4Auth signer and opened a new urllib connection (TCP and TLS handshakes) per call.
+- after: query_inventory.call_api, with the per-container keep-alive connection pool and
+  cached signer. Its validator cache is cleared before each call, so every call fetches the
+  full response (benchmarks/inventory_conditional_get.py measures the 304 path).
+
+Both are measured against a local HTTPS stand-in for API Gateway serving a single car, so
+the difference is the client's own per-call overhead. The number of TCP connections the
+stand-in accepted is reported too.
+
+Usage:
+    python benchmarks/inventory_api_client.py --iterations 200
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from local_inventory import InMemoryDynamoDBClient, LocalInventoryApi, load_seed_items, setup_offline_environment
+
+def legacy_call_api(api_url, region, path, method='GET'):
+    """The original query_inventory.call_api request path, kept for comparison"""
+    import boto3
+    import urllib.request
+    from botocore.auth import SigV4Auth
+    from botocore.awsrequest import AWSRequest
+
+    url = f"{api_url.rstrip('/')}/{path.lstrip('/')}"
+
+    session = boto3.Session()
+    credentials = session.get_credentials()
+
+    request = AWSRequest(
+        method=method,
+        url=url,
+        headers={
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+    )
+    SigV4Auth(credentials, 'execute-api', region).add_auth(request)
+
+    req = urllib.request.Request(url=request.url, headers=dict(request.headers), method=request.method)
+    with urllib.request.urlopen(req) as response:
+        response_body = response.read().decode('utf-8')
+        return {
+            'statusCode': response.status,
+            'apiPath': f"/{path.lstrip('/')}",
+            'httpMethod': method,
+            'body': json.loads(response_body) if response_body else {}
+        }
+
+def measure(call, api, iterations):
+    """Time a call, returning the latency summary and the connections it opened"""
+    connections = api.connections
+    latencies = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        result = call()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        assert result['statusCode'] == 200, result
+
+    ordered = sorted(latencies)
+    return {
+        'mean': statistics.mean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'connections': api.connections - connections
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-call overhead of the inventory API client")
+    parser.add_argument('--iterations', type=int, default=100, help="Calls per client")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_ACCESS_MODE='api')
+    import aws_clients
+
+    items = load_seed_items()
+    aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items))
+    path = f"/cars/{items[0]['id']}"
+
+    with LocalInventoryApi() as api:
+        os.environ['API_GATEWAY_URL'] = api.url
+        import query_inventory
+
+        # Warm up imports in both clients so only the per-call work is measured
+        legacy_call_api(api.url, os.environ['AWS_REGION'], path)
+        query_inventory.call_api(path)
+
+        def call_api_uncached():
+            query_inventory.inventory_cache.clear()
+            return query_inventory.call_api(path)
+
+        results = {
+            'before': measure(lambda: legacy_call_api(api.url, os.environ['AWS_REGION'], path), api, args.iterations),
+            'after': measure(call_api_uncached, api, args.iterations)
+        }
+
+    print(f"{'Client':8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'connections':>12}")
+    for name, result in results.items():
+        print(f"{name:8} {result['mean']:9.2f} {result['p50']:9.2f} {result['p95']:9.2f} {result['connections']:12}")
+    print(f"Per-call saving (p50): {results['before']['p50'] - results['after']['p50']:.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Looking up several cars through the query_inventory action group: one getCarById call per
+car against a single getCarsByIds call (in the full view), in both inventory access modes.
+
+- api: the calls go to the local HTTPS stand-in for the inventory API (/cars/{car_id}, and
+  /cars?ids= for the batch).
+- dynamodb: the lookups run in process, a GetItem per car against BatchGetItem.
+
+Runs against an in-memory stand-in for the DynamoDB client with a simulated round trip per
+request. --unprocessed leaves a fraction of each BatchGetItem request unprocessed, as
+DynamoDB does under load, to include the retries. The batch must return the same cars as
+the single lookups; the benchmark checks this, without the action group's response budget.
+
+Usage:
+    python benchmarks/inventory_batch_lookup.py --ids 5 20 100 --latency-ms 5 --unprocessed 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from local_inventory import InMemoryDynamoDBClient, LocalInventoryApi, load_seed_items, setup_offline_environment
+
+def action_group_event(api_path, parameters):
+    """A Bedrock Agent event for the query_vehicle_inventory action group"""
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'benchmark'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in parameters.items()]
+    }
+
+def response_body(response):
+    return json.loads(response['response']['responseBody']['application/json']['body'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single and batch car lookups through query_inventory")
+    parser.add_argument('--ids', type=int, nargs='+', default=[5, 20, 100], help="Cars to look up per call")
+    parser.add_argument('--cars', type=int, default=1000, help="Cars in the table")
+    parser.add_argument('--iterations', type=int, default=5, help="Repeats per size and mode")
+    parser.add_argument('--latency-ms', type=float, default=5, help="Simulated DynamoDB time per request")
+    parser.add_argument('--unprocessed', type=float, default=0.0,
+                        help="Fraction of each BatchGetItem request left unprocessed")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    import aws_clients
+
+    items = load_seed_items(args.cars)
+    table = InMemoryDynamoDBClient(items, page_latency_ms=args.latency_ms, indexes={},
+                                   unprocessed_fraction=args.unprocessed)
+    aws_clients.set_client('dynamodb', table)
+
+    results = []
+    with LocalInventoryApi() as api:
+        os.environ['API_GATEWAY_URL'] = api.url
+        import query_inventory
+
+        # Measure the lookups themselves, not the inventory cache, and compare the cars in full:
+        # the response budget would cut the larger batches down to fewer, compact cars
+        query_inventory.CACHE_MAX_BYTES = 0
+        query_inventory.RESPONSE_BUDGET_BYTES = float('inf')
+
+        for count in args.ids:
+            # Some of the seed cars' IDs are not valid UUIDs, which the action group rejects
+            car_ids = [item['id'] for item in items if query_inventory.validate_car_id(item['id'])][:count]
+            for mode in ('api', 'dynamodb'):
+                query_inventory.INVENTORY_ACCESS_MODE = mode
+
+                def single():
+                    return [response_body(query_inventory.lambda_handler(
+                        action_group_event('/cars/{car_id}', {'car_id': car_id}), None)) for car_id in car_ids]
+
+                def batch():
+                    return response_body(query_inventory.lambda_handler(
+                        action_group_event('/cars/batch', {'ids': ','.join(car_ids), 'view': 'full'}), None))
+
+                timings = {}
+                for name, call in (('single', single), ('batch', batch)):
+                    latencies = []
+                    for _ in range(args.iterations):
+                        start_time = time.perf_counter()
+                        cars = call()
+                        latencies.append((time.perf_counter() - start_time) * 1000)
+                    timings[name] = (statistics.median(latencies), cars)
+
+                if timings['single'][1] != timings['batch'][1]:
+                    raise AssertionError(f"The batch lookup of {count} cars differs from the single lookups ({mode})")
+                results.append({'ids': count, 'mode': mode,
+                                'single_ms': timings['single'][0], 'batch_ms': timings['batch'][0]})
+
+    print(f"{'IDs':>5} {'Mode':10} {'single ms':>10} {'batch ms':>9} {'speedup':>8}")
+    for result in results:
+        print(f"{result['ids']:5} {result['mode']:10} {result['single_ms']:10.1f} {result['batch_ms']:9.1f} "
+              f"{result['single_ms'] / result['batch_ms']:7.1f}x")
+    print("Batch lookups match the single lookups"
+          f"{f' ({args.unprocessed:.0%} of each BatchGetItem request unprocessed)' if args.unprocessed else ''}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
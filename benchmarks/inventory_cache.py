@@ -0,0 +1,136 @@
+"""
+query_inventory's warm inventory cache over the calls of a conversation.
+
+Each conversation searches for a make, gets the first car, compares the first three, then
+repeats the search and the car, as customers do when they come back to a car. The
+conversations run one after another in the same container, in both access modes, with the
+cache off (INVENTORY_CACHE_MAX_BYTES=0) and on, reporting the time per conversation and the
+inventory fetches made (cache misses and revalidations).
+
+The benchmark then checks freshness: after a price change, a cached car keeps its old price
+for no longer than the TTL. With INVENTORY_CACHE_REVALIDATE it shows the new price as soon as
+the inventory snapshot's version moves on.
+
+Runs against the local HTTPS stand-in for the inventory API and in-memory stand-ins for the
+DynamoDB and S3 clients, with a simulated round trip per DynamoDB request.
+
+Usage:
+    python benchmarks/inventory_cache.py --conversations 20 --latency-ms 5
+"""
+import argparse
+import json
+import os
+import time
+
+from local_inventory import (
+    InMemoryDynamoDBClient, InMemoryS3Client, LocalInventoryApi, load_seed_items, setup_offline_environment
+)
+
+MAKES = ('BMW', 'Audi', 'Volkswagen', 'Ford', 'Toyota')
+
+def action_group_event(api_path, parameters):
+    """A Bedrock Agent event for the query_vehicle_inventory action group"""
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'benchmark'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in parameters.items()]
+    }
+
+def call(query_inventory, api_path, parameters):
+    response = query_inventory.lambda_handler(action_group_event(api_path, parameters), None)
+    assert response['response']['httpStatusCode'] == 200, response
+    return json.loads(response['response']['responseBody']['application/json']['body'])
+
+def conversation(query_inventory, make):
+    """A conversation's inventory calls: search, detail, compare, then back to the search and car"""
+    cars = call(query_inventory, '/cars', {'make': make})['cars']
+    car_ids = [car['id'] for car in cars if query_inventory.validate_car_id(car['id'])]
+    call(query_inventory, '/cars/{car_id}', {'car_id': car_ids[0]})
+    call(query_inventory, '/cars/batch', {'ids': ','.join(car_ids[:3])})
+    call(query_inventory, '/cars', {'make': make})
+    return call(query_inventory, '/cars/{car_id}', {'car_id': car_ids[0]})
+
+def fetches(query_inventory):
+    return query_inventory.cache_stats['misses'] + query_inventory.cache_stats['revalidated']
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the query_inventory warm inventory cache")
+    parser.add_argument('--conversations', type=int, default=20, help="Conversations per mode and setting")
+    parser.add_argument('--cars', type=int, default=1000, help="Cars in the table")
+    parser.add_argument('--latency-ms', type=float, default=5, help="Simulated DynamoDB time per request")
+    parser.add_argument('--ttl-seconds', type=float, default=1, help="Cache TTL for the freshness check")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_SNAPSHOT_BUCKET='inventory-snapshot', INVENTORY_SNAPSHOT_CHECK_SECONDS='0')
+    import aws_clients
+    import inventory_snapshot
+
+    table = InMemoryDynamoDBClient(load_seed_items(args.cars), page_latency_ms=args.latency_ms, indexes={})
+    aws_clients.set_client('dynamodb', table)
+    aws_clients.set_client('s3', InMemoryS3Client())
+    inventory_snapshot.rebuild_snapshot('car-inventory')
+
+    results = []
+    with LocalInventoryApi() as api:
+        os.environ['API_GATEWAY_URL'] = api.url
+        import query_inventory
+
+        max_bytes = query_inventory.CACHE_MAX_BYTES
+        for mode in ('api', 'dynamodb'):
+            query_inventory.INVENTORY_ACCESS_MODE = mode
+            for setting, cache_bytes in (('off', 0), ('on', max_bytes)):
+                query_inventory.CACHE_MAX_BYTES = cache_bytes
+                query_inventory.inventory_cache.clear()
+                query_inventory.cache_stats.update(hits=0, revalidated=0, misses=0, evictions=0, bytes=0)
+
+                start_time = time.perf_counter()
+                for index in range(args.conversations):
+                    conversation(query_inventory, MAKES[index % len(MAKES)])
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+                calls = args.conversations * 5
+                results.append({
+                    'mode': mode, 'cache': setting,
+                    'conversation_ms': elapsed_ms / args.conversations,
+                    'fetches': fetches(query_inventory), 'calls': calls,
+                    'hit_rate': query_inventory.cache_stats['hits'] / calls
+                })
+
+        # Freshness: a price change shows once the TTL has passed, or at once with revalidation
+        query_inventory.INVENTORY_ACCESS_MODE = 'dynamodb'
+        query_inventory.CACHE_MAX_BYTES = max_bytes
+        query_inventory.CACHE_TTL_SECONDS = args.ttl_seconds
+        car_id = next(item['id']['S'] for item in table.items if query_inventory.validate_car_id(item['id']['S']))
+        freshness = {}
+        for revalidate in (False, True):
+            query_inventory.CACHE_REVALIDATE = revalidate
+            query_inventory.inventory_cache.clear()
+            price = call(query_inventory, '/cars/{car_id}', {'car_id': car_id})['price_gbp']
+
+            table.items_by_id[car_id]['price_gbp'] = {'N': str(int(price) - 1000)}
+            inventory_snapshot.rebuild_snapshot('car-inventory')
+            changed_at = time.perf_counter()
+            while call(query_inventory, '/cars/{car_id}', {'car_id': car_id})['price_gbp'] == price:
+                time.sleep(0.01)
+            freshness[revalidate] = time.perf_counter() - changed_at
+            if freshness[revalidate] > args.ttl_seconds + 0.1:
+                raise AssertionError(f"A cached price was served {freshness[revalidate]:.2f}s after it changed")
+
+    print(f"{'Mode':10} {'Cache':6} {'ms/conversation':>16} {'fetches':>8} {'calls':>6} {'hit rate':>9}")
+    for result in results:
+        print(f"{result['mode']:10} {result['cache']:6} {result['conversation_ms']:16.1f} {result['fetches']:8} "
+              f"{result['calls']:6} {result['hit_rate']:9.0%}")
+    print(f"Price change seen after {freshness[False]:.2f}s with a {args.ttl_seconds:g}s TTL, "
+          f"{freshness[True]:.2f}s with snapshot version revalidation")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'freshness_seconds': {'ttl': freshness[False], 'revalidated': freshness[True]}},
+                      f, indent=2)
+
+if __name__ == '__main__':
+    main()
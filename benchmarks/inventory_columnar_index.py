@@ -0,0 +1,174 @@
+"""
+Filtered lists of cars from the columnar inventory index against the dict-based paths.
+
+For each table size, the index is loaded from the inventory snapshot and compared with:
+
+- dicts: the cars held in memory as Python dicts (the snapshot parsed, numbers as Decimals)
+  and checked one at a time with matches().
+- table: inventory_store.get_inventory_json reading the table (each item checked with
+  filter_view and matches(), then written out with item_json), as get_vehicle_inventory
+  does without the index.
+
+For each filter set, reports the time to find the matching cars (index filter_rows against the
+dicts), and to answer a 20-car page and the full filtered list (index_inventory_json against
+get_inventory_json). It also reports the memory taken by the index's arrays and by the dicts
+(tracemalloc), and the time and peak memory to load the index, from the snapshot and from a
+scan of the table (without a snapshot), which size the functions holding it. Every path must
+find the same cars; the benchmark checks this.
+
+Runs against in-memory stand-ins for the DynamoDB and S3 clients, without simulated latency,
+so the table times are the Python work alone.
+
+Usage:
+    python benchmarks/inventory_columnar_index.py --cars 10000 100000 --iterations 5
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from local_inventory import InMemoryDynamoDBClient, InMemoryS3Client, load_seed_items, setup_offline_environment
+
+FILTER_SETS = {
+    'make=BMW': {'make': 'BMW'},
+    'hybrid automatic': {'fuel_type': 'hybrid', 'transmission': 'automatic'},
+    'price and mileage': {'price_max': '30000', 'mileage_max': '30000'},
+    'Manchester 2021+ available': {'location': 'Manchester', 'year_min': '2021', 'status': 'available'}
+}
+
+def median_ms(function, iterations):
+    """Median wall time (ms) of a function, and its last result"""
+    timings = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return statistics.median(timings), result
+
+def traced_mb(function):
+    """Memory (MB) still held by the result of a function, and the result"""
+    tracemalloc.start()
+    result = function()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / (1024 * 1024), result
+
+def peak_mb(function):
+    """Peak memory (MB) allocated while a function runs"""
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def load_index(inventory_index):
+    """Load the index again, timed (ms), with its peak memory (MB) measured on a second load"""
+    inventory_index.index_cache['index'] = None
+    start_time = time.perf_counter()
+    inventory_index.get_index('car-inventory')
+    load_ms = (time.perf_counter() - start_time) * 1000
+    inventory_index.index_cache['index'] = None
+    return load_ms, peak_mb(lambda: inventory_index.get_index('car-inventory'))
+
+def index_mb(index):
+    """Memory (MB) of the index's arrays: offsets, numbers, codes and bitmaps"""
+    arrays = [index['starts'], index['ends'], *index['numbers'].values(), *index['bitmaps'].values()]
+    arrays += [codes for codes, _ in index['categories'].values()]
+    return sum(array.nbytes for array in arrays) / (1024 * 1024)
+
+def car_ids(body):
+    cars = json.loads(body)
+    return sorted(car['id'] for car in (cars['cars'] if isinstance(cars, dict) else cars))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the columnar inventory index with the dict-based paths")
+    parser.add_argument('--cars', type=int, nargs='+', default=[10000, 100000], help="Table sizes to measure")
+    parser.add_argument('--iterations', type=int, default=5, help="Repeats per query")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_SNAPSHOT_BUCKET='inventory-snapshot', INVENTORY_SNAPSHOT_CHECK_SECONDS='60')
+    import aws_clients
+    import inventory_index
+    import inventory_snapshot
+    from inventory_store import get_inventory_json, matches, parse_filters, parse_page
+
+    results, memory = [], []
+    for count in args.cars:
+        aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(load_seed_items(count), indexes={}))
+        aws_clients.set_client('s3', InMemoryS3Client())
+        inventory_snapshot.rebuild_snapshot('car-inventory')
+        inventory_snapshot.snapshot_cache.update(snapshot=None, checked_at=0.0)
+        document = inventory_snapshot.get_snapshot()['body']
+
+        # Loaded from a scan of the table first, then from the snapshot (as the functions do)
+        snapshot_bucket = inventory_snapshot.SNAPSHOT_BUCKET
+        inventory_snapshot.SNAPSHOT_BUCKET = None
+        scan_load_ms, scan_peak_mb = load_index(inventory_index)
+        inventory_snapshot.SNAPSHOT_BUCKET = snapshot_bucket
+        load_ms, load_peak_mb = load_index(inventory_index)
+        index = inventory_index.get_index('car-inventory')
+        dicts_mb, cars = traced_mb(lambda: json.loads(document, parse_float=Decimal))
+        memory.append({
+            'cars': count, 'load_ms': load_ms, 'load_peak_mb': load_peak_mb,
+            'scan_load_ms': scan_load_ms, 'scan_peak_mb': scan_peak_mb, 'index_mb': index_mb(index),
+            'document_mb': len(document.encode('utf-8')) / (1024 * 1024), 'dicts_mb': dicts_mb
+        })
+
+        for name, params in FILTER_SETS.items():
+            filters = parse_filters(params)
+            page = parse_page({'limit': '20'}, filters)
+
+            index_filter_ms, rows = median_ms(lambda: inventory_index.filter_rows(index, filters), args.iterations)
+            dicts_filter_ms, matching = median_ms(
+                lambda: [car for car in cars if matches(car, filters)], args.iterations)
+            index_page_ms, index_page = median_ms(
+                lambda: inventory_index.index_inventory_json(index, filters, page)[1], args.iterations)
+            table_page_ms, table_page = median_ms(
+                lambda: get_inventory_json('car-inventory', filters=filters, page=page)[1], args.iterations)
+            index_list_ms, index_list = median_ms(
+                lambda: inventory_index.index_inventory_json(index, filters)[1], args.iterations)
+            table_list_ms, table_list = median_ms(
+                lambda: get_inventory_json('car-inventory', filters=filters)[1], args.iterations)
+
+            expected = sorted(car['id'] for car in matching)
+            found = sorted(json.loads(car_text)['id'] for car_text in
+                           [inventory_index.car_text(index, row) for row in rows.tolist()])
+            if found != expected or car_ids(index_list) != expected or car_ids(table_list) != expected:
+                raise AssertionError(f"The index finds different cars for {name} at {count} cars")
+            if len(json.loads(index_page)['cars']) != len(json.loads(table_page)['cars']):
+                raise AssertionError(f"The index's first page for {name} differs in size at {count} cars")
+
+            results.append({
+                'cars': count, 'filters': name, 'matching': len(expected),
+                'index_filter_ms': index_filter_ms, 'dicts_filter_ms': dicts_filter_ms,
+                'index_page_ms': index_page_ms, 'table_page_ms': table_page_ms,
+                'index_list_ms': index_list_ms, 'table_list_ms': table_list_ms
+            })
+        del cars
+
+    print(f"{'Cars':>7} {'Filters':28} {'matching':>8} {'filter ms':>10} {'dicts ms':>9} {'page ms':>8} "
+          f"{'table ms':>9} {'list ms':>8} {'table ms':>9}")
+    for result in results:
+        print(f"{result['cars']:7} {result['filters']:28} {result['matching']:8} {result['index_filter_ms']:10.3f} "
+              f"{result['dicts_filter_ms']:9.1f} {result['index_page_ms']:8.2f} {result['table_page_ms']:9.2f} "
+              f"{result['index_list_ms']:8.1f} {result['table_list_ms']:9.1f}")
+    print("(filter, page and list ms from the index; dicts and table ms from the dict-based paths)")
+    print()
+    print(f"{'Cars':>7} {'load ms':>9} {'peak MB':>8} {'scan load ms':>13} {'peak MB':>8} {'index MB':>9} "
+          f"{'document MB':>12} {'dicts MB':>9}")
+    for result in memory:
+        print(f"{result['cars']:7} {result['load_ms']:9.0f} {result['load_peak_mb']:8.0f} {result['scan_load_ms']:13.0f} "
+              f"{result['scan_peak_mb']:8.0f} {result['index_mb']:9.2f} {result['document_mb']:12.1f} "
+              f"{result['dicts_mb']:9.1f}")
+    print("(load from the snapshot, scan load from the table without one; peak MB allocated while loading)")
+    print("The index and the dict-based paths find the same cars for every filter set")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'queries': results, 'memory': memory}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Conditional GETs of the full inventory list through query_inventory's inventory cache, with
+a TTL of 0 so every call goes to the API.
+
+- full: every call downloads the whole list (the inventory cache is cleared first).
+- revalidated: call_api sends the ETag of the cached response in If-None-Match, and the
+  inventory API answers 304 Not Modified with no body while the inventory is unchanged.
+
+Measured against the local HTTPS stand-in for the inventory API, serving an in-memory table
+replicated from inventory_seed to each size. Without --snapshot the API reads and hashes the
+table for every request, so a 304 only saves the transfer. With --snapshot it serves the
+inventory snapshot (held in an in-memory S3 stand-in), whose version is the ETag. Both must
+give the agent the same body; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_conditional_get.py --cars 100 1000 10000 --iterations 20 --snapshot
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from local_inventory import InMemoryDynamoDBClient, InMemoryS3Client, LocalInventoryApi, load_seed_items, setup_offline_environment
+
+def measure(call, api, iterations):
+    """Time a call, returning (median latency ms, body bytes sent per call, last result)"""
+    body_bytes = api.body_bytes
+    latencies = []
+    result = None
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        result = call()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        assert result['statusCode'] == 200, result
+    return statistics.median(latencies), (api.body_bytes - body_bytes) / iterations, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and conditional GETs of the inventory list")
+    parser.add_argument('--cars', type=int, nargs='+', default=[100, 1000, 10000], help="Table sizes to measure")
+    parser.add_argument('--iterations', type=int, default=20, help="Calls per size and client")
+    parser.add_argument('--snapshot', action='store_true', help="Serve the list from the inventory snapshot")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    environment = {'INVENTORY_SNAPSHOT_BUCKET': 'inventory-snapshot'} if args.snapshot else {}
+    # A TTL of 0 revalidates the cached list on every call
+    setup_offline_environment(INVENTORY_ACCESS_MODE='api', INVENTORY_CACHE_TTL_SECONDS='0', **environment)
+    import aws_clients
+    import inventory_snapshot
+
+    results = []
+    with LocalInventoryApi() as api:
+        os.environ['API_GATEWAY_URL'] = api.url
+        import query_inventory
+
+        for count in args.cars:
+            aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(load_seed_items(count), indexes={}))
+            if args.snapshot:
+                aws_clients.set_client('s3', InMemoryS3Client())
+                inventory_snapshot.rebuild_snapshot('car-inventory')
+                inventory_snapshot.snapshot_cache.update(snapshot=None, checked_at=0.0)
+
+            def full():
+                query_inventory.inventory_cache.clear()
+                return revalidated()
+
+            def revalidated():
+                return query_inventory.cached('/cars', lambda: query_inventory.call_api('/cars'))
+
+            full_ms, full_bytes, full_result = measure(full, api, args.iterations)
+            revalidated()
+            revalidated_ms, revalidated_bytes, revalidated_result = measure(revalidated, api, args.iterations)
+            if revalidated_result['body_json'] != full_result['body_json']:
+                raise AssertionError(f"The revalidated response for {count} cars differs")
+
+            results.append({'cars': count, 'full_ms': full_ms, 'full_kb': full_bytes / 1024,
+                            'revalidated_ms': revalidated_ms, 'revalidated_kb': revalidated_bytes / 1024})
+
+    print(f"{'Cars':>7} {'full ms':>9} {'full KB':>10} {'304 ms':>9} {'304 KB':>8}")
+    for result in results:
+        print(f"{result['cars']:7} {result['full_ms']:9.2f} {result['full_kb']:10.1f} "
+              f"{result['revalidated_ms']:9.2f} {result['revalidated_kb']:8.1f}")
+    print(f"Same body given to the agent from the 304 path (served from the {'snapshot' if args.snapshot else 'table'})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Full inventory export: the sequential scan building one JSON list against the parallel scan
+streamed as NDJSON.
+
+- sequential: GET /cars, i.e. get_inventory_json's LastEvaluatedKey loop building one JSON
+  list of every car.
+- parallel: GET /cars?format=ndjson, i.e. export_inventory's parallel scan with cars written
+  out as their pages arrive.
+- parallel to file: the nightly export_inventory function's path, streaming to a file.
+
+Runs against an in-memory stand-in for the low-level DynamoDB client, replicated from
+inventory_seed to each size, with a simulated round trip per scan page (--page-latency-ms).
+Wall time and peak Python memory (tracemalloc, measured in a separate run) are reported.
+All three must export the same cars; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_export.py --cars 10000 100000 --segments 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+def sequential(get_vehicle_inventory):
+    return get_vehicle_inventory.lambda_handler({'queryStringParameters': None}, None)['body']
+
+def parallel(get_vehicle_inventory):
+    return get_vehicle_inventory.lambda_handler({'queryStringParameters': {'format': 'ndjson'}}, None)['body']
+
+def parallel_to_file(inventory_store, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        inventory_store.export_inventory('car-inventory', f)
+    return path
+
+def read_body(body, path):
+    """The exported text, reading it back from the file for the file export"""
+    if body == path:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    return body
+
+def car_ids(body):
+    """The sorted car IDs in a JSON list or NDJSON body"""
+    if body.startswith('['):
+        cars = json.loads(body)
+    else:
+        cars = [json.loads(line) for line in body.splitlines()]
+    return sorted(car['id'] for car in cars)
+
+def measure(export):
+    """Run an export, returning (wall time ms, peak traced memory MB, body)"""
+    start_time = time.perf_counter()
+    body = export()
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+    tracemalloc.start()
+    export()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed_ms, peak / (1024 * 1024), body
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and parallel full inventory exports")
+    parser.add_argument('--cars', type=int, nargs='+', default=[10000, 100000], help="Table sizes to measure")
+    parser.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+    parser.add_argument('--page-size', type=int, default=1000, help="Items per scan page")
+    parser.add_argument('--page-latency-ms', type=float, default=50, help="Simulated DynamoDB time per scan page")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_EXPORT_SEGMENTS=str(args.segments))
+    import aws_clients
+    import get_vehicle_inventory
+    import inventory_store
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'inventory.ndjson')
+        for count in args.cars:
+            items = load_seed_items(count)
+            aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(
+                items, page_size=args.page_size, page_latency_ms=args.page_latency_ms, indexes={}))
+            del items
+
+            exports = {
+                'sequential': lambda: sequential(get_vehicle_inventory),
+                'parallel': lambda: parallel(get_vehicle_inventory),
+                'parallel to file': lambda: parallel_to_file(inventory_store, path)
+            }
+            ids = None
+            for name, export in exports.items():
+                elapsed_ms, peak_mb, body = measure(export)
+                body = read_body(body, path)
+                if ids is None:
+                    ids = car_ids(body)
+                elif car_ids(body) != ids:
+                    raise AssertionError(f"{name} exported different cars")
+                results.append({'cars': count, 'export': name, 'ms': elapsed_ms, 'peak_mb': peak_mb,
+                                'body_mb': len(body.encode('utf-8')) / (1024 * 1024)})
+
+    print(f"{'Cars':>7} {'Export':18} {'wall ms':>10} {'peak MB':>9} {'body MB':>9}")
+    for result in results:
+        print(f"{result['cars']:7} {result['export']:18} {result['ms']:10.1f} {result['peak_mb']:9.1f} {result['body_mb']:9.1f}")
+    print(f"Same cars exported by every path ({args.segments} segments, {args.page_latency_ms:g} ms per page)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Items read and latency of filtered inventory lists with and without the inventory indexes.
+
+- scan: no indexes deployed, so every filtered list scans the whole table.
+- query: the indexes in inventory_store.INVENTORY_INDEXES are deployed, so get_inventory_json
+  queries one whenever the filters allow it.
+
+Runs get_inventory_json against an in-memory stand-in for the car inventory table,
+replicated from inventory_seed to the requested size. Items read (DynamoDB's ScannedCount)
+is what read capacity is charged on, and in DynamoDB latency follows it. Offline, latency
+mostly reflects checking and serialising the matched cars. Both strategies must return the
+same cars; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_indexes.py --cars 10000 50000 --iterations 20
+"""
+import argparse
+import json
+import statistics
+import time
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+# Filter query parameters, as sent to GET /cars
+FILTERS = {
+    'available under £20k': {'status': 'available', 'price_max': '20000'},
+    'make and model': {'make': 'Volkswagen', 'model': 'Golf'},
+    'location and status': {'location': 'Manchester', 'status': 'reserved'},
+    'fuel type only': {'fuel_type': 'Electric'}
+}
+
+class CountingClient(InMemoryDynamoDBClient):
+    """InMemoryDynamoDBClient that counts the items read by scans and queries"""
+
+    items_read = 0
+
+    def page(self, items, key_names, **kwargs):
+        response = super().page(items, key_names, **kwargs)
+        self.items_read += response['ScannedCount']
+        return response
+
+def run(inventory_store, client, filters, iterations):
+    """List the filtered cars, returning the latencies (ms), items read per call and the cars"""
+    latencies = []
+    client.items_read = 0
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        status_code, body = inventory_store.get_inventory_json('car-inventory', filters=filters)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        assert status_code == 200, body
+    cars = json.loads(body)
+    return latencies, client.items_read // iterations, sorted(car['id'] for car in cars)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare filtered inventory lists with and without the indexes")
+    parser.add_argument('--cars', type=int, nargs='+', default=[10000], help="Table sizes to measure")
+    parser.add_argument('--iterations', type=int, default=10, help="Calls per table size, filter and strategy")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    import aws_clients
+    import inventory_store
+
+    results = []
+    for count in args.cars:
+        client = CountingClient(load_seed_items(count))
+        aws_clients.set_client('dynamodb', client)
+
+        for name, params in FILTERS.items():
+            filters = inventory_store.parse_filters(params)
+            cars = {}
+            for strategy, indexes in (('scan', []), ('query', list(inventory_store.INVENTORY_INDEXES))):
+                inventory_store.DEPLOYED_INDEXES = indexes
+                latencies, items_read, cars[strategy] = run(inventory_store, client, filters, args.iterations)
+                index = inventory_store.choose_index(filters) if indexes else None
+                results.append({
+                    'cars': count,
+                    'filter': name,
+                    'strategy': strategy,
+                    'index': index[0] if index else None,
+                    'matched': len(cars[strategy]),
+                    'items_read': items_read,
+                    'p50': sorted(latencies)[len(latencies) // 2],
+                    'mean': statistics.mean(latencies)
+                })
+
+            if cars['scan'] != cars['query']:
+                raise AssertionError(f"scan and query returned different cars for {name}")
+
+    print(f"{'Cars':>7} {'Filter':22} {'Strategy':8} {'Index':22} {'matched':>8} {'items read':>11} {'p50 ms':>9}")
+    for result in results:
+        print(f"{result['cars']:7} {result['filter']:22} {result['strategy']:8} {result['index'] or '-':22} "
+              f"{result['matched']:8} {result['items_read']:11} {result['p50']:9.2f}")
+    print("Same cars returned by both strategies")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
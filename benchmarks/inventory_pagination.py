@@ -0,0 +1,92 @@
+"""
+GET /cars as one full list against a page at a time (?limit= and ?cursor=).
+
+For each table size, get_vehicle_inventory.lambda_handler is called for the full list and
+for the first page, reporting wall time, peak Python memory (tracemalloc) and the response
+body size. Walking every page must give the same cars as the full list, each once; the
+benchmark checks this and reports the time the walk takes.
+
+Runs against an in-memory stand-in for the low-level DynamoDB client with a simulated round
+trip per read.
+
+Usage:
+    python benchmarks/inventory_pagination.py --cars 10000 100000 --limit 20
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+def measure(function):
+    """Wall time (ms), peak traced memory (MB) and result of a function"""
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = function()
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / (1024 * 1024), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the full GET /cars list with cursor pagination")
+    parser.add_argument('--cars', type=int, nargs='+', default=[10000, 100000], help="Table sizes to measure")
+    parser.add_argument('--limit', type=int, default=20, help="Cars per page")
+    parser.add_argument('--page-latency-ms', type=float, default=5, help="Simulated DynamoDB time per read")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    import aws_clients
+    import get_vehicle_inventory
+
+    def get(query=None):
+        response = get_vehicle_inventory.lambda_handler({'queryStringParameters': query}, None)
+        assert response['statusCode'] == 200, response
+        return response['body']
+
+    results = []
+    for count in args.cars:
+        aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(
+            load_seed_items(count), page_latency_ms=args.page_latency_ms, indexes={}))
+
+        full_ms, full_mb, full_body = measure(get)
+        page_ms, page_mb, page_body = measure(lambda: get({'limit': str(args.limit)}))
+
+        def walk():
+            car_ids, cursor = [], None
+            while True:
+                page = json.loads(get(dict({'limit': str(args.limit)}, **({'cursor': cursor} if cursor else {}))))
+                car_ids += [car['id'] for car in page['cars']]
+                cursor = page['next_cursor']
+                if not cursor:
+                    return car_ids
+
+        start_time = time.perf_counter()
+        walked = walk()
+        walk_ms = (time.perf_counter() - start_time) * 1000
+        full_ids = [car['id'] for car in json.loads(full_body)]
+        if len(walked) != len(set(walked)) or sorted(walked) != sorted(full_ids):
+            raise AssertionError(f"The pages of {count} cars differ from the full list")
+
+        results.append({
+            'cars': count,
+            'full_ms': full_ms, 'full_peak_mb': full_mb, 'full_kb': len(full_body.encode('utf-8')) / 1024,
+            'page_ms': page_ms, 'page_peak_mb': page_mb, 'page_kb': len(page_body.encode('utf-8')) / 1024,
+            'walk_ms': walk_ms
+        })
+
+    print(f"{'Cars':>7} {'full ms':>9} {'full MB':>8} {'full KB':>9} {'page ms':>8} {'page MB':>8} "
+          f"{'page KB':>8} {'walk ms':>9}")
+    for result in results:
+        print(f"{result['cars']:7} {result['full_ms']:9.1f} {result['full_peak_mb']:8.1f} {result['full_kb']:9.0f} "
+              f"{result['page_ms']:8.1f} {result['page_peak_mb']:8.2f} {result['page_kb']:8.1f} {result['walk_ms']:9.0f}")
+    print(f"Walking every page of {args.limit} cars matches the full list")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Recommendations (/cars/recommend) ranked with NumPy against the same ranking in pure Python.
+
+The seed cars are replicated to the table size with their prices, mileages, years, power,
+fuel economy, emissions and owners varied, so the cars differ. For each customer request
+below, inventory_recommend.recommend_json (filters as a mask, weighted normalised distances and
+a partial sort over the NumPy matrix) is timed against a Python loop scoring one car at a time
+with matches() and heapq. Both must recommend the same cars; the benchmark checks this.
+
+It also reports the time to load the columnar inventory index the ranking runs over from the
+inventory snapshot (once per container and snapshot version), and the response size against the full list of cars the agent would
+otherwise have to choose from.
+
+Runs against in-memory stand-ins for the DynamoDB and S3 clients.
+
+Usage:
+    python benchmarks/inventory_recommend.py --cars 10000 100000 --iterations 5
+"""
+import argparse
+import heapq
+import json
+import math
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from local_inventory import InMemoryDynamoDBClient, InMemoryS3Client, load_seed_items, setup_offline_environment
+
+# Customer requests as /cars/recommend query parameters
+REQUESTS = {
+    'under £35k, good mpg, low mileage': {'price_max': '35000', 'prefer': 'fuel_economy_mpg:high:2,mileage:low'},
+    'newest automatic hybrid': {'fuel_type': 'hybrid', 'transmission': 'automatic', 'prefer': 'year:high,price_gbp:low'},
+    'powerful, about 2021, few owners': {'prefer': 'power_bhp:high,year:2021,previous_owners:low:0.5'},
+    'best value (default preferences)': {}
+}
+
+def varied_items(count, seed=0):
+    """The seed cars replicated to count, with their numeric attributes varied"""
+    generator = random.Random(seed)
+    items = load_seed_items(count)
+    for item in items:
+        item['price_gbp'] = Decimal(round(item['price_gbp'] * Decimal(generator.uniform(0.75, 1.25)), -1))
+        item['mileage'] = Decimal(generator.randint(0, 80000))
+        item['year'] = item['year'] + generator.randint(-3, 1)
+        item['previous_owners'] = Decimal(generator.randint(0, 4))
+        item['status'] = generator.choice(('available',) * 8 + ('reserved', 'sold'))
+        # Not every car has every figure, e.g. electric cars have no fuel economy
+        for fields, name in ((item, 'fuel_economy_mpg'), (item, 'co2_emissions_gkm'), (item['engine'], 'power_bhp')):
+            if name in fields:
+                fields[name] = Decimal(str(round(float(fields[name]) * generator.uniform(0.85, 1.15), 1)))
+    return items
+
+def python_ranking(cars, low, high, request):
+    """The recommendation ranking in pure Python, one car at a time: [(score, car ID)], best first"""
+    from inventory_index import NUMERIC_FIELDS, car_field
+    from inventory_store import matches
+
+    weights = sum(weight for _, _, weight in request['preferences'])
+    preferences = []
+    for attribute, target, weight in request['preferences']:
+        target = low[attribute] if target == 'low' else high[attribute] if target == 'high' else target
+        span = high[attribute] - low[attribute] if high[attribute] > low[attribute] else 1.0
+        preferences.append((NUMERIC_FIELDS[attribute], target, span, weight))
+
+    def scored():
+        for car in cars:
+            if not matches(car, request['filters']):
+                continue
+            total = 0.0
+            for path, target, attribute_span, weight in preferences:
+                value = car_field(car, path)
+                distance = 1.0 if value is None else min(abs(float(value) - target) / attribute_span, 1.0)
+                total += weight * distance * distance
+            yield math.sqrt(total / weights), car['id']
+
+    return heapq.nsmallest(request['limit'], scored())
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure NumPy recommendations against pure Python")
+    parser.add_argument('--cars', type=int, nargs='+', default=[10000, 100000], help="Table sizes to measure")
+    parser.add_argument('--limit', type=int, default=5, help="Cars to recommend")
+    parser.add_argument('--iterations', type=int, default=5, help="Repeats per request")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_SNAPSHOT_BUCKET='inventory-snapshot', INVENTORY_SNAPSHOT_CHECK_SECONDS='60')
+    import aws_clients
+    import inventory_index
+    import inventory_recommend
+    import inventory_snapshot
+
+    results = []
+    for count in args.cars:
+        items = varied_items(count)
+        aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items, indexes={}))
+        aws_clients.set_client('s3', InMemoryS3Client())
+        inventory_snapshot.rebuild_snapshot('car-inventory')
+        inventory_snapshot.snapshot_cache.update(snapshot=None, checked_at=0.0)
+        snapshot = inventory_snapshot.get_snapshot()
+
+        start_time = time.perf_counter()
+        index = inventory_index.get_index('car-inventory')
+        encode_ms = (time.perf_counter() - start_time) * 1000
+
+        # The reference ranks the same cars, deserialised, with the same attribute ranges
+        cars = json.loads(snapshot['body'])
+        low, high = index['low'], index['high']
+
+        for name, query in REQUESTS.items():
+            request = inventory_recommend.parse_recommendation(dict(query, limit=str(args.limit)))
+            timings = {'numpy': [], 'python': []}
+            for _ in range(args.iterations):
+                start_time = time.perf_counter()
+                _, body = inventory_recommend.recommend_json('car-inventory', request)
+                timings['numpy'].append((time.perf_counter() - start_time) * 1000)
+
+                start_time = time.perf_counter()
+                expected = python_ranking(cars, low, high, request)
+                timings['python'].append((time.perf_counter() - start_time) * 1000)
+
+            recommended = json.loads(body)
+            got = [(1 - car['match_score'], car['id']) for car in recommended['cars']]
+            if [car_id for _, car_id in got] != [car_id for _, car_id in expected] or \
+                    any(abs(a - b) > 0.001 for (a, _), (b, _) in zip(got, expected)):
+                raise AssertionError(f"The NumPy recommendations for '{name}' differ at {count} cars")
+
+            results.append({
+                'cars': count, 'request': name, 'candidates': recommended['candidates'],
+                'encode_ms': encode_ms,
+                'numpy_ms': statistics.median(timings['numpy']),
+                'python_ms': statistics.median(timings['python']),
+                'response_kb': len(body.encode('utf-8')) / 1024,
+                'full_list_kb': len(snapshot['body'].encode('utf-8')) / 1024
+            })
+        del cars
+
+    print(f"{'Cars':>7} {'Request':34} {'candidates':>10} {'numpy ms':>9} {'python ms':>10} {'speedup':>8} "
+          f"{'response KB':>12} {'full list KB':>13}")
+    for result in results:
+        print(f"{result['cars']:7} {result['request']:34} {result['candidates']:10} {result['numpy_ms']:9.1f} "
+              f"{result['python_ms']:10.1f} {result['python_ms'] / result['numpy_ms']:7.0f}x "
+              f"{result['response_kb']:12.1f} {result['full_list_kb']:13.0f}")
+    for count in args.cars:
+        encode_ms = next(result['encode_ms'] for result in results if result['cars'] == count)
+        print(f"Indexing {count} cars from the snapshot took {encode_ms:.0f} ms")
+    print(f"NumPy and Python recommend the same {args.limit} cars for every request")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
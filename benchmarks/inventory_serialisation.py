@@ -0,0 +1,84 @@
+"""
+CPU time to serialise inventory responses, per 1,000 cars.
+
+- resource + DecimalEncoder: the previous path. The boto3 Table resource deserialises each
+  DynamoDB JSON item (numbers to Decimals), then json.dumps(cars, cls=DecimalEncoder) calls
+  DecimalEncoder.default for every number.
+- TypeDeserializer only: the deserialisation step of the previous path on its own.
+- DecimalEncoder only: the json.dumps step of the previous path on its own.
+- item_json: inventory_store.item_json, converting the low-level client's DynamoDB JSON
+  items straight to JSON text.
+
+item_json is compared with both steps of the previous path: its saving comes from skipping
+the deserialisation, as it is itself slower than the DecimalEncoder step alone. The outputs
+must be identical; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_serialisation.py --cars 10000 --repeats 5
+"""
+import argparse
+import json
+import time
+
+from local_inventory import load_seed_items, setup_offline_environment
+
+def cpu_ms_per_thousand(function, cars, repeats):
+    """Best CPU time of a serialisation over the repeats, per 1,000 cars, and its output"""
+    timings = []
+    output = None
+    for _ in range(repeats):
+        start_time = time.process_time()
+        output = function()
+        timings.append(time.process_time() - start_time)
+    return min(timings) * 1000 * 1000 / cars, output
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inventory serialisation CPU time")
+    parser.add_argument('--cars', type=int, default=10000, help="Cars to serialise")
+    parser.add_argument('--repeats', type=int, default=5, help="Repeats per serialisation (the best is reported)")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment()
+    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+    from inventory_store import DecimalEncoder, item_json
+
+    serializer = TypeSerializer()
+    deserializer = TypeDeserializer()
+    raw_items = [{k: serializer.serialize(v) for k, v in car.items()} for car in load_seed_items(args.cars)]
+    cars = [{k: deserializer.deserialize(v) for k, v in item.items()} for item in raw_items]
+
+    def previous():
+        deserialised = [{k: deserializer.deserialize(v) for k, v in item.items()} for item in raw_items]
+        return json.dumps(deserialised, cls=DecimalEncoder)
+
+    serialisations = {
+        'resource + DecimalEncoder': previous,
+        'TypeDeserializer only': lambda: [{k: deserializer.deserialize(v) for k, v in item.items()} for item in raw_items],
+        'DecimalEncoder only': lambda: json.dumps(cars, cls=DecimalEncoder),
+        'item_json': lambda: '[' + ', '.join([item_json(item) for item in raw_items]) + ']'
+    }
+
+    results = {}
+    outputs = {}
+    for name, function in serialisations.items():
+        results[name], outputs[name] = cpu_ms_per_thousand(function, args.cars, args.repeats)
+
+    del outputs['TypeDeserializer only']
+    if len(set(outputs.values())) != 1:
+        raise AssertionError("The serialisations produced different output")
+
+    baseline = results['resource + DecimalEncoder']
+    print(f"{'Serialisation':28} {'CPU ms / 1k cars':>17} {'speed-up':>9}")
+    for name, cpu_ms in results.items():
+        print(f"{name:28} {cpu_ms:17.2f} {baseline / cpu_ms:8.1f}x")
+    print(f"Identical output ({len(outputs['item_json'])} bytes for {args.cars} cars)")
+    print(f"item_json against the DecimalEncoder step alone: "
+          f"{results['item_json'] / results['DecimalEncoder only']:.2f}x the CPU time")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
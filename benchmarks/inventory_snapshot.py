@@ -0,0 +1,149 @@
+"""
+GET /cars served from the inventory snapshot against reading the table, and the cost of
+keeping the snapshot up to date.
+
+- table: get_inventory_json's scan of the table, converting every car to JSON.
+- snapshot, first read: a container's first request, downloading the snapshot from S3.
+- snapshot, cached: later requests within INVENTORY_SNAPSHOT_CHECK_SECONDS.
+- snapshot, revalidated: a request after that, checking the snapshot with a HEAD request.
+
+Maintenance compares applying a batch of stream records (inserts, price changes and
+removals) to a full rebuild from a parallel scan.
+
+Runs against in-memory stand-ins for the low-level DynamoDB and S3 clients, with a simulated
+round trip per scan page and S3 request, and a simulated S3 download speed. The snapshot
+must hold the same cars as the table, before and after the changes; the benchmark checks this.
+
+Usage:
+    python benchmarks/inventory_snapshot.py --cars 1000 10000 --gzip
+"""
+import argparse
+import json
+import time
+
+from local_inventory import InMemoryDynamoDBClient, InMemoryS3Client, load_seed_items, setup_offline_environment
+
+def stream_records(table, count):
+    """A batch of stream records: a third inserts, a third price changes and a third removals"""
+    import copy
+
+    records = []
+    items = table.items
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            item = copy.deepcopy(items[index])
+            item['id'] = {'S': f'ffffffff-0000-0000-0000-{index:012d}'}
+            records.append({'eventName': 'INSERT', 'dynamodb': {'Keys': {'id': item['id']}, 'NewImage': item}})
+        elif kind == 1:
+            item = copy.deepcopy(items[index])
+            item['price_gbp'] = {'N': str(int(item['price_gbp']['N']) - 500)}
+            records.append({'eventName': 'MODIFY', 'dynamodb': {'Keys': {'id': item['id']}, 'NewImage': item}})
+        else:
+            records.append({'eventName': 'REMOVE', 'dynamodb': {'Keys': {'id': items[index]['id']}}})
+    return records
+
+def apply_to_table(table, records):
+    """Apply stream records to the DynamoDB stand-in, as the table writes would have"""
+    by_id = dict(table.items_by_id)
+    for record in records:
+        car_id = record['dynamodb']['Keys']['id']['S']
+        if record['eventName'] == 'REMOVE':
+            by_id.pop(car_id, None)
+        else:
+            by_id[car_id] = record['dynamodb']['NewImage']
+    table.items = list(by_id.values())
+    table.items_by_id = by_id
+    table.segments = {}
+
+def cars_by_id(body):
+    return sorted(json.loads(body), key=lambda car: car['id'])
+
+def timed(function, repeats=1):
+    """Best wall time of a function over the repeats in ms, and its result"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare GET /cars from the inventory snapshot and the table")
+    parser.add_argument('--cars', type=int, nargs='+', default=[1000, 10000], help="Table sizes to measure")
+    parser.add_argument('--changes', type=int, default=100, help="Stream records per maintenance batch")
+    parser.add_argument('--page-latency-ms', type=float, default=20, help="Simulated DynamoDB time per scan page")
+    parser.add_argument('--s3-latency-ms', type=float, default=20, help="Simulated S3 time per request")
+    parser.add_argument('--s3-mb-per-second', type=float, default=80, help="Simulated S3 download speed")
+    parser.add_argument('--gzip', action='store_true', help="Store the snapshot gzip compressed")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(
+        INVENTORY_SNAPSHOT_BUCKET='inventory-snapshot',
+        INVENTORY_SNAPSHOT_GZIP='true' if args.gzip else 'false',
+        INVENTORY_SNAPSHOT_CHECK_SECONDS='3600'
+    )
+    import aws_clients
+    import inventory_snapshot
+    from inventory_store import get_inventory_json
+
+    results = []
+    for count in args.cars:
+        table = InMemoryDynamoDBClient(load_seed_items(count), page_latency_ms=args.page_latency_ms, indexes={})
+        s3 = InMemoryS3Client(latency_ms=args.s3_latency_ms, megabytes_per_second=args.s3_mb_per_second)
+        aws_clients.set_client('dynamodb', table)
+        aws_clients.set_client('s3', s3)
+
+        rebuild_ms, _ = timed(lambda: inventory_snapshot.rebuild_snapshot('car-inventory'))
+        table_ms, (_, table_body) = timed(lambda: get_inventory_json('car-inventory'), repeats=3)
+
+        def first_read():
+            inventory_snapshot.snapshot_cache.update(snapshot=None, checked_at=0.0)
+            return inventory_snapshot.get_snapshot()
+
+        def revalidated():
+            inventory_snapshot.snapshot_cache['checked_at'] = 0.0
+            return inventory_snapshot.get_snapshot()
+
+        first_ms, snapshot = timed(first_read, repeats=3)
+        cached_ms, _ = timed(inventory_snapshot.get_snapshot, repeats=3)
+        revalidated_ms, _ = timed(revalidated, repeats=3)
+        if cars_by_id(snapshot['body']) != cars_by_id(table_body):
+            raise AssertionError(f"The snapshot of {count} cars differs from the table")
+
+        records = stream_records(table, args.changes)
+        apply_to_table(table, records)
+        apply_ms, _ = timed(lambda: inventory_snapshot.apply_changes('car-inventory', records))
+        if cars_by_id(first_read()['body']) != cars_by_id(get_inventory_json('car-inventory')[1]):
+            raise AssertionError(f"The snapshot of {count} cars differs from the table after the changes")
+
+        stored = s3.objects[('inventory-snapshot', inventory_snapshot.SNAPSHOT_KEY)]
+        results.append({
+            'cars': count,
+            'table_ms': table_ms,
+            'first_read_ms': first_ms,
+            'cached_ms': cached_ms,
+            'revalidated_ms': revalidated_ms,
+            'apply_ms': apply_ms,
+            'rebuild_ms': rebuild_ms,
+            'stored_mb': stored['ContentLength'] / (1024 * 1024),
+            'body_mb': len(snapshot['body'].encode('utf-8')) / (1024 * 1024)
+        })
+
+    print(f"{'Cars':>7} {'table ms':>9} {'first ms':>9} {'cached ms':>10} {'revalid. ms':>12} "
+          f"{'apply ms':>9} {'rebuild ms':>11} {'stored MB':>10} {'body MB':>8}")
+    for result in results:
+        print(f"{result['cars']:7} {result['table_ms']:9.1f} {result['first_read_ms']:9.1f} {result['cached_ms']:10.3f} "
+              f"{result['revalidated_ms']:12.1f} {result['apply_ms']:9.1f} {result['rebuild_ms']:11.1f} "
+              f"{result['stored_mb']:10.2f} {result['body_mb']:8.2f}")
+    print(f"Snapshot matches the table before and after {args.changes} changes"
+          f"{' (gzip compressed)' if args.gzip else ''}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
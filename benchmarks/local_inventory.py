@@ -0,0 +1,455 @@
+"""
+Offline stand-ins for the car inventory, shared by the benchmarks.
+
+- InMemoryDynamoDBClient: a low-level DynamoDB client stand-in for the car inventory table,
+  with the inventory indexes, holding the cars from load_seed_items
+  (inventory_seed/inventory.json, optionally replicated to any number of cars).
+- InMemoryS3Client: a low-level S3 client stand-in holding objects in memory, with
+  conditional reads and writes, for the inventory snapshot.
+- LocalInventoryApi: a local HTTPS server in front of get_vehicle_inventory.lambda_handler,
+  standing in for the inventory API (API Gateway) with a self-signed certificate.
+"""
+import base64
+import copy
+import hashlib
+import io
+import json
+import os
+import re
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_FILE = os.path.join(REPO_DIR, 'inventory_seed', 'inventory.json')
+CODE_PATHS = [
+    os.path.join(REPO_DIR, 'layers', 'shared', 'python'),
+    os.path.join(REPO_DIR, 'functions'),
+    os.path.join(REPO_DIR, 'agent_functions')
+]
+
+# Offline environment for the handler modules
+OFFLINE_ENVIRONMENT = {
+    'AWS_REGION': 'eu-west-2',
+    'AWS_DEFAULT_REGION': 'eu-west-2',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_EC2_METADATA_DISABLED': 'true',
+    'TABLE_NAME': 'car-inventory'
+}
+
+def add_code_paths():
+    """Put the shared layer and the handler code on sys.path"""
+    for path in reversed(CODE_PATHS):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+def setup_offline_environment(**environment):
+    """Put the handler code on sys.path and configure a fake, offline AWS environment"""
+    os.environ.update(OFFLINE_ENVIRONMENT)
+    os.environ.update(environment)
+    add_code_paths()
+
+def load_seed_items(count=None):
+    """
+    Load the seed inventory as DynamoDB resource items (numbers as Decimals).
+
+    :param count: Number of cars to return. The 20 seed cars are replicated with new IDs
+        and reference numbers to reach it. Defaults to the seed cars only.
+    """
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    with open(SEED_FILE, encoding='utf-8') as f:
+        seed = [{k: deserializer.deserialize(v) for k, v in item.items()} for item in json.load(f)]
+
+    if count is None:
+        return seed
+
+    items = []
+    for index in range(count):
+        item = copy.deepcopy(seed[index % len(seed)])
+        if index >= len(seed):
+            item['id'] = str(uuid.UUID(int=index))
+            item['reference_number'] = str(30000000 + index)
+        items.append(item)
+    return items
+
+COMPARISONS = {
+    '=': lambda a, b: a == b, '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b
+}
+TOKEN = re.compile(r'\(|\)|<>|<=|>=|=|<|>|[#:]?\w+(?:\.[#:]?\w+)*')
+
+def attribute_value(value):
+    """A DynamoDB JSON value as a comparable Python value"""
+    if 'N' in value:
+        return Decimal(value['N'])
+    return next(iter(value.values()))
+
+def compile_expression(expression, names=None, values=None):
+    """
+    Compile a condition expression, as built by boto3 from Key and Attr conditions
+    (comparisons, BETWEEN and AND), to a predicate on DynamoDB JSON items.
+    """
+    tokens = TOKEN.findall(expression)
+    position = 0
+
+    def take(expected=None):
+        nonlocal position
+        token = tokens[position]
+        if expected and token != expected:
+            raise ValueError(f"Expected {expected} in {expression}, got {token}")
+        position += 1
+        return token
+
+    def operand():
+        token = take()
+        if token.startswith(':'):
+            value = attribute_value(values[token])
+            return lambda item: value
+        path = [(names or {}).get(part, part) for part in token.split('.')]
+
+        def lookup(item):
+            value = {'M': item}
+            for part in path:
+                value = value.get('M', {}).get(part)
+                if value is None:
+                    return None
+            return attribute_value(value)
+        return lookup
+
+    def primary():
+        if tokens[position] == '(':
+            take('(')
+            predicate = conjunction()
+            take(')')
+            return predicate
+
+        left = operand()
+        operator = take()
+        if operator == 'BETWEEN':
+            low = operand()
+            take('AND')
+            high = operand()
+            return lambda item: (value := left(item)) is not None and low(item) <= value <= high(item)
+        compare, right = COMPARISONS[operator], operand()
+        return lambda item: (value := left(item)) is not None and compare(value, right(item))
+
+    def conjunction():
+        predicates = [primary()]
+        while position < len(tokens) and tokens[position] == 'AND':
+            take('AND')
+            predicates.append(primary())
+        return predicates[0] if len(predicates) == 1 else lambda item: all(p(item) for p in predicates)
+
+    predicate = conjunction()
+    if position != len(tokens):
+        raise ValueError(f"Unsupported expression: {expression}")
+    return predicate
+
+class InMemoryDynamoDBClient:
+    """
+    A low-level DynamoDB client stand-in for the car inventory table. It supports get_item,
+    batch_get_item, and paginated query (on the inventory indexes) and scan (including
+    parallel scans with Segment and TotalSegments), with FilterExpression and a simple
+    ProjectionExpression.
+
+    Items are held and returned in DynamoDB JSON, serialised once up front. ScannedCount is
+    the number of items read, and Limit caps it, as in DynamoDB. LastEvaluatedKey is the key
+    of the last item read, so pages can also start after the key of any item returned.
+
+    :param items: The table's items (numbers as Decimals), e.g. from load_seed_items.
+    :param page_size: Items read per page, standing in for DynamoDB's 1MB page limit.
+    :param page_latency_ms: Time each page takes, standing in for the DynamoDB round trip.
+    :param indexes: Global secondary indexes as {name: (partition key, sort key)}. Defaults
+        to inventory_store.INVENTORY_INDEXES.
+    :param unprocessed_fraction: Fraction of the keys in each BatchGetItem request left
+        unprocessed, as DynamoDB does under load.
+    """
+
+    def __init__(self, items, page_size=1000, page_latency_ms=0, indexes=None, unprocessed_fraction=0.0):
+        from boto3.dynamodb.types import TypeSerializer
+
+        if indexes is None:
+            from inventory_store import INVENTORY_INDEXES
+            indexes = INVENTORY_INDEXES
+
+        serializer = TypeSerializer()
+        self.items = [{k: serializer.serialize(v) for k, v in item.items()} for item in items]
+        self.items_by_id = {item['id']['S']: item for item in self.items}
+        self.page_size = page_size
+        self.page_latency_ms = page_latency_ms
+        self.unprocessed_fraction = unprocessed_fraction
+        self.segments = {}
+        self.queries = {}
+        self.positions = {}
+        self.lock = threading.Lock()
+
+        self.indexes = {}
+        for name, (partition_key, sort_key) in indexes.items():
+            partitions = {}
+            for item in self.items:
+                if partition_key in item and sort_key in item:
+                    partitions.setdefault(attribute_value(item[partition_key]), []).append(item)
+            for partition in partitions.values():
+                partition.sort(key=lambda item: (attribute_value(item[sort_key]), item['id']['S']))
+            self.indexes[name] = (partition_key, sort_key, partitions)
+
+    def get_item(self, TableName, Key, **kwargs):
+        time.sleep(self.page_latency_ms / 1000)
+        item = self.items_by_id.get(Key['id']['S'])
+        return {'Item': item} if item else {}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        """BatchGetItem, leaving unprocessed_fraction of the keys (at least one read) for a retry"""
+        time.sleep(self.page_latency_ms / 1000)
+        responses, unprocessed = {}, {}
+        for table_name, request in RequestItems.items():
+            keys = request['Keys']
+            if len(keys) > 100 or len({key['id']['S'] for key in keys}) != len(keys):
+                raise ValueError("Too many or duplicate keys in BatchGetItem")
+            processed = max(1, len(keys) - int(len(keys) * self.unprocessed_fraction))
+            responses[table_name] = [
+                self.items_by_id[key['id']['S']] for key in keys[:processed] if key['id']['S'] in self.items_by_id]
+            if keys[processed:]:
+                unprocessed[table_name] = {'Keys': keys[processed:]}
+        return {'Responses': responses, 'UnprocessedKeys': unprocessed}
+
+    def segment_items(self, segment, total_segments):
+        """Items in a scan segment, assigned by a hash of the ID as DynamoDB does"""
+        with self.lock:
+            if total_segments not in self.segments:
+                segments = [[] for _ in range(total_segments)]
+                for item in self.items:
+                    segments[zlib.crc32(item['id']['S'].encode()) % total_segments].append(item)
+                self.segments[total_segments] = segments
+            return self.segments[total_segments][segment]
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, **kwargs):
+        return self.page(self.segment_items(Segment, TotalSegments), ('id',), **kwargs)
+
+    def query(self, TableName, IndexName, KeyConditionExpression, ExpressionAttributeNames=None,
+              ExpressionAttributeValues=None, **kwargs):
+        partition_key, sort_key, partitions = self.indexes[IndexName]
+
+        # Only the items matching the key condition are read. Later pages of the same query
+        # reuse them.
+        query = (IndexName, KeyConditionExpression, json.dumps(ExpressionAttributeValues, sort_keys=True))
+        with self.lock:
+            if query not in self.queries:
+                name = next(k for k, v in (ExpressionAttributeNames or {}).items() if v == partition_key)
+                partition_value = attribute_value(ExpressionAttributeValues[
+                    re.search(re.escape(name) + r' = (:\w+)', KeyConditionExpression).group(1)])
+                key_condition = compile_expression(
+                    KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+                self.queries = {query: [item for item in partitions.get(partition_value, []) if key_condition(item)]}
+            items = self.queries[query]
+
+        return self.page(items, ('id', partition_key, sort_key), ExpressionAttributeNames=ExpressionAttributeNames,
+                         ExpressionAttributeValues=ExpressionAttributeValues, **kwargs)
+
+    def position(self, items, key):
+        """Position in a list of items just after the item with a key"""
+        with self.lock:
+            if id(items) not in self.positions:
+                self.positions[id(items)] = (items, {item['id']['S']: index for index, item in enumerate(items)})
+            return self.positions[id(items)][1][key['id']['S']] + 1
+
+    def page(self, items, key_names, ExclusiveStartKey=None, Limit=None, FilterExpression=None,
+             ProjectionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        time.sleep(self.page_latency_ms / 1000)
+        start = self.position(items, ExclusiveStartKey) if ExclusiveStartKey else 0
+        page = items[start:start + min(self.page_size, Limit or self.page_size)]
+
+        if FilterExpression:
+            condition = compile_expression(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            matched = [item for item in page if condition(item)]
+        else:
+            matched = page
+
+        if ProjectionExpression:
+            names = [name.strip() for name in ProjectionExpression.split(',')]
+            names = [(ExpressionAttributeNames or {}).get(name, name) for name in names]
+            matched = [{name: item[name] for name in names if name in item} for item in matched]
+
+        response = {'Items': matched, 'Count': len(matched), 'ScannedCount': len(page)}
+        if start + len(page) < len(items):
+            response['LastEvaluatedKey'] = {name: page[-1][name] for name in key_names}
+        return response
+
+class InMemoryS3Client:
+    """
+    A low-level S3 client stand-in holding objects in memory. It supports get_object,
+    head_object and put_object, including the IfMatch and IfNoneMatch conditions, raising
+    ClientError with S3's error codes.
+
+    :param latency_ms: Time each request takes, standing in for the S3 round trip.
+    :param megabytes_per_second: Download speed of get_object bodies.
+    """
+
+    def __init__(self, latency_ms=0, megabytes_per_second=None):
+        self.objects = {}
+        self.latency_ms = latency_ms
+        self.megabytes_per_second = megabytes_per_second
+        self.lock = threading.Lock()
+
+    def error(self, code, message, operation):
+        from botocore.exceptions import ClientError
+        return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+    def head_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise self.error('404', 'Not Found', 'HeadObject')
+        if IfNoneMatch and IfNoneMatch == stored['ETag']:
+            raise self.error('304', 'Not Modified', 'HeadObject')
+        return {name: value for name, value in stored.items() if name != 'Body'}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        stored = self.head_object(Bucket, Key, IfNoneMatch)
+        body = self.objects[(Bucket, Key)]['Body']
+        if self.megabytes_per_second:
+            time.sleep(len(body) / (self.megabytes_per_second * 1024 * 1024))
+        return dict(stored, Body=io.BytesIO(body))
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, Metadata=None,
+                   ContentType=None, ContentEncoding=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        with self.lock:
+            stored = self.objects.get((Bucket, Key))
+            if IfNoneMatch == '*' and stored is not None:
+                raise self.error('PreconditionFailed', 'At least one of the pre-conditions you specified did not hold', 'PutObject')
+            if IfMatch and (stored is None or stored['ETag'] != IfMatch):
+                raise self.error('PreconditionFailed', 'At least one of the pre-conditions you specified did not hold', 'PutObject')
+
+            etag = '"' + hashlib.md5(Body).hexdigest() + '"'
+            stored = {'Body': Body, 'ETag': etag, 'ContentLength': len(Body), 'Metadata': dict(Metadata or {})}
+            if ContentType:
+                stored['ContentType'] = ContentType
+            if ContentEncoding:
+                stored['ContentEncoding'] = ContentEncoding
+            self.objects[(Bucket, Key)] = stored
+        return {'ETag': etag}
+
+def create_certificate(directory):
+    """Create a self-signed certificate for localhost with openssl, returning (cert, key) paths"""
+    cert_file = os.path.join(directory, 'cert.pem')
+    key_file = os.path.join(directory, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key_file, '-out', cert_file, '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'
+    ], check=True, capture_output=True)
+    return cert_file, key_file
+
+class LocalInventoryApi:
+    """
+    Local HTTPS stand-in for the inventory API, serving GET /cars and /cars/{car_id} from
+    get_vehicle_inventory.lambda_handler. Supports HTTP/1.1 keep-alive.
+
+    Use as a context manager. While it runs, SSL_CERT_FILE points at its self-signed
+    certificate so clients in this process trust it, and url holds the base URL. connections
+    and body_bytes count the TCP connections accepted and the response body bytes sent.
+    """
+
+    def __init__(self, stage='prod'):
+        self.stage = stage
+        self.url = None
+        self.connections = 0
+        self.body_bytes = 0
+
+    def __enter__(self):
+        import get_vehicle_inventory
+
+        self.directory = tempfile.TemporaryDirectory()
+        cert_file, key_file = create_certificate(self.directory.name)
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; without this, Nagle's algorithm and
+            # the client's delayed ACK stall every response on a kept-alive connection
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                api.connections += 1
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split('/') if part]
+                if parts and parts[0] == api.stage:
+                    parts = parts[1:]
+
+                if not parts or parts[0] != 'cars' or len(parts) > 2:
+                    self.send_json(404, {'message': 'Not Found'})
+                    return
+
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                # /cars/recommend takes precedence over /cars/{car_id}, as in API Gateway
+                resource = '/cars/recommend' if parts[1:] == ['recommend'] else \
+                    '/cars/{car_id}' if len(parts) == 2 else '/cars'
+                event = {
+                    'httpMethod': 'GET',
+                    'resource': resource,
+                    'path': '/' + '/'.join(parts),
+                    'pathParameters': {'car_id': parts[1]} if resource == '/cars/{car_id}' else None,
+                    'queryStringParameters': query or None,
+                    'headers': dict(self.headers)
+                }
+                response = get_vehicle_inventory.lambda_handler(event, None)
+                # API Gateway sends base64 encoded bodies (compressed responses) as binary
+                if response.get('isBase64Encoded'):
+                    body = base64.b64decode(response['body'])
+                else:
+                    body = response['body'].encode('utf-8')
+                self.send_body(response['statusCode'], body, response.get('headers', {}))
+
+            def send_json(self, status, body):
+                self.send_body(status, json.dumps(body).encode('utf-8'), {'Content-Type': 'application/json'})
+
+            def send_body(self, status, body, headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                # Counted before writing, so the client sees it once it has the response
+                api.body_bytes += len(body)
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.previous_cert_file = os.environ.get('SSL_CERT_FILE')
+        os.environ['SSL_CERT_FILE'] = cert_file
+        self.url = f"https://localhost:{self.server.server_address[1]}/{self.stage}/"
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.previous_cert_file is None:
+            os.environ.pop('SSL_CERT_FILE', None)
+        else:
+            os.environ['SSL_CERT_FILE'] = self.previous_cert_file
+        self.directory.cleanup()
@@ -0,0 +1,143 @@
+"""
+Response compression for the inventory API: payload size, CPU time and transfer time saved.
+
+For each inventory size (the seed cars replicated, with each copy's numbers varied), the full
+GET /cars list is measured:
+- identity: the uncompressed JSON.
+- gzip, deflate (and br, if the brotli module is installed): compressed by
+  http_compression.compress_response, with the CPU time to compress and decompress it.
+- snapshot gzip: the inventory snapshot's stored gzip copy, sent without compressing again.
+
+Transfer time is modelled at each --bandwidth-mbps. Saved is the uncompressed transfer time
+minus the compressed transfer time and the compression and decompression CPU time. The Lambda
+payload is the base64 encoded body returned to API Gateway, which must stay under 6MB.
+
+Each size is also fetched through query_inventory.call_api from the local HTTPS stand-in for
+the inventory API, with and without Accept-Encoding. Both must give the agent the same body;
+the benchmark checks this.
+
+Usage:
+    python benchmarks/response_compression.py --cars 100 1000 10000 100000 --bandwidth-mbps 10 50
+"""
+import argparse
+import json
+import os
+import time
+
+from local_inventory import (InMemoryDynamoDBClient, InMemoryS3Client, LocalInventoryApi, load_seed_items,
+                             setup_offline_environment)
+
+LAMBDA_PAYLOAD_LIMIT_MB = 6
+
+def varied_items(count):
+    """
+    The seed cars replicated to count, varying each copy's numbers and feature order. Exact
+    copies of the 20 seed cars would compress far better than a real inventory.
+    """
+    import random
+    from decimal import Decimal
+
+    items = load_seed_items(count)
+    for index, item in enumerate(items[20:], start=20):
+        rng = random.Random(index)
+        item['price_gbp'] = Decimal(int(item['price_gbp']) + rng.randrange(-3000, 3000, 5))
+        item['mileage'] = Decimal(rng.randrange(0, 90000))
+        item['year'] = Decimal(rng.randrange(2015, 2026))
+        item['previous_owners'] = Decimal(rng.randrange(0, 4))
+        if 'features' in item:
+            rng.shuffle(item['features'])
+    return items
+
+def best_ms(function, repeats):
+    """Best CPU time of a function over the repeats in ms, and its result"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start_time = time.process_time()
+        result = function()
+        timings.append((time.process_time() - start_time) * 1000)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure inventory API response compression")
+    parser.add_argument('--cars', type=int, nargs='+', default=[100, 1000, 10000], help="Inventory sizes to measure")
+    parser.add_argument('--bandwidth-mbps', type=float, nargs='+', default=[10, 50], help="Modelled client bandwidths")
+    parser.add_argument('--repeats', type=int, default=3, help="Repeats per compression (the best is reported)")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    setup_offline_environment(INVENTORY_ACCESS_MODE='api', INVENTORY_SNAPSHOT_BUCKET='inventory-snapshot',
+                              INVENTORY_SNAPSHOT_GZIP='true')
+    import aws_clients
+    import http_compression
+    import inventory_snapshot
+
+    results = []
+    checks = []
+    with LocalInventoryApi() as api:
+        os.environ['API_GATEWAY_URL'] = api.url
+        import query_inventory
+
+        for count in args.cars:
+            aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(varied_items(count), indexes={}))
+            aws_clients.set_client('s3', InMemoryS3Client())
+            inventory_snapshot.rebuild_snapshot('car-inventory')
+            inventory_snapshot.snapshot_cache.update(snapshot=None, checked_at=0.0)
+            snapshot = inventory_snapshot.get_snapshot()
+            body = snapshot['body'].encode('utf-8')
+
+            encodings = {'identity': (body, 0.0, 0.0)}
+            for encoding in http_compression.supported_encodings():
+                compress_ms, compressed = best_ms(lambda: http_compression.compress(body, encoding), args.repeats)
+                decompress_ms, _ = best_ms(lambda: http_compression.decompress(compressed, encoding), args.repeats)
+                encodings[encoding] = (compressed, compress_ms, decompress_ms)
+            stored = snapshot['compressed']['gzip']
+            decompress_ms, _ = best_ms(lambda: http_compression.decompress(stored, 'gzip'), args.repeats)
+            encodings['snapshot gzip'] = (stored, 0.0, decompress_ms)
+
+            for name, (data, compress_ms, decompress_ms) in encodings.items():
+                payload = len(body) if name == 'identity' else (len(data) + 2) // 3 * 4
+                result = {
+                    'cars': count, 'encoding': name, 'kb': len(data) / 1024,
+                    'ratio': len(body) / len(data), 'compress_ms': compress_ms, 'decompress_ms': decompress_ms,
+                    'lambda_payload_mb': payload / (1024 * 1024), 'saved_ms': {}
+                }
+                for mbps in args.bandwidth_mbps:
+                    transfer_ms = len(data) * 8 / (mbps * 1000)
+                    identity_ms = len(body) * 8 / (mbps * 1000)
+                    result['saved_ms'][str(mbps)] = identity_ms - transfer_ms - compress_ms - decompress_ms
+                results.append(result)
+
+            # End to end through the client: same body, fewer bytes on the wire
+            transferred = {}
+            bodies = {}
+            accept_encoding = query_inventory.ACCEPT_ENCODING
+            for compressed in (True, False):
+                query_inventory.inventory_cache.clear()
+                query_inventory.ACCEPT_ENCODING = accept_encoding if compressed else 'identity'
+                sent = api.body_bytes
+                bodies[compressed] = query_inventory.call_api('/cars')['body_json']
+                transferred[compressed] = api.body_bytes - sent
+            query_inventory.ACCEPT_ENCODING = accept_encoding
+            if bodies[True] != bodies[False] or json.loads(bodies[True]) != json.loads(snapshot['body']):
+                raise AssertionError(f"Compressed and uncompressed responses for {count} cars differ")
+            checks.append((count, transferred[False], transferred[True]))
+
+    bandwidths = [str(mbps) for mbps in args.bandwidth_mbps]
+    print(f"{'Cars':>7} {'Encoding':14} {'KB':>10} {'ratio':>6} {'comp ms':>8} {'decomp ms':>9} {'Lambda MB':>10} "
+          + ' '.join(f"{'saved ms @' + mbps + 'Mbps':>17}" for mbps in bandwidths))
+    for result in results:
+        limit = ' (over 6MB)' if result['lambda_payload_mb'] > LAMBDA_PAYLOAD_LIMIT_MB else ''
+        print(f"{result['cars']:7} {result['encoding']:14} {result['kb']:10.1f} {result['ratio']:6.1f} "
+              f"{result['compress_ms']:8.2f} {result['decompress_ms']:9.2f} {result['lambda_payload_mb']:10.2f} "
+              + ' '.join(f"{result['saved_ms'][mbps]:17.1f}" for mbps in bandwidths) + limit)
+    for count, identity_bytes, compressed_bytes in checks:
+        print(f"call_api, {count} cars: {identity_bytes / 1024:.1f} KB uncompressed, "
+              f"{compressed_bytes / 1024:.1f} KB compressed on the wire, same body")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
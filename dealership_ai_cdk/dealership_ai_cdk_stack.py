@@ -1,11 +1,17 @@
 from aws_cdk import (
     Stack,
+    BundlingOptions,
     CfnOutput,
     RemovalPolicy,
     Duration,
+    Size,
     aws_dynamodb as dynamodb,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_apigateway as apigateway,
+    aws_apigatewayv2 as apigatewayv2,
+    aws_apigatewayv2_integrations as apigatewayv2_integrations,
+    aws_apigatewayv2_authorizers as apigatewayv2_authorizers,
     aws_iam as iam,
     aws_s3 as s3,
     aws_s3_notifications as s3_notifications,
@@ -16,7 +22,9 @@ from aws_cdk import (
     custom_resources as cr,
     aws_cloudfront as cloudfront,
     aws_cognito as cognito,
-    aws_logs as logs
+    aws_logs as logs,
+    aws_events as events,
+    aws_events_targets as events_targets
 )
 
 from cdklabs.generative_ai_cdk_constructs import (
@@ -27,6 +35,16 @@ from constructs import Construct
 import json
 
 
+def set_preflight_content_handling(api: apigateway.RestApi) -> None:
+    """
+    Convert the CORS preflight (OPTIONS) mock integrations' requests to text. With every media
+    type treated as binary, the mock integration's request template cannot otherwise be applied.
+    """
+    for method in api.methods:
+        if method.http_method == "OPTIONS":
+            method.node.default_child.add_property_override("Integration.ContentHandling", "CONVERT_TO_TEXT")
+
+
 class DealershipAiCdkStack(Stack):
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -153,7 +171,41 @@ class DealershipAiCdkStack(Stack):
             ),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
+            # Changes feed the inventory snapshot (build_inventory_snapshot)
+            stream=dynamodb.StreamViewType.NEW_IMAGE,
+        )
+
+        # Global secondary indexes for the inventory filters (inventory_store.INVENTORY_INDEXES),
+        # so filtered lists are a Query rather than a scan of the whole table. DynamoDB adds one
+        # index per table update: to upgrade an existing stack, deploy with
+        # -c inventory_indexes=status-price-index, then add the others one deployment at a time.
+        inventory_index_keys = {
+            "status-price-index": (
+                dynamodb.Attribute(name="status", type=dynamodb.AttributeType.STRING),
+                dynamodb.Attribute(name="price_gbp", type=dynamodb.AttributeType.NUMBER)
+            ),
+            "make-model-index": (
+                dynamodb.Attribute(name="make", type=dynamodb.AttributeType.STRING),
+                dynamodb.Attribute(name="model", type=dynamodb.AttributeType.STRING)
+            ),
+            "location-status-index": (
+                dynamodb.Attribute(name="location", type=dynamodb.AttributeType.STRING),
+                dynamodb.Attribute(name="status", type=dynamodb.AttributeType.STRING)
+            )
+        }
+        inventory_indexes_context = self.node.try_get_context("inventory_indexes")
+        inventory_indexes = (
+            [name.strip() for name in inventory_indexes_context.split(",") if name.strip()]
+            if inventory_indexes_context is not None else list(inventory_index_keys)
         )
+        for index_name in inventory_indexes:
+            partition_key, sort_key = inventory_index_keys[index_name]
+            car_inventory_table.add_global_secondary_index(
+                index_name=index_name,
+                partition_key=partition_key,
+                sort_key=sort_key,
+                projection_type=dynamodb.ProjectionType.ALL
+            )
 
         # Create CloudWatch Log Group for the inventory API
         inventory_api_logs = logs.LogGroup(
@@ -174,13 +226,38 @@ class DealershipAiCdkStack(Stack):
             ).role_arn
         )
 
+        # Optional API Gateway stage cache for the inventory API, e.g. -c inventory_api_cache_size=0.5
+        # (GB) -c inventory_api_cache_ttl=30 (seconds). It is billed per hour while enabled.
+        inventory_api_cache_size = self.node.try_get_context("inventory_api_cache_size")
+        inventory_api_cache_ttl = int(self.node.try_get_context("inventory_api_cache_ttl") or 30)
+        inventory_api_cache_options = {}
+        if inventory_api_cache_size:
+            inventory_api_cache_options = dict(
+                cache_cluster_enabled=True,
+                cache_cluster_size=str(inventory_api_cache_size),
+                method_options={
+                    "/*/*": apigateway.MethodDeploymentOptions(
+                        caching_enabled=True,
+                        cache_ttl=Duration.seconds(inventory_api_cache_ttl)
+                    )
+                }
+            )
+
+        # Response compression on the REST APIs: the functions compress responses themselves
+        # (gzip, deflate or br, base64 encoded) from this size, which needs every media type to be
+        # treated as binary. API Gateway compresses any other response over the same size.
+        response_min_compression_size = 1024
+
         # Create API Gateway with Cognito Authorizer
         api = apigateway.RestApi(
             self, "CarInventoryApi",
             rest_api_name="Car Inventory API",
             description="Car Dealership Inventory API",
+            min_compression_size=Size.bytes(response_min_compression_size),
+            binary_media_types=["*/*"],
             deploy_options=apigateway.StageOptions(
                 stage_name="prod",
+                **inventory_api_cache_options,
                 data_trace_enabled=True,
                 logging_level=apigateway.MethodLoggingLevel.INFO,
                 access_log_destination=apigateway.LogGroupLogDestination(inventory_api_logs),
@@ -203,6 +280,46 @@ class DealershipAiCdkStack(Stack):
             )
         )
         
+        # Shared Lambda layer with the tuned AWS client module (aws_clients) used by every function
+        shared_layer = lambda_.LayerVersion(
+            self, "SharedLayer",
+            code=lambda_.Code.from_asset("layers/shared/"),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_13],
+            description="Shared AWS clients with connection pooling, keep-alive and adaptive retries"
+        )
+
+        # NumPy, for the columnar inventory index and recommendations, installed for the Lambda runtime
+        numpy_layer = lambda_.LayerVersion(
+            self, "NumpyLayer",
+            code=lambda_.Code.from_asset("layers/numpy/", bundling=BundlingOptions(
+                image=lambda_.Runtime.PYTHON_3_13.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_13],
+            description="NumPy for the columnar inventory index and recommendations"
+        )
+
+        # PyJWT (with cryptography), for verifying Cognito ID tokens, installed for the Lambda runtime
+        jwt_layer = lambda_.LayerVersion(
+            self, "JwtLayer",
+            code=lambda_.Code.from_asset("layers/jwt/", bundling=BundlingOptions(
+                image=lambda_.Runtime.PYTHON_3_13.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_13],
+            description="PyJWT for verifying Cognito ID tokens"
+        )
+
+        # Inventory snapshot: the full list of cars, pre-serialised (gzip compressed) and
+        # maintained from the table's stream, served by GET /cars and query_inventory
+        inventory_snapshot_bucket = s3.Bucket(
+            self, "InventorySnapshotBucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.DESTROY,  # For demo purposes; use RETAIN in production
+            auto_delete_objects=True  # For demo purposes; be careful in production
+        )
 
         # Lambda Functions with API Gateway Integrations
         get_cars_function = lambda_.Function(
@@ -210,26 +327,71 @@ class DealershipAiCdkStack(Stack):
             handler="get_vehicle_inventory.lambda_handler",
             runtime=lambda_.Runtime.PYTHON_3_13,
             code= lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer, numpy_layer],
             environment={
-                "TABLE_NAME": car_inventory_table.table_name
-            }
+                "TABLE_NAME": car_inventory_table.table_name,
+                "INVENTORY_INDEXES": ",".join(inventory_indexes),
+                "INVENTORY_SNAPSHOT_BUCKET": inventory_snapshot_bucket.bucket_name,
+                # Lists of cars are filtered in memory over a columnar index of the snapshot
+                "INVENTORY_COLUMNAR_INDEX": "true",
+                "INVENTORY_CACHE_CONTROL": "private, no-cache",
+                "RESPONSE_MIN_COMPRESSION_SIZE": str(response_min_compression_size)
+            },
+            # Loading the columnar index is CPU bound: 1769 MB is one full vCPU, on which
+            # benchmarks/inventory_columnar_index.py loads 100k cars in about 1.5s from the
+            # snapshot (42 MB peak, plus the 70 MB document) or 3.7s from a scan (214 MB peak).
+            # The timeout is API Gateway's integration limit.
+            memory_size=1769,
+            timeout=Duration.seconds(29)
         )
         car_inventory_table.grant_read_data(get_cars_function)
+        inventory_snapshot_bucket.grant_read(get_cars_function)
         
+        # Request parameters of the inventory API, which key the stage cache when it is enabled.
+        # If-None-Match is included so a cached 304 is only returned to clients holding that ETag,
+        # and Accept-Encoding so a compressed response is only returned to clients accepting it.
+        inventory_query_parameters = [
+            "make", "model", "year_min", "year_max", "price_min", "price_max", "fuel_type",
+            "transmission", "mileage_max", "location", "status", "format", "ids",
+            "limit", "cursor", "view", "prefer"
+        ]
+        cars_request_parameters = {
+            **{f"method.request.querystring.{name}": False for name in inventory_query_parameters},
+            "method.request.header.If-None-Match": False,
+            "method.request.header.Accept-Encoding": False
+        }
+        car_request_parameters = {
+            "method.request.path.car_id": True,
+            "method.request.header.If-None-Match": False,
+            "method.request.header.Accept-Encoding": False
+        }
+
         # Create API Gateway resources with IAM auth
         cars_resource = api.root.add_resource("cars")
         cars_resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(get_cars_function),
-            authorization_type=apigateway.AuthorizationType.IAM
+            apigateway.LambdaIntegration(get_cars_function, cache_key_parameters=list(cars_request_parameters)),
+            authorization_type=apigateway.AuthorizationType.IAM,
+            request_parameters=cars_request_parameters
         )
         
+        # /cars/recommend takes the filters too, with prefer, limit and view
+        recommend_resource = cars_resource.add_resource("recommend")
+        recommend_resource.add_method(
+            "GET",
+            apigateway.LambdaIntegration(get_cars_function, cache_key_parameters=list(cars_request_parameters)),
+            authorization_type=apigateway.AuthorizationType.IAM,
+            request_parameters=cars_request_parameters
+        )
+
         car_resource = cars_resource.add_resource("{car_id}")
         car_resource.add_method(
             "GET",
-            apigateway.LambdaIntegration(get_cars_function),
-            authorization_type=apigateway.AuthorizationType.IAM
+            apigateway.LambdaIntegration(get_cars_function, cache_key_parameters=list(car_request_parameters)),
+            authorization_type=apigateway.AuthorizationType.IAM,
+            request_parameters=car_request_parameters
         )
+        set_preflight_content_handling(api)
 
         # Load sample data from JSON file
         with open('./inventory_seed/inventory.json', 'r') as file:
@@ -274,6 +436,73 @@ class DealershipAiCdkStack(Stack):
                 removal_policy=RemovalPolicy.DESTROY
             )
 
+        # Nightly full inventory export (NDJSON, from a parallel scan) for inventory feeds
+        inventory_export_bucket = s3.Bucket(
+            self, "InventoryExportBucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.DESTROY,  # For demo purposes; use RETAIN in production
+            auto_delete_objects=True  # For demo purposes; be careful in production
+        )
+
+        export_inventory_function = lambda_.Function(
+            self, "ExportInventoryFunction",
+            handler="export_inventory.lambda_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code=lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer],
+            environment={
+                "TABLE_NAME": car_inventory_table.table_name,
+                "EXPORT_BUCKET": inventory_export_bucket.bucket_name,
+                "INVENTORY_EXPORT_SEGMENTS": "8"
+            },
+            memory_size=1024,
+            timeout=Duration.minutes(5)
+        )
+        car_inventory_table.grant_read_data(export_inventory_function)
+        inventory_export_bucket.grant_read_write(export_inventory_function)
+
+        events.Rule(
+            self, "NightlyInventoryExport",
+            schedule=events.Schedule.cron(minute="0", hour="2"),
+            targets=[events_targets.LambdaFunction(export_inventory_function)]
+        )
+
+        # Inventory snapshot maintenance: stream batches are applied incrementally, and an
+        # hourly rebuild from the table repairs any missed change (and builds the first snapshot)
+        inventory_snapshot_function = lambda_.Function(
+            self, "InventorySnapshotFunction",
+            handler="build_inventory_snapshot.lambda_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code=lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer],
+            environment={
+                "TABLE_NAME": car_inventory_table.table_name,
+                "INVENTORY_SNAPSHOT_BUCKET": inventory_snapshot_bucket.bucket_name,
+                "INVENTORY_SNAPSHOT_GZIP": "true",
+                "INVENTORY_EXPORT_SEGMENTS": "8"
+            },
+            memory_size=1024,
+            timeout=Duration.minutes(5)
+        )
+        car_inventory_table.grant_read_data(inventory_snapshot_function)
+        inventory_snapshot_bucket.grant_read_write(inventory_snapshot_function)
+        inventory_snapshot_function.add_event_source(lambda_event_sources.DynamoEventSource(
+            car_inventory_table,
+            starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            max_batching_window=Duration.seconds(2),
+            bisect_batch_on_error=True,
+            retry_attempts=3
+        ))
+
+        events.Rule(
+            self, "InventorySnapshotRebuild",
+            schedule=events.Schedule.rate(Duration.hours(1)),
+            targets=[events_targets.LambdaFunction(inventory_snapshot_function)]
+        )
+
         
 
     #---------------------------------------------------------------------------
@@ -308,18 +537,34 @@ class DealershipAiCdkStack(Stack):
             bucket= documents_bucket,
         )
 
+        # Shared cache of agent answers to first-turn FAQ prompts. Entries expire via the
+        # table TTL and are invalidated whenever a knowledge base ingestion job starts.
+        answer_cache_table = dynamodb.Table(
+            self, "agent-answer-cache",
+            partition_key=dynamodb.Attribute(
+                name="cacheKey",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
         # Create a Lambda function to trigger knowledge base ingestion when S3 bucket content changes
         kb_ingestion_function = lambda_.Function(
             self, "KnowledgeBaseIngestionFunction",
             runtime=lambda_.Runtime.PYTHON_3_13,
             handler="kb_ingestion.lambda_handler",
             code=lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer],
             environment={
                 "KNOWLEDGE_BASE_ID": kb.knowledge_base_id,
-                "DATA_SOURCE_ID": kb_data_source.data_source_id
+                "DATA_SOURCE_ID": kb_data_source.data_source_id,
+                "ANSWER_CACHE_TABLE": answer_cache_table.table_name
             },
             timeout=Duration.seconds(30)
         )
+        answer_cache_table.grant_read_write_data(kb_ingestion_function)
         
         # Grant the Lambda function permissions to call the Bedrock StartIngestionJob API
         kb_ingestion_function.add_to_role_policy(
@@ -336,6 +581,17 @@ class DealershipAiCdkStack(Stack):
             )
         )
         
+        # Answers are not cached while an ingestion job runs; once it has finished, the cache
+        # is invalidated again, so no answer outlives the documents it was built from
+        events.Rule(
+            self, "KnowledgeBaseIngestionCheck",
+            schedule=events.Schedule.rate(Duration.minutes(1)),
+            targets=[events_targets.LambdaFunction(
+                kb_ingestion_function,
+                event=events.RuleTargetInput.from_object({"action": "check_ingestion_job"})
+            )]
+        )
+
         # Add S3 event notification to trigger the Lambda function when objects are created/updated/deleted
         documents_bucket.add_event_notification(
             event=s3.EventType.OBJECT_CREATED, 
@@ -367,6 +623,7 @@ class DealershipAiCdkStack(Stack):
              handler="book_test_drive.lambda_handler",
              runtime=lambda_.Runtime.PYTHON_3_13,
              code=lambda_.Code.from_asset("agent_functions/"),
+             layers=[shared_layer],
              environment={
                  "TABLE_NAME": test_drive_booking_table.table_name
              }
@@ -390,10 +647,22 @@ class DealershipAiCdkStack(Stack):
             handler="query_inventory.lambda_handler",
             runtime=lambda_.Runtime.PYTHON_3_13,
             code=lambda_.Code.from_asset("agent_functions/"),
+            layers=[shared_layer, numpy_layer],
             environment={
-                "API_GATEWAY_URL": api.url
-            }
+                "API_GATEWAY_URL": api.url,
+                # "dynamodb" reads the inventory table in process; "api" calls the inventory API
+                "INVENTORY_ACCESS_MODE": "dynamodb",
+                "TABLE_NAME": car_inventory_table.table_name,
+                "INVENTORY_INDEXES": ",".join(inventory_indexes),
+                "INVENTORY_SNAPSHOT_BUCKET": inventory_snapshot_bucket.bucket_name,
+                "INVENTORY_COLUMNAR_INDEX": "true"
+            },
+            # Sized as GetCarsFunction, which holds the same columnar index
+            memory_size=1769,
+            timeout=Duration.seconds(30)
         )
+        car_inventory_table.grant_read_data(action_group_query_inventory_function)
+        inventory_snapshot_bucket.grant_read(action_group_query_inventory_function)
 
         # Grant the Lambda function permission to invoke the API using IAM auth
         # This creates the appropriate IAM policy for the Lambda execution role
@@ -433,6 +702,7 @@ class DealershipAiCdkStack(Stack):
              handler="capture_enquiry.lambda_handler",
              runtime=lambda_.Runtime.PYTHON_3_13,
              code=lambda_.Code.from_asset("agent_functions/"),
+             layers=[shared_layer],
              environment={
                  "TABLE_NAME": enquiries_table.table_name
              }
@@ -477,6 +747,7 @@ class DealershipAiCdkStack(Stack):
              handler="get_todays_date.lambda_handler",
              runtime=lambda_.Runtime.PYTHON_3_13,
              code=lambda_.Code.from_asset("agent_functions/"),
+             layers=[shared_layer],
          )
         
         ag_get_todays_date = bedrock.AgentActionGroup(
@@ -550,6 +821,8 @@ class DealershipAiCdkStack(Stack):
             self, "AgentInvokerApi",
             rest_api_name="Bedrock Agent Invoker",
             description="Car Dealership Amazon Bedrock Agent API",
+            min_compression_size=Size.bytes(response_min_compression_size),
+            binary_media_types=["*/*"],
             deploy_options=apigateway.StageOptions(
                 stage_name="prod",
                 data_trace_enabled=True,
@@ -569,7 +842,7 @@ class DealershipAiCdkStack(Stack):
             ),
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=["*"],
-                allow_methods=["POST"],
+                allow_methods=["POST", "GET"],
                 allow_headers=["Content-Type", "Authorization"]
             )
         )
@@ -581,18 +854,73 @@ class DealershipAiCdkStack(Stack):
             identity_source="method.request.header.Authorization"
         )
 
+        # Agent turns that outlast the API Gateway integration timeout are recorded here so
+        # the client can poll for the (partial) completion
+        agent_jobs_table = dynamodb.Table(
+            self, "agent-jobs",
+            partition_key=dynamodb.Attribute(
+                name="jobId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        agent_turn_environment = {
+            "AGENT_ID": agent.agent_id,
+            "AGENT_ALIAS": agent_alias.alias_id,
+            # Set to "true" to emit per-step latency metrics from agent traces
+            "AGENT_TRACE_ENABLED": "false",
+            "ANSWER_CACHE_TABLE": answer_cache_table.table_name,
+            "ANSWER_CACHE_TTL_SECONDS": "3600",
+            # Simple intents are answered directly from these action group functions
+            "INTENT_ROUTER_ENABLED": "true",
+            "TODAYS_DATE_FUNCTION": action_group_get_todays_date_function.function_name,
+            "QUERY_INVENTORY_FUNCTION": action_group_query_inventory_function.function_name,
+            # Dealership context preloaded into every turn's prompt session attributes
+            "SESSION_CONTEXT_ENABLED": "true",
+            "DEALERSHIP_TIMEZONE": "Europe/London",
+            "INVENTORY_TABLE_NAME": car_inventory_table.table_name,
+            "AGENT_JOBS_TABLE": agent_jobs_table.table_name
+        }
+
+        # Runs async agent jobs outside the API Gateway request
+        agent_worker_function = lambda_.Function(
+            self, "AgentWorkerFunction",
+            handler="agent_invoker.worker_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code= lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer],
+            environment=agent_turn_environment,
+            timeout=Duration.seconds(300)
+        )
+
         # Lambda Functions with API Gateway Integrations
         invoke_agent_function = lambda_.Function(
             self, "InvokeAgentFunction",
             handler="agent_invoker.lambda_handler",
             runtime=lambda_.Runtime.PYTHON_3_13,
             code= lambda_.Code.from_asset("functions/"),
-            environment={
-                "AGENT_ID": agent.agent_id,
-                "AGENT_ALIAS": agent_alias.alias_id
-            },
-            timeout=Duration.seconds(30)
+            layers=[shared_layer],
+            environment=dict(
+                agent_turn_environment,
+                AGENT_WORKER_FUNCTION=agent_worker_function.function_name,
+                RESPONSE_MIN_COMPRESSION_SIZE=str(response_min_compression_size)
+            ),
+            # Longer than the API Gateway limit, so a turn that outlasts the request still
+            # completes and is recorded in the jobs table
+            timeout=Duration.seconds(120)
         )
+        agent_worker_function.grant_invoke(invoke_agent_function)
+
+        for function in (invoke_agent_function, agent_worker_function):
+            answer_cache_table.grant_read_write_data(function)
+            agent_jobs_table.grant_read_write_data(function)
+            action_group_get_todays_date_function.grant_invoke(function)
+            action_group_query_inventory_function.grant_invoke(function)
+            car_inventory_table.grant_read_data(function)
+            agent_alias.grant_invoke(function)
         
         agent_resource = agent_api.root.add_resource("agent")
         agent_resource.add_method(
@@ -601,8 +929,108 @@ class DealershipAiCdkStack(Stack):
             authorizer=agent_auth,
             authorization_type=apigateway.AuthorizationType.COGNITO
         )
-        
-        agent_alias.grant_invoke(invoke_agent_function)
+
+        # GET /agent/jobs/{job_id} returns the status and (partial) completion of a job
+        agent_job_resource = agent_resource.add_resource("jobs").add_resource("{job_id}")
+        agent_job_resource.add_method(
+            "GET",
+            apigateway.LambdaIntegration(invoke_agent_function),
+            authorizer=agent_auth,
+            authorization_type=apigateway.AuthorizationType.COGNITO
+        )
+        set_preflight_content_handling(agent_api)
+
+    #---------------------------------------------------------------------------
+    # Agent Streaming API (WebSocket)
+    #---------------------------------------------------------------------------
+
+        # Streams completion chunks to the browser as they arrive. The REST API above
+        # remains available as the buffered fallback.
+        stream_agent_function = lambda_.Function(
+            self, "StreamAgentFunction",
+            handler="agent_streamer.lambda_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code= lambda_.Code.from_asset("functions/"),
+            layers=[shared_layer],
+            environment={
+                "AGENT_ID": agent.agent_id,
+                "AGENT_ALIAS": agent_alias.alias_id,
+                "AGENT_TRACE_ENABLED": "false",
+                "ANSWER_CACHE_TABLE": answer_cache_table.table_name,
+                "ANSWER_CACHE_TTL_SECONDS": "3600",
+                "INTENT_ROUTER_ENABLED": "true",
+                "TODAYS_DATE_FUNCTION": action_group_get_todays_date_function.function_name,
+                "QUERY_INVENTORY_FUNCTION": action_group_query_inventory_function.function_name,
+                # Dealership context preloaded into every turn's prompt session attributes
+                "SESSION_CONTEXT_ENABLED": "true",
+                "DEALERSHIP_TIMEZONE": "Europe/London",
+                "INVENTORY_TABLE_NAME": car_inventory_table.table_name
+            },
+            # The function keeps posting chunks to the connection after the 29s
+            # WebSocket integration timeout has passed
+            timeout=Duration.seconds(120)
+        )
+
+        agent_alias.grant_invoke(stream_agent_function)
+        answer_cache_table.grant_read_write_data(stream_agent_function)
+        action_group_get_todays_date_function.grant_invoke(stream_agent_function)
+        action_group_query_inventory_function.grant_invoke(stream_agent_function)
+        car_inventory_table.grant_read_data(stream_agent_function)
+
+        # streamFinalResponse requires the agent to invoke the model with response streaming
+        agent.role.add_to_principal_policy(
+            iam.PolicyStatement(
+                actions=["bedrock:InvokeModelWithResponseStream"],
+                resources=["*"]
+            )
+        )
+
+        stream_integration = apigatewayv2_integrations.WebSocketLambdaIntegration(
+            "StreamAgentIntegration",
+            stream_agent_function
+        )
+
+        # Verifies the Cognito ID token passed in the token query string parameter before a
+        # connection is opened
+        stream_authorizer_function = lambda_.Function(
+            self, "StreamAuthorizerFunction",
+            handler="stream_authorizer.lambda_handler",
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code=lambda_.Code.from_asset("functions/"),
+            layers=[jwt_layer],
+            environment={
+                "COGNITO_USER_POOL_ID": user_pool.user_pool_id,
+                "COGNITO_CLIENT_ID": website_client.user_pool_client_id
+            },
+            timeout=Duration.seconds(10)
+        )
+
+        stream_authorizer = apigatewayv2_authorizers.WebSocketLambdaAuthorizer(
+            "StreamAgentAuthorizer",
+            stream_authorizer_function,
+            identity_source=["route.request.querystring.token"]
+        )
+
+        agent_stream_api = apigatewayv2.WebSocketApi(
+            self, "AgentStreamApi",
+            api_name="Bedrock Agent Stream",
+            description="Car Dealership Amazon Bedrock Agent streaming API",
+            connect_route_options=apigatewayv2.WebSocketRouteOptions(
+                integration=stream_integration,
+                authorizer=stream_authorizer
+            ),
+            disconnect_route_options=apigatewayv2.WebSocketRouteOptions(integration=stream_integration),
+        )
+        agent_stream_api.add_route("sendMessage", integration=stream_integration)
+
+        agent_stream_stage = apigatewayv2.WebSocketStage(
+            self, "AgentStreamStage",
+            web_socket_api=agent_stream_api,
+            stage_name="prod",
+            auto_deploy=True
+        )
+
+        agent_stream_api.grant_manage_connections(stream_agent_function)
 
     #---------------------------------------------------------------------------
     # Dealership Website
@@ -665,6 +1093,7 @@ class DealershipAiCdkStack(Stack):
         # Update website config to include the API endpoint, Cognito details and auth info
         config_js_content = f"""
         window.API_ENDPOINT = "{agent_api.url}";
+        window.AGENT_STREAM_ENDPOINT = "{agent_stream_stage.url}";
         window.COGNITO_USER_POOL_ID = "{user_pool.user_pool_id}";
         window.COGNITO_CLIENT_ID = "{website_client.user_pool_client_id}";
         window.COGNITO_IDENTITY_POOL_ID = "{identity_pool.ref}";
@@ -673,6 +1102,18 @@ class DealershipAiCdkStack(Stack):
         window.REGION = "{self.region}";
         """
         
+        # Cold start mode of every function: "lazy" (the default) builds AWS clients on first
+        # use, "prime" builds them during init. Deploy with -c cold_start_mode=prime when
+        # using provisioned concurrency.
+        cold_start_mode = self.node.try_get_context("cold_start_mode") or "lazy"
+        for function in (
+            get_cars_function, export_inventory_function, inventory_snapshot_function, kb_ingestion_function,
+            action_group_book_test_drive_function, action_group_query_inventory_function,
+            action_group_capture_enquiry_function, action_group_get_todays_date_function,
+            agent_worker_function, invoke_agent_function, stream_agent_function
+        ):
+            function.add_environment("COLD_START_MODE", cold_start_mode)
+
         # Deploy website content to the S3 bucket
         s3deploy.BucketDeployment(
             self, "DealerWebsiteDeployment",
@@ -689,4 +1130,6 @@ class DealershipAiCdkStack(Stack):
         CfnOutput(self, 'S3DataSourceId', value=kb_data_source.data_source_id, description="Bedrock Knowledge Base data source Id")
         CfnOutput(self, 'DealershipKBDocsBucket', value= documents_bucket.bucket_name, description="Bedrock Knowledge Base - Documents S3 Bucket")
         CfnOutput(self, 'InventoryApiUrl', value= api.url, description="Vehicle Inventory API URL")
+        CfnOutput(self, 'InventoryExportBucket', value=inventory_export_bucket.bucket_name, description="Nightly NDJSON inventory exports")
         CfnOutput(self, 'AgentInvokerApiUrl', value= agent_api.url, description="Agent Invoker API URL")
+        CfnOutput(self, 'AgentStreamApiUrl', value= agent_stream_stage.url, description="Agent Streaming WebSocket API URL")
@@ -1,33 +1,55 @@
 import json
-import boto3
+import codecs
 import logging
 import os
+import time
+import uuid
 from botocore.exceptions import ClientError
 
+import agent_jobs
+import answer_cache
+import aws_clients
+import intent_router
+from http_compression import compress_response, request_body
+import session_context
+from agent_tracing import emit_trace_metrics
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize the Bedrock Agent Runtime client
-bedrock_agent_runtime = boto3.client(
-    service_name='bedrock-agent-runtime'
-)
+# Opt-in trace mode: emit per-step latency spans for every agent turn
+TRACE_ENABLED = os.environ.get('AGENT_TRACE_ENABLED', 'false').lower() == 'true'
+
+# Maximum number of cached turns replayed to the agent as conversation history
+MAX_HISTORY_TURNS = 5
+
+aws_clients.prime_on_init(services=['bedrock-agent-runtime'])
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler for invoking an Amazon Bedrock Agent.
     
+    The API treats every media type as binary, so request bodies arrive base64 encoded and
+    responses are compressed for the client's Accept-Encoding.
+    
     :param event: Event data from API Gateway
     :param context: Lambda context
     :return: API Gateway response
     """
+    if event.get('isBase64Encoded'):
+        event = dict(event, body=request_body(event), isBase64Encoded=False)
+    return compress_response(event, handle_request(event))
+
+def handle_request(event):
+    """Handle an agent API request, returning the uncompressed API Gateway response"""
     logger.info(f"Received event: {json.dumps(event)}")
     
     # Set CORS headers for browser requests
     headers = {
         'Access-Control-Allow-Origin': '*',  # Replace with your website domain in production
         'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-        'Access-Control-Allow-Methods': 'POST,OPTIONS'
+        'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
     }
     
     # Handle OPTIONS request (preflight)
@@ -39,6 +61,13 @@ def lambda_handler(event, context):
             'body': json.dumps({})
         }
     
+    # The Cognito subject of the caller, used to scope access to async jobs
+    owner = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+    
+    # Handle GET request for the status of an agent job
+    if event.get('httpMethod') == 'GET':
+        return get_job_status(event, headers, owner)
+    
     try:
         logger.info("Processing POST request")
         
@@ -113,24 +142,63 @@ def lambda_handler(event, context):
         logger.info(f"Processing request with sessionId: {session_id}")
         logger.info(f"User prompt: \"{prompt}\"")
         
-        # Agent configuration
-        agent_id = os.environ['AGENT_ID']
-        agent_alias_id = os.environ['AGENT_ALIAS']
+        # Turns answered from the cache or the intent router never reached the agent,
+        # so the client replays them
+        turn_index = body.get('turnIndex')
+        history = body.get('history')
         
-        logger.info(f"Invoking Bedrock Agent: agentId={agent_id}, agentAliasId={agent_alias_id}")
+        # The client identifies each turn with a request ID, which doubles as the job ID
+        request_id = body.get('requestId')
+        record_job = agent_jobs.is_enabled() and agent_jobs.is_valid_job_id(request_id)
+        
+        # Async mode: return a job ID straight away and run the turn in the worker function
+        if body.get('mode') == 'async':
+            if not agent_jobs.is_enabled():
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({'error': 'Async mode is not enabled'})
+                }
+            
+            job_id = request_id if record_job else str(uuid.uuid4())
+            if agent_jobs.create_job(job_id, session_id, owner):
+                agent_jobs.start_worker(job_id, {
+                    'prompt': prompt,
+                    'sessionId': session_id,
+                    'turnIndex': turn_index,
+                    'history': history
+                })
+            
+            logger.info(f"Started async job {job_id}")
+            return {
+                'statusCode': 202,
+                'headers': headers,
+                'body': json.dumps({
+                    'jobId': job_id,
+                    'sessionId': session_id,
+                    'status': 'pending'
+                })
+            }
         
-        # Invoke the Bedrock Agent
-        completion = invoke_agent(agent_id, agent_alias_id, session_id, prompt)
+        # Sync mode: also record progress against the request ID, so if API Gateway times
+        # out the client can still collect the answer from the job status endpoint
+        progress = None
+        if record_job and agent_jobs.create_job(request_id, session_id, owner):
+            progress = agent_jobs.JobProgress(request_id)
+        
+        try:
+            result = run_turn(session_id, prompt, turn_index, history, progress=progress)
+        except Exception as e:
+            if progress:
+                progress.fail(str(e))
+            raise
         
         # Return successful response
         logger.info("Sending successful response back to client")
         return {
             'statusCode': 200,
             'headers': headers,
-            'body': json.dumps({
-                'sessionId': session_id,
-                'completion': completion
-            })
+            'body': json.dumps(result)
         }
         
     except ClientError as e:
@@ -154,7 +222,149 @@ def lambda_handler(event, context):
             })
         }
 
-def invoke_agent(agent_id, agent_alias_id, session_id, prompt):
+def run_turn(session_id, prompt, turn_index=None, history=None, progress=None):
+    """
+    Answer one turn of the conversation.
+    
+    Simple intents are answered by the intent router and first-turn FAQ prompts from the
+    answer cache; everything else is sent to the Bedrock Agent.
+    
+    :param session_id: The unique identifier of the session.
+    :param prompt: The user's prompt.
+    :param turn_index: Number of turns already completed in the session.
+    :param history: Turns answered without the agent, replayed as conversation history.
+    :param progress: Optional agent_jobs.JobProgress recording the turn.
+    :return: Response dict with sessionId and completion, plus routed or cached if the
+        answer did not come from the agent.
+    """
+    result = None
+    
+    # Simple intents are answered directly from the backend without the agent
+    intent_name, completion = intent_router.route(prompt, session_id)
+    if completion is not None:
+        logger.info(f"Answered by the {intent_name} intent")
+        result = {'completion': completion, 'routed': intent_name}
+    
+    # First-turn FAQ prompts can be answered from the shared answer cache
+    cacheable = result is None and answer_cache.is_cacheable(prompt, turn_index, history)
+    if cacheable:
+        completion, cache_generation = answer_cache.get_cached_answer(prompt)
+        if completion is not None:
+            logger.info("Answered from the answer cache")
+            result = {'completion': completion, 'cached': True}
+    
+    if result is None:
+        # Agent configuration
+        agent_id = os.environ['AGENT_ID']
+        agent_alias_id = os.environ['AGENT_ALIAS']
+        
+        logger.info(f"Invoking Bedrock Agent: agentId={agent_id}, agentAliasId={agent_alias_id}")
+        
+        # Invoke the Bedrock Agent, recording each chunk of the answer as it arrives
+        completion = invoke_agent(agent_id, agent_alias_id, session_id, prompt,
+                                  session_state=build_session_state(history),
+                                  on_chunk=progress.append if progress else None)
+        
+        if cacheable:
+            answer_cache.put_cached_answer(prompt, completion, cache_generation)
+        
+        result = {'completion': completion}
+    
+    if progress:
+        progress.complete(result)
+    
+    return dict(result, sessionId=session_id)
+
+def get_job_status(event, headers, owner):
+    """
+    Handle GET /agent/jobs/{job_id}, returning the status and (partial) completion of a job.
+    
+    :param event: Event data from API Gateway
+    :param headers: CORS headers for the response
+    :param owner: The Cognito subject of the caller
+    :return: API Gateway response
+    """
+    job_id = (event.get('pathParameters') or {}).get('job_id')
+    
+    if not agent_jobs.is_enabled() or not agent_jobs.is_valid_job_id(job_id):
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': 'Invalid job ID'})
+        }
+    
+    try:
+        job = agent_jobs.get_job(job_id, owner)
+    except ClientError as e:
+        logger.error(f"Error reading job {job_id}: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'error': 'Failed to read job', 'message': str(e)})
+        }
+    
+    if not job:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({'error': f'Job {job_id} not found'})
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(job)
+    }
+
+def worker_handler(event, context):
+    """
+    AWS Lambda handler for async agent jobs, invoked asynchronously by lambda_handler.
+    
+    :param event: The job: jobId, prompt, sessionId, turnIndex and history
+    :param context: Lambda context
+    """
+    job_id = event['jobId']
+    logger.info(f"Running agent job {job_id} for sessionId: {event['sessionId']}")
+    
+    progress = agent_jobs.JobProgress(job_id)
+    progress.write('running')
+    
+    try:
+        run_turn(event['sessionId'], event['prompt'], event.get('turnIndex'), event.get('history'), progress=progress)
+    except Exception as e:
+        logger.error(f"Agent job {job_id} failed: {str(e)}")
+        progress.fail(str(e))
+
+def build_session_state(history):
+    """
+    Build the agent session state for a turn.
+    
+    Preloads the dealership context (current date and time, timezone and inventory digest)
+    as prompt session attributes, and replays turns that were answered without the agent.
+    
+    :param history: List of {'prompt': ..., 'completion': ...} turns sent by the client.
+    :return: Session state for invoke_agent, or None if there is nothing to send.
+    """
+    session_state = {}
+    
+    prompt_session_attributes = session_context.get_prompt_session_attributes()
+    if prompt_session_attributes:
+        session_state['promptSessionAttributes'] = prompt_session_attributes
+    
+    messages = []
+    for turn in (history if isinstance(history, list) else [])[-MAX_HISTORY_TURNS:]:
+        if not isinstance(turn, dict) or not turn.get('prompt') or not turn.get('completion'):
+            continue
+        messages.append({'role': 'user', 'content': [{'text': str(turn['prompt'])}]})
+        messages.append({'role': 'assistant', 'content': [{'text': str(turn['completion'])}]})
+    
+    if messages:
+        session_state['conversationHistory'] = {'messages': messages}
+    
+    return session_state or None
+
+def invoke_agent(agent_id, agent_alias_id, session_id, prompt, session_state=None, on_chunk=None,
+                 stream_final_response=False):
     """
     Sends a prompt for the agent to process and respond to.
     
@@ -162,29 +372,81 @@ def invoke_agent(agent_id, agent_alias_id, session_id, prompt):
     :param agent_alias_id: The alias of the agent to use.
     :param session_id: The unique identifier of the session.
     :param prompt: The prompt that you want the Agent to complete.
+    :param session_state: Optional session state to send with the prompt.
+    :param on_chunk: Optional callback for each completion chunk as it arrives.
+    :param stream_final_response: Ask Bedrock to stream the final response in several chunks.
     :return: Completion text from the agent.
     """
+    chunks = []
+    for text in stream_agent(agent_id, agent_alias_id, session_id, prompt, session_state=session_state,
+                             stream_final_response=stream_final_response):
+        chunks.append(text)
+        if on_chunk:
+            on_chunk(text)
+    completion = "".join(chunks)
+    
+    logger.info(f"Total response length: {len(completion)} characters")
+    
+    # Log a preview of the response (first 100 chars)
+    preview_text = completion[:100] + "..." if len(completion) > 100 else completion
+    logger.info(f"Response preview: \"{preview_text}\"")
+    
+    return completion
+
+def stream_agent(agent_id, agent_alias_id, session_id, prompt, session_state=None, stream_final_response=False,
+                 enable_trace=None):
+    """
+    Sends a prompt to the agent and yields the completion text chunk by chunk as it arrives.
+    
+    :param agent_id: The unique identifier of the agent to use.
+    :param agent_alias_id: The alias of the agent to use.
+    :param session_id: The unique identifier of the session.
+    :param prompt: The prompt that you want the Agent to complete.
+    :param session_state: Optional session state to send with the prompt.
+    :param stream_final_response: Ask Bedrock to stream the final response in several chunks
+        rather than returning it in a single chunk once orchestration has finished.
+    :param enable_trace: Request trace events and emit per-step latency metrics for the turn.
+        Defaults to the AGENT_TRACE_ENABLED environment variable.
+    :return: Generator of completion text chunks.
+    """
     try:
         logger.info("Sending request to Bedrock Agent")
-        import time
         start_time = time.time()
         
-        response = bedrock_agent_runtime.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=session_id,
-            inputText=prompt
-        )
+        request = {
+            'agentId': agent_id,
+            'agentAliasId': agent_alias_id,
+            'sessionId': session_id,
+            'inputText': prompt
+        }
+        if session_state:
+            request['sessionState'] = session_state
+        if stream_final_response:
+            request['streamingConfigurations'] = {'streamFinalResponse': True}
+        
+        if enable_trace is None:
+            enable_trace = TRACE_ENABLED
+        if enable_trace:
+            request['enableTrace'] = True
+        trace_events = []
+        
+        response = aws_clients.client('bedrock-agent-runtime').invoke_agent(**request)
         
         end_time = time.time()
         logger.info(f"Received initial response from Bedrock Agent after {(end_time - start_time) * 1000:.2f}ms")
         
         # Process streaming response
         logger.info("Processing streaming response...")
-        completion = ""
         chunk_count = 0
+        first_chunk_logged = False
+        # Decode incrementally so a multi-byte character split across chunks is not corrupted
+        decoder = codecs.getincrementaldecoder('utf-8')()
         
         for event in response.get("completion", []):
+            if "trace" in event:
+                trace_events.append((event["trace"], time.time()))
+                continue
+            
             chunk_count += 1
             
             if "chunk" not in event:
@@ -196,22 +458,29 @@ def invoke_agent(agent_id, agent_alias_id, session_id, prompt):
             if "bytes" not in chunk:
                 logger.warning(f"Chunk at position {chunk_count} has no bytes property")
                 continue
+            
+            if not first_chunk_logged:
+                logger.info(f"Received first chunk after {(time.time() - start_time) * 1000:.2f}ms")
+                first_chunk_logged = True
                 
-            completion += chunk["bytes"].decode('utf-8')
+            text = decoder.decode(chunk["bytes"])
+            if text:
+                yield text
             
             # Log every few chunks to avoid excessive logging
             if chunk_count % 5 == 0:
                 logger.info(f"Processed {chunk_count} chunks so far")
         
-        logger.info(f"Completed streaming response. Received {chunk_count} chunks.")
-        logger.info(f"Total response length: {len(completion)} characters")
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
         
-        # Log a preview of the response (first 100 chars)
-        preview_text = completion[:100] + "..." if len(completion) > 100 else completion
-        logger.info(f"Response preview: \"{preview_text}\"")
+        logger.info(f"Completed streaming response. Received {chunk_count} chunks.")
         
-        return completion
+        if enable_trace:
+            emit_trace_metrics(trace_events, session_id, (time.time() - start_time) * 1000,
+                               session_context='promptSessionAttributes' in (session_state or {}))
         
     except ClientError as e:
         logger.error(f"Couldn't invoke agent: {str(e)}")
-        raise
\ No newline at end of file
+        raise
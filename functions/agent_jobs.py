@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import re
+import time
+from botocore.exceptions import ClientError
+
+import aws_clients
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Jobs are only recorded if a table is configured
+JOBS_TABLE = os.environ.get('AGENT_JOBS_TABLE')
+WORKER_FUNCTION = os.environ.get('AGENT_WORKER_FUNCTION')
+JOB_TTL_SECONDS = int(os.environ.get('AGENT_JOB_TTL_SECONDS', '86400'))
+# Minimum interval between writes of a partial completion
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get('AGENT_JOB_PROGRESS_INTERVAL_SECONDS', '1'))
+
+# Job IDs are generated by the client (a UUID per turn)
+JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+
+aws_clients.prime_on_init(services=['lambda'] if WORKER_FUNCTION else [], tables=[JOBS_TABLE])
+
+def is_enabled():
+    """Whether an agent jobs table has been configured"""
+    return bool(JOBS_TABLE)
+
+def is_valid_job_id(job_id):
+    """Check a client supplied job ID is safe to use as a key"""
+    return isinstance(job_id, str) and bool(JOB_ID_PATTERN.match(job_id))
+
+def create_job(job_id, session_id, owner):
+    """
+    Record a new agent turn.
+
+    :param job_id: The job (turn) ID.
+    :param session_id: The agent session the turn belongs to.
+    :param owner: The Cognito subject of the caller, checked when the job is read.
+    :return: True if the job was created, False if a job with this ID already exists.
+    """
+    now = int(time.time())
+    item = {
+        'jobId': job_id,
+        'sessionId': session_id,
+        'status': 'pending',
+        'completion': '',
+        'createdAt': now,
+        'updatedAt': now,
+        'expiresAt': now + JOB_TTL_SECONDS
+    }
+    if owner:
+        item['owner'] = owner
+
+    try:
+        aws_clients.table(JOBS_TABLE).put_item(Item=item, ConditionExpression='attribute_not_exists(jobId)')
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def update_job(job_id, status, completion=None, error=None, result=None):
+    """
+    Update the status and (partial) completion of a job.
+
+    :param result: The final turn result. Its routed/cached flags are stored with the job
+        so the client knows the agent never saw the turn.
+    """
+    update_expression = 'SET #status = :status, updatedAt = :now'
+    names = {'#status': 'status'}
+    values = {':status': status, ':now': int(time.time())}
+
+    if completion is not None:
+        update_expression += ', completion = :completion'
+        values[':completion'] = completion
+    if error is not None:
+        update_expression += ', #error = :error'
+        names['#error'] = 'error'
+        values[':error'] = error
+    for flag in ('routed', 'cached'):
+        if result and result.get(flag):
+            update_expression += f', {flag} = :{flag}'
+            values[f':{flag}'] = result[flag]
+
+    aws_clients.table(JOBS_TABLE).update_item(
+        Key={'jobId': job_id},
+        UpdateExpression=update_expression,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+def get_job(job_id, owner):
+    """
+    Get a job, provided it belongs to the caller.
+
+    :return: The job as a response dict, or None if it does not exist or belongs to someone else.
+    """
+    item = aws_clients.table(JOBS_TABLE).get_item(Key={'jobId': job_id}, ConsistentRead=True).get('Item')
+
+    if not item or item.get('owner', owner) != owner:
+        return None
+
+    job = {
+        'jobId': item['jobId'],
+        'sessionId': item['sessionId'],
+        'status': item['status'],
+        'completion': item.get('completion', '')
+    }
+    for field in ('error', 'routed', 'cached'):
+        if item.get(field):
+            job[field] = item[field]
+    return job
+
+def start_worker(job_id, request):
+    """Run the agent turn in the worker function, asynchronously"""
+    aws_clients.client('lambda').invoke(
+        FunctionName=WORKER_FUNCTION,
+        InvocationType='Event',
+        Payload=json.dumps(dict(request, jobId=job_id)).encode('utf-8')
+    )
+
+class JobProgress:
+    """
+    Records the progress of an agent turn as completion chunks arrive.
+
+    Partial completions are written at most once per PROGRESS_INTERVAL_SECONDS, so a client
+    polling the job sees the answer build up without a write per chunk.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.chunks = []
+        self.last_write = 0
+
+    def append(self, text):
+        self.chunks.append(text)
+        if time.time() - self.last_write >= PROGRESS_INTERVAL_SECONDS:
+            self.write('running')
+
+    def complete(self, result):
+        self.chunks = [result['completion']]
+        self.write('complete', result=result)
+
+    def fail(self, error):
+        self.write('failed', error=error)
+
+    def write(self, status, error=None, result=None):
+        self.last_write = time.time()
+        try:
+            update_job(self.job_id, status, completion="".join(self.chunks), error=error, result=result)
+        except ClientError as e:
+            # Progress is best effort; the turn itself carries on
+            logger.error(f"Error recording progress for job {self.job_id}: {str(e)}")
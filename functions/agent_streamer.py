@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+from botocore.exceptions import ClientError
+
+import answer_cache
+import aws_clients
+import intent_router
+from agent_invoker import build_session_state, stream_agent
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler for the agent streaming WebSocket API.
+
+    Handles the $connect, $disconnect and sendMessage routes. Completion chunks from the
+    Bedrock Agent are pushed to the caller's connection as soon as they arrive.
+
+    :param event: Event data from the API Gateway WebSocket API
+    :param context: Lambda context
+    :return: API Gateway WebSocket response
+    """
+    request_context = event.get('requestContext', {})
+    route_key = request_context.get('routeKey')
+    connection_id = request_context.get('connectionId')
+
+    logger.info(f"Received {route_key} event for connection {connection_id}")
+
+    if route_key == '$connect':
+        return handle_connect(event)
+
+    if route_key == '$disconnect':
+        return {'statusCode': 200}
+
+    return handle_message(event, connection_id)
+
+def handle_connect(event):
+    """
+    Accept a new WebSocket connection. The Cognito ID token in the query string has already
+    been verified by the $connect route's authorizer (stream_authorizer).
+    """
+    principal_id = event['requestContext'].get('authorizer', {}).get('principalId')
+    logger.info(f"Connection accepted for user {principal_id}")
+    return {'statusCode': 200}
+
+def handle_message(event, connection_id):
+    """Invoke the agent and stream each completion chunk back over the WebSocket"""
+    request_context = event['requestContext']
+    client = get_management_client(request_context['domainName'], request_context['stage'])
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse message body: {str(e)}")
+        post_message(client, connection_id, {'type': 'error', 'error': 'Invalid JSON in message body'})
+        return {'statusCode': 400}
+
+    prompt = body.get('prompt')
+    session_id = body.get('sessionId')
+
+    if not prompt or not session_id:
+        logger.error("Missing required parameter: prompt or sessionId")
+        post_message(client, connection_id, {'type': 'error', 'error': 'Missing required parameter: prompt or sessionId'})
+        return {'statusCode': 400}
+
+    logger.info(f"Streaming request with sessionId: {session_id}")
+
+    # Turns answered from the cache or the intent router never reached the agent,
+    # so the client replays them
+    history = body.get('history')
+    cacheable = answer_cache.is_cacheable(prompt, body.get('turnIndex'), history)
+
+    # Agent configuration
+    agent_id = os.environ['AGENT_ID']
+    agent_alias_id = os.environ['AGENT_ALIAS']
+
+    try:
+        intent_name, completion = intent_router.route(prompt, session_id)
+        if completion is not None:
+            post_message(client, connection_id, {'type': 'chunk', 'text': completion})
+            post_message(client, connection_id, {'type': 'done', 'sessionId': session_id, 'routed': intent_name})
+            return {'statusCode': 200}
+
+        if cacheable:
+            completion, cache_generation = answer_cache.get_cached_answer(prompt)
+            if completion is not None:
+                post_message(client, connection_id, {'type': 'chunk', 'text': completion})
+                post_message(client, connection_id, {'type': 'done', 'sessionId': session_id, 'cached': True})
+                return {'statusCode': 200}
+
+        chunks = []
+        for text in stream_agent(agent_id, agent_alias_id, session_id, prompt,
+                                 session_state=build_session_state(history), stream_final_response=True):
+            chunks.append(text)
+            if not post_message(client, connection_id, {'type': 'chunk', 'text': text}):
+                logger.warning("Connection closed by client, abandoning stream")
+                return {'statusCode': 200}
+
+        post_message(client, connection_id, {'type': 'done', 'sessionId': session_id})
+
+        if cacheable:
+            answer_cache.put_cached_answer(prompt, "".join(chunks), cache_generation)
+
+    except Exception as e:
+        logger.error(f"Error streaming agent response: {str(e)}")
+        post_message(client, connection_id, {'type': 'error', 'error': 'Failed to invoke Bedrock Agent'})
+        return {'statusCode': 500}
+
+    return {'statusCode': 200}
+
+def get_management_client(domain_name, stage):
+    """Get an API Gateway Management API client for the WebSocket endpoint"""
+    return aws_clients.client('apigatewaymanagementapi', endpoint_url=f"https://{domain_name}/{stage}")
+
+def post_message(client, connection_id, message):
+    """Send a message to the WebSocket connection, returning False if the client has gone away"""
+    try:
+        client.post_to_connection(ConnectionId=connection_id, Data=json.dumps(message).encode('utf-8'))
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'GoneException':
+            return False
+        raise
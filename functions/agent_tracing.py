@@ -0,0 +1,154 @@
+import logging
+
+from metrics import put_metrics
+
+logger = logging.getLogger()
+
+# Orchestration invocation types mapped to the span names we report them under
+INVOCATION_SPANS = {
+    'ACTION_GROUP': 'action_group',
+    'ACTION_GROUP_CODE_INTERPRETER': 'code_interpreter',
+    'KNOWLEDGE_BASE': 'knowledge_base_lookup',
+    'AGENT_COLLABORATOR': 'agent_collaborator'
+}
+
+def build_spans(trace_events):
+    """
+    Convert Bedrock Agent trace events into per-step timing spans.
+
+    Each trace part is keyed by the traceId of the step it belongs to. A span runs from the
+    first event of a step (or sub-step) to the last one. Where Bedrock reports its own
+    timing in the output metadata (totalTimeMs) that figure is used instead.
+
+    :param trace_events: List of (trace, received_at) tuples, where trace is the 'trace'
+        member of an InvokeAgent response event and received_at is the epoch time in
+        seconds the event was received.
+    :return: List of span dicts with span, step, name, durationMs and token usage.
+    """
+    spans = {}
+
+    def record(key, span, step, timestamp, name=None, metadata=None):
+        entry = spans.setdefault(key, {
+            'span': span,
+            'step': step,
+            'name': name,
+            'start': timestamp,
+            'end': timestamp
+        })
+        entry['start'] = min(entry['start'], timestamp)
+        entry['end'] = max(entry['end'], timestamp)
+        if name and not entry['name']:
+            entry['name'] = name
+        if metadata:
+            entry['metadata'] = metadata
+
+    for trace, received_at in trace_events:
+        event_time = trace.get('eventTime')
+        timestamp = event_time.timestamp() if hasattr(event_time, 'timestamp') else received_at
+        detail = trace.get('trace', {})
+
+        for phase, span in (('preProcessingTrace', 'pre_processing'), ('postProcessingTrace', 'post_processing')):
+            if phase not in detail:
+                continue
+            for part in detail[phase].values():
+                trace_id = part.get('traceId')
+                record(('phase', phase, trace_id), span, trace_id, timestamp, metadata=part.get('metadata'))
+
+        if 'orchestrationTrace' in detail:
+            for part_name, part in detail['orchestrationTrace'].items():
+                trace_id = part.get('traceId')
+                record(('step', trace_id), 'orchestration_step', trace_id, timestamp)
+
+                if part_name in ('modelInvocationInput', 'modelInvocationOutput'):
+                    record(('model', trace_id), 'model_invocation', trace_id, timestamp, metadata=part.get('metadata'))
+
+                elif part_name in ('invocationInput', 'observation'):
+                    invocation_type = part.get('invocationType') or part.get('type')
+                    span = INVOCATION_SPANS.get(invocation_type)
+                    if not span:
+                        continue
+                    name, metadata = invocation_details(part)
+                    record(('invocation', trace_id), span, trace_id, timestamp, name=name, metadata=metadata)
+
+        if 'failureTrace' in detail:
+            trace_id = detail['failureTrace'].get('traceId')
+            record(('failure', trace_id), 'failure', trace_id, timestamp,
+                   name=detail['failureTrace'].get('failureReason'))
+
+    result = []
+    for entry in spans.values():
+        metadata = entry.pop('metadata', None) or {}
+        usage = metadata.get('usage', {})
+        total_time_ms = metadata.get('totalTimeMs')
+
+        result.append({
+            'span': entry['span'],
+            'step': entry['step'],
+            'name': entry['name'],
+            'durationMs': total_time_ms if total_time_ms is not None else round((entry['end'] - entry['start']) * 1000, 2),
+            'inputTokens': usage.get('inputTokens'),
+            'outputTokens': usage.get('outputTokens')
+        })
+
+    return result
+
+def invocation_details(part):
+    """Get the action group or knowledge base name and the output metadata of an invocation"""
+    for key in ('actionGroupInvocationInput', 'actionGroupInvocationOutput'):
+        if key in part:
+            return part[key].get('actionGroupName'), part[key].get('metadata')
+
+    for key in ('knowledgeBaseLookupInput', 'knowledgeBaseLookupOutput'):
+        if key in part:
+            return part[key].get('knowledgeBaseId'), part[key].get('metadata')
+
+    for key in ('agentCollaboratorInvocationInput', 'agentCollaboratorInvocationOutput'):
+        if key in part:
+            return part[key].get('agentCollaboratorName'), part[key].get('metadata')
+
+    return None, None
+
+def emit_trace_metrics(trace_events, session_id, turn_duration_ms, session_context=False):
+    """
+    Emit one structured metric record per span, plus a per-turn summary, tagged with the sessionId.
+
+    :param trace_events: List of (trace, received_at) tuples collected during the turn.
+    :param session_id: The agent session the turn belongs to.
+    :param turn_duration_ms: Wall clock duration of the whole turn.
+    :param session_context: Whether dealership context was preloaded into the turn's prompt
+        session attributes. The turn summary is dimensioned by it so the number of
+        orchestration steps per turn can be compared with and without it.
+    :return: The spans that were emitted.
+    """
+    spans = build_spans(trace_events)
+
+    for span in spans:
+        metrics = {'SpanDuration': span['durationMs']}
+        units = {'SpanDuration': 'Milliseconds'}
+        for field, metric in (('inputTokens', 'InputTokens'), ('outputTokens', 'OutputTokens')):
+            if span[field] is not None:
+                metrics[metric] = span[field]
+                units[metric] = 'Count'
+
+        put_metrics(
+            metrics,
+            dimensions={'Span': span['span']},
+            properties={'sessionId': session_id, 'traceId': span['step'], 'name': span['name']},
+            units=units
+        )
+
+    put_metrics(
+        {
+            'TurnDuration': turn_duration_ms,
+            'OrchestrationSteps': sum(1 for span in spans if span['span'] == 'orchestration_step'),
+            'ActionGroupCalls': sum(1 for span in spans if span['span'] == 'action_group'),
+            'InputTokens': sum(span['inputTokens'] or 0 for span in spans),
+            'OutputTokens': sum(span['outputTokens'] or 0 for span in spans)
+        },
+        dimensions={'Span': 'turn', 'SessionContext': 'enabled' if session_context else 'disabled'},
+        properties={'sessionId': session_id},
+        units={'OrchestrationSteps': 'Count', 'ActionGroupCalls': 'Count', 'InputTokens': 'Count', 'OutputTokens': 'Count'}
+    )
+
+    logger.info(f"Emitted {len(spans)} trace spans for session {session_id}")
+    return spans
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from botocore.exceptions import ClientError
+
+import aws_clients
+
+logger = logging.getLogger()
+
+# The cache is disabled unless a table is configured
+TABLE_NAME = os.environ.get('ANSWER_CACHE_TABLE')
+TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '3600'))
+# The table is used as a direct-mapped cache: each prompt hashes to one of a fixed number
+# of slots, which bounds the number of items no matter how many distinct prompts we see
+SLOT_COUNT = int(os.environ.get('ANSWER_CACHE_SLOTS', '1024'))
+MAX_ANSWER_BYTES = int(os.environ.get('ANSWER_CACHE_MAX_ANSWER_BYTES', '16384'))
+MAX_PROMPT_LENGTH = 200
+
+# Item holding the cache generation. Bumping it invalidates every cached answer. While a
+# knowledge base ingestion job is running, the item also holds its ID, and no answers are
+# cached: they would be built from the documents being replaced.
+GENERATION_KEY = '__generation__'
+
+# Prompts containing personal details are never cached or served from the cache
+PERSONAL_DATA_PATTERN = re.compile(r'[^\s@]+@[^\s@]+|\d{5,}|\d{3}[\s-]\d{3}')
+
+aws_clients.prime_on_init(tables=[TABLE_NAME])
+
+def is_enabled():
+    """Whether an answer cache table has been configured"""
+    return bool(TABLE_NAME)
+
+def normalise_prompt(prompt):
+    """Normalise a prompt so trivially different phrasings share a cache entry"""
+    text = unicodedata.normalize('NFKC', prompt).lower()
+    text = re.sub(r"[^\w\s£']", ' ', text)
+    return ' '.join(text.split())
+
+def is_cacheable(prompt, turn_index, history=None):
+    """
+    Only first-turn, context-free prompts are answered from the cache. Later turns depend
+    on the conversation so far, and prompts with personal details must never be shared.
+    """
+    return (
+        is_enabled()
+        and turn_index == 0
+        and not history
+        and len(prompt) <= MAX_PROMPT_LENGTH
+        and not PERSONAL_DATA_PATTERN.search(prompt)
+    )
+
+def cache_key(prompt):
+    """Get the slot key and the full hash of a normalised prompt"""
+    prompt_hash = hashlib.sha256(normalise_prompt(prompt).encode('utf-8')).hexdigest()
+    return f"slot#{int(prompt_hash, 16) % SLOT_COUNT}", prompt_hash
+
+def get_cached_answer(prompt):
+    """
+    Look up a cached answer for the prompt.
+
+    The slot and the current generation are read together in one strongly consistent
+    BatchGetItem, so an invalidation is seen by every container immediately.
+
+    :param prompt: The user's prompt.
+    :return: Tuple of (cached completion or None, current cache generation). The generation
+        is None if the cache could not be read or an ingestion job is running, in which case
+        nothing should be stored.
+    """
+    slot_key, prompt_hash = cache_key(prompt)
+
+    try:
+        response = aws_clients.resource('dynamodb').batch_get_item(
+            RequestItems={
+                TABLE_NAME: {
+                    'Keys': [{'cacheKey': slot_key}, {'cacheKey': GENERATION_KEY}],
+                    'ConsistentRead': True
+                }
+            }
+        )
+    except ClientError as e:
+        # The cache is an optimisation; fall through to the agent if it is unavailable
+        logger.error(f"Error reading answer cache: {str(e)}")
+        return None, None
+
+    items = {item['cacheKey']: item for item in response['Responses'].get(TABLE_NAME, [])}
+
+    generation = int(items.get(GENERATION_KEY, {}).get('generation', 0))
+    entry = items.get(slot_key)
+
+    if (entry
+            and entry.get('promptHash') == prompt_hash
+            and int(entry.get('generation', -1)) == generation
+            and int(entry.get('expiresAt', 0)) > time.time()):
+        logger.info(f"Answer cache hit for {slot_key}")
+        return entry['completion'], generation
+
+    if items.get(GENERATION_KEY, {}).get('ingestionJobId'):
+        logger.info(f"Answer cache miss for {slot_key}, not caching while the knowledge base is ingesting")
+        return None, None
+
+    logger.info(f"Answer cache miss for {slot_key}")
+    return None, generation
+
+def put_cached_answer(prompt, completion, generation):
+    """
+    Store an answer in the prompt's slot, replacing whatever was there.
+
+    :param prompt: The user's prompt.
+    :param completion: The agent's answer.
+    :param generation: The cache generation read before the agent was invoked. If an
+        invalidation happened in the meantime the entry is stale on arrival and never served.
+    """
+    if generation is None or not completion or len(completion.encode('utf-8')) > MAX_ANSWER_BYTES:
+        return
+
+    slot_key, prompt_hash = cache_key(prompt)
+
+    try:
+        aws_clients.table(TABLE_NAME).put_item(Item={
+            'cacheKey': slot_key,
+            'promptHash': prompt_hash,
+            'generation': generation,
+            'completion': completion,
+            'expiresAt': int(time.time()) + TTL_SECONDS
+        })
+    except ClientError as e:
+        logger.error(f"Error writing answer cache: {str(e)}")
+
+def invalidate(ingestion_job_id=None):
+    """
+    Invalidate every cached answer by bumping the cache generation.
+
+    :param ingestion_job_id: Optional ID of a knowledge base ingestion job just started. No
+        answers are cached until end_ingestion is called for it.
+    """
+    update = {
+        'UpdateExpression': 'ADD generation :one',
+        'ExpressionAttributeValues': {':one': 1}
+    }
+    if ingestion_job_id:
+        update['UpdateExpression'] += ' SET ingestionJobId = :job'
+        update['ExpressionAttributeValues'][':job'] = ingestion_job_id
+
+    response = aws_clients.table(TABLE_NAME).update_item(
+        Key={'cacheKey': GENERATION_KEY},
+        ReturnValues='UPDATED_NEW',
+        **update
+    )
+    generation = int(response['Attributes']['generation'])
+    logger.info(f"Answer cache invalidated, now at generation {generation}")
+    return generation
+
+def running_ingestion_job():
+    """The ID of the ingestion job answers are not cached during, or None"""
+    response = aws_clients.table(TABLE_NAME).get_item(Key={'cacheKey': GENERATION_KEY}, ConsistentRead=True)
+    return response.get('Item', {}).get('ingestionJobId')
+
+def end_ingestion(ingestion_job_id):
+    """
+    Invalidate every cached answer again once an ingestion job has finished, and cache
+    answers again. Any answer cached while the job ran was built from the old documents.
+    Nothing is done if another job has started since.
+
+    :return: The new cache generation, or None if another job is running.
+    """
+    try:
+        response = aws_clients.table(TABLE_NAME).update_item(
+            Key={'cacheKey': GENERATION_KEY},
+            UpdateExpression='ADD generation :one REMOVE ingestionJobId',
+            ConditionExpression='ingestionJobId = :job',
+            ExpressionAttributeValues={':one': 1, ':job': ingestion_job_id},
+            ReturnValues='UPDATED_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info(f"Ingestion job {ingestion_job_id} finished, but another job has started since")
+            return None
+        raise
+    generation = int(response['Attributes']['generation'])
+    logger.info(f"Ingestion job {ingestion_job_id} finished, answer cache now at generation {generation}")
+    return generation
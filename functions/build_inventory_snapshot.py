@@ -0,0 +1,32 @@
+import logging
+import os
+
+import aws_clients
+from inventory_snapshot import apply_changes, rebuild_snapshot
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# The snapshot is written to INVENTORY_SNAPSHOT_BUCKET (see inventory_snapshot)
+TABLE_NAME = os.environ['TABLE_NAME']
+
+aws_clients.prime_on_init(services=['dynamodb', 's3'])
+
+def lambda_handler(event, context):
+    """
+    Maintain the inventory snapshot served by the inventory API and the query_inventory
+    action group.
+
+    Invoked with batches of records from the car inventory table's DynamoDB stream, which
+    are applied to the snapshot incrementally, and on a schedule (any other event), which
+    rebuilds it from the table. The rebuild repairs any change the stream processing missed
+    and refreshes the snapshot's updated-at time, which readers check for staleness.
+    """
+    records = event.get('Records') if isinstance(event, dict) else None
+    if records:
+        result = apply_changes(TABLE_NAME, records)
+        logger.info(f"Applied {len(records)} changes to inventory snapshot {result['version']} ({result['cars']} cars)")
+    else:
+        result = rebuild_snapshot(TABLE_NAME)
+        logger.info(f"Rebuilt inventory snapshot {result['version']} ({result['cars']} cars)")
+    return result
@@ -0,0 +1,43 @@
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import aws_clients
+from inventory_store import export_inventory
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# The nightly inventory feed is written to this bucket as NDJSON, one car per line
+TABLE_NAME = os.environ['TABLE_NAME']
+EXPORT_BUCKET = os.environ['EXPORT_BUCKET']
+EXPORT_PREFIX = os.environ.get('EXPORT_PREFIX', 'inventory/')
+
+aws_clients.prime_on_init(services=['dynamodb', 's3'])
+
+def lambda_handler(event, context):
+    """
+    Export the full inventory to S3 as NDJSON, for nightly feeds.
+
+    Cars are streamed from a parallel scan to a temporary file, then uploaded (as a multipart
+    upload for large files), so memory use does not grow with the inventory. The export is
+    written to <prefix><date>.ndjson and copied to <prefix>latest.ndjson.
+    """
+    date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    key = f"{EXPORT_PREFIX}{date}.ndjson"
+    s3 = aws_clients.client('s3')
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.ndjson') as f:
+        count = export_inventory(TABLE_NAME, f)
+        f.flush()
+        s3.upload_file(f.name, EXPORT_BUCKET, key, ExtraArgs={'ContentType': 'application/x-ndjson'})
+
+    s3.copy_object(
+        Bucket=EXPORT_BUCKET,
+        Key=f"{EXPORT_PREFIX}latest.ndjson",
+        CopySource={'Bucket': EXPORT_BUCKET, 'Key': key}
+    )
+
+    logger.info(f"Exported {count} cars to s3://{EXPORT_BUCKET}/{key}")
+    return {'bucket': EXPORT_BUCKET, 'key': key, 'count': count}
@@ -1,57 +1,125 @@
+import io
 import json
 import os
-import boto3
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
 
-# Custom JSON encoder for Decimal type
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+import aws_clients
+from http_compression import compress_response, header
+from inventory_index import inventory_json
+from inventory_recommend import parse_recommendation, recommend_json
+from inventory_snapshot import SNAPSHOT_BUCKET, get_snapshot
+from inventory_store import (
+    InvalidFilter, content_version, export_inventory, parse_filters, parse_ids, parse_page, parse_view
+)
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+# DynamoDB table, read with the low-level client from the shared client layer. The full list
+# of cars is served from the inventory snapshot in S3 when there is one.
+TABLE_NAME = os.environ['TABLE_NAME']
+aws_clients.prime_on_init(services=['dynamodb', 's3'] if SNAPSHOT_BUCKET else ['dynamodb'])
+
+# Cache-Control for inventory responses. "no-cache" lets clients keep a response but
+# revalidate it (If-None-Match) before each use; "private, max-age=30" would let them reuse
+# it for 30 seconds without asking.
+CACHE_CONTROL = os.environ.get('INVENTORY_CACHE_CONTROL', 'private, no-cache')
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches the ETag (a weak comparison, as for GET)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+def with_validators(event, response, version=None):
+    """
+    Add a content-based ETag and Cache-Control to a successful response, replacing it with
+    a 304 Not Modified if it matches the client's If-None-Match.
+
+    :param version: The body's version tag if already known (the snapshot's), otherwise it
+        is hashed.
+    """
+    etag = f'"{version or content_version(response["body"])}"'
+    response['headers'].update({'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+    if etag_matches(header(event, 'if-none-match'), etag):
+        headers = {name: value for name, value in response['headers'].items() if name != 'Content-Type'}
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return response
 
 def lambda_handler(event, context):
+    """
+    GET /cars (optionally filtered, a page at a time with ?limit= and ?cursor=, or ?ids= for a
+    batch lookup, in the full or compact ?view=), /cars/recommend (the cars best matching
+    ?prefer=, see inventory_recommend) and /cars/{car_id}.
+
+    Responses are compressed (base64 encoded, for API Gateway) when the client accepts gzip,
+    deflate or br; the snapshot's stored gzip copy is sent as is.
+    """
     try:
+        # Recommendations: the filters are hard constraints, the preferences rank the cars
+        if event.get('resource') == '/cars/recommend':
+            status_code, body = recommend_json(TABLE_NAME, parse_recommendation(event.get('queryStringParameters')))
+            return compress_response(event, with_validators(event, {
+                'statusCode': status_code,
+                'headers': {'Content-Type': 'application/json'},
+                'body': body
+            }))
+
         # Check if car_id path parameter exists
+        car_id = None
         if 'pathParameters' in event and event['pathParameters'] and 'car_id' in event['pathParameters']:
             car_id = event['pathParameters']['car_id']
-            response = table.get_item(Key={'id': car_id})
-            
-            if 'Item' not in response:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json'},
-                    'body': json.dumps({'message': f'Car with ID {car_id} not found'})
-                }
-            
-            return {
+
+        # Filter query parameters for the list of cars, its page and view, and the IDs of a batch lookup
+        query = event.get('queryStringParameters') or {}
+        filters = parse_filters(query) if not car_id else None
+        page = parse_page(query, filters) if not car_id else None
+        view = parse_view(query) if not car_id else 'full'
+        car_ids = parse_ids(query.get('ids')) if not car_id else []
+        if page and car_ids:
+            raise InvalidFilter("Invalid parameters: limit and cursor are not available for a lookup by ids")
+
+        # Full export: a parallel scan written out as NDJSON, one car per line
+        output_format = query.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            raise InvalidFilter(f"Invalid format: {output_format} (expected json or ndjson)")
+        if output_format == 'ndjson' and (car_ids or page):
+            raise InvalidFilter("Invalid format: ndjson is not available for a lookup by ids or a page")
+        if output_format == 'ndjson' and not car_id:
+            out = io.StringIO()
+            export_inventory(TABLE_NAME, out, filters, view=view)
+            return compress_response(event, with_validators(event, {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(response['Item'], cls=DecimalEncoder)
-            }
-        else:
-            # Get all cars
-            response = table.scan()
-            cars = response['Items']
-            
-            # Handle pagination
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-                cars.extend(response['Items'])
-                
-            return {
+                'headers': {'Content-Type': 'application/x-ndjson'},
+                'body': out.getvalue()
+            }))
+
+        # The full unfiltered list comes from the inventory snapshot, unless it is missing or stale
+        full_list = not car_id and not car_ids and not filters and not page and view == 'full'
+        snapshot = get_snapshot() if full_list else None
+        if snapshot:
+            return compress_response(event, with_validators(event, {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(cars, cls=DecimalEncoder)
-            }
+                'headers': {'Content-Type': 'application/json', 'X-Inventory-Version': snapshot['version']},
+                'body': snapshot['body']
+            }, snapshot['version']), snapshot.get('compressed'))
+
+        # The lookup is shared with the query_inventory action group's direct DynamoDB mode. Lists
+        # come from the columnar inventory index when it is enabled.
+        status_code, body = inventory_json(TABLE_NAME, car_id, filters, car_ids, page, view)
+
+        response = {
+            'statusCode': status_code,
+            'headers': {'Content-Type': 'application/json'},
+            'body': body
+        }
+        return compress_response(event, with_validators(event, response) if status_code == 200 else response)
+    except InvalidFilter as e:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'message': str(e)})
+        }
     except Exception as e:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json'},
             'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        }
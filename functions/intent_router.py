@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+import aws_clients
+from answer_cache import normalise_prompt
+from metrics import put_metrics
+
+logger = logging.getLogger()
+
+# Set to "false" to send every prompt to the agent
+ROUTER_ENABLED = os.environ.get('INTENT_ROUTER_ENABLED', 'true').lower() == 'true'
+
+# Action group functions the router answers from
+TODAYS_DATE_FUNCTION = os.environ.get('TODAYS_DATE_FUNCTION')
+QUERY_INVENTORY_FUNCTION = os.environ.get('QUERY_INVENTORY_FUNCTION')
+
+aws_clients.prime_on_init(services=['lambda'] if ROUTER_ENABLED else [])
+
+# Registered intents, checked in order
+INTENTS = []
+
+def intent(name, patterns, enabled=True):
+    """
+    Register a handler for a simple intent that can be answered without the agent.
+
+    Patterns are matched against the whole normalised prompt (see normalise_prompt), so
+    only short, unambiguous requests are routed. The handler is called with the normalised
+    prompt and returns the answer text, or None to fall through to the agent.
+
+    :param name: Intent name, used as the metric dimension.
+    :param patterns: List of regular expressions.
+    :param enabled: Whether the intent is active, e.g. if the function it needs is configured.
+    """
+    def register(handler):
+        if enabled:
+            INTENTS.append({
+                'name': name,
+                'patterns': [re.compile(pattern) for pattern in patterns],
+                'handler': handler
+            })
+        return handler
+    return register
+
+def route(prompt, session_id):
+    """
+    Answer the prompt directly if it matches a registered intent.
+
+    :param prompt: The user's prompt.
+    :param session_id: The agent session, recorded with the routing metric.
+    :return: Tuple of (intent name, answer), or (None, None) if the agent should handle it.
+    """
+    if not ROUTER_ENABLED:
+        return None, None
+
+    start_time = time.time()
+    normalised = normalise_prompt(prompt)
+
+    for registered in INTENTS:
+        if not any(pattern.fullmatch(normalised) for pattern in registered['patterns']):
+            continue
+
+        try:
+            answer = registered['handler'](normalised)
+        except Exception as e:
+            logger.error(f"Intent {registered['name']} failed, falling through to agent: {str(e)}")
+            answer = None
+
+        if answer:
+            record_decision(registered['name'], session_id, start_time)
+            return registered['name'], answer
+
+    record_decision('agent', session_id, start_time)
+    return None, None
+
+def record_decision(route_name, session_id, start_time):
+    """Record the routing decision so the router hit rate can be tracked"""
+    latency_ms = (time.time() - start_time) * 1000
+    logger.info(f"Routed prompt to {route_name} in {latency_ms:.2f}ms")
+
+    put_metrics(
+        {'RouterHit': 0 if route_name == 'agent' else 1, 'RouterLatency': latency_ms},
+        dimensions={'Route': route_name},
+        properties={'sessionId': session_id},
+        units={'RouterHit': 'Count'},
+        rollup=True
+    )
+
+def invoke_action_group(function_name, event):
+    """Invoke an action group Lambda function directly with a Bedrock Agent style event"""
+    response = aws_clients.client('lambda').invoke(
+        FunctionName=function_name,
+        Payload=json.dumps(dict(event, messageVersion='1.0')).encode('utf-8')
+    )
+
+    if response.get('FunctionError'):
+        raise RuntimeError(f"{function_name} returned an error: {response['Payload'].read().decode('utf-8')}")
+
+    return json.loads(response['Payload'].read())['response']
+
+@intent('todays_date', [
+    r"(what'?s|what is|whats) (the date|today'?s date|the date today|todays date)( today)?",
+    r"what (day|date) is (it|today)( today)?",
+    r"(what'?s|what is|whats) today"
+], enabled=bool(TODAYS_DATE_FUNCTION))
+def todays_date(prompt):
+    """Answer from the get_todays_date action group"""
+    response = invoke_action_group(TODAYS_DATE_FUNCTION, {
+        'agent': {'name': 'intent-router'},
+        'actionGroup': 'get_todays_date',
+        'function': 'get_current_date',
+        'parameters': []
+    })
+    body = response['functionResponse']['responseBody']['TEXT']['body']
+
+    # The action group answers "Current date and time: YYYY-MM-DD HH:MM:SS"
+    current = datetime.strptime(body.split(': ', 1)[1], "%Y-%m-%d %H:%M:%S")
+    return f"Today is {current.strftime('%A')} {current.day} {current.strftime('%B %Y')}."
+
+@intent('all_cars', [
+    r"(show|list|tell) (me )?(all )?(of )?(your|the) (cars|vehicles|stock|inventory)",
+    r"what (cars|vehicles) (do you have|have you got)( in stock| available)?",
+    r"(show me )?all (of )?(your )?(cars|vehicles)"
+], enabled=bool(QUERY_INVENTORY_FUNCTION))
+def all_cars(prompt):
+    """Answer from the query_inventory action group, formatted like the agent's vehicle listings"""
+    response = invoke_action_group(QUERY_INVENTORY_FUNCTION, {
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': '/cars',
+        'httpMethod': 'GET',
+        'parameters': []
+    })
+
+    if response.get('httpStatusCode') != 200:
+        return None
+
+    # The first page of the inventory, with a next_cursor if there is more
+    page = json.loads(response['responseBody']['application/json']['body'])
+    cars = page.get('cars') if isinstance(page, dict) else page
+    if not isinstance(cars, list) or not cars:
+        return None
+
+    listings = []
+    for car in cars:
+        listing = f"{car.get('make')} {car.get('model')} {car.get('variant', '')}".strip()
+        listing += f"\n£{car.get('price_gbp', 0):,.0f} - {int(car.get('year', 0))}"
+        listing += f"\n{car.get('engine', {}).get('type', '')}"
+        if car.get('status') and car['status'] != 'available':
+            listing += f" ({car['status'].replace('_', ' ')})"
+        listings.append(listing)
+
+    if isinstance(page, dict) and page.get('next_cursor'):
+        return ("Here are some of the vehicles we currently have in stock:\n\n" + "\n\n".join(listings) +
+                "\n\nWe have more in stock. Tell me the make, budget or fuel type you're after and I'll narrow it down.")
+    return "Here are the vehicles we currently have in stock:\n\n" + "\n\n".join(listings)
@@ -1,14 +1,46 @@
 import json
-import boto3
 import os
 import uuid
 import logging
 import time
+from botocore.exceptions import ClientError
+
+import answer_cache
+import aws_clients
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-bedrock_agent = boto3.client('bedrock-agent')
+aws_clients.prime_on_init(services=['bedrock-agent'])
+
+# Statuses of an ingestion job that has finished
+FINISHED_STATUSES = ('COMPLETE', 'FAILED', 'STOPPED')
+
+def check_ingestion_job(knowledge_base_id, data_source_id):
+    """
+    Run on a schedule: once the ingestion job answers are not cached during has finished,
+    invalidate the answer cache again (see answer_cache.end_ingestion). Answers cached while it
+    ran would otherwise outlive the documents they were built from.
+    """
+    ingestion_job_id = answer_cache.running_ingestion_job() if answer_cache.is_enabled() else None
+    if not ingestion_job_id:
+        return {'statusCode': 200, 'body': json.dumps({'message': 'No ingestion job running'})}
+
+    try:
+        status = aws_clients.client('bedrock-agent').get_ingestion_job(
+            knowledgeBaseId=knowledge_base_id,
+            dataSourceId=data_source_id,
+            ingestionJobId=ingestion_job_id
+        )['ingestionJob']['status']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            raise
+        status = 'NOT_FOUND'
+    logger.info(f"Ingestion job {ingestion_job_id} is {status}")
+
+    if status in FINISHED_STATUSES + ('NOT_FOUND',):
+        answer_cache.end_ingestion(ingestion_job_id)
+    return {'statusCode': 200, 'body': json.dumps({'ingestionJobId': ingestion_job_id, 'status': status})}
 
 def lambda_handler(event, context):
     knowledge_base_id = os.environ.get('KNOWLEDGE_BASE_ID')
@@ -21,6 +53,9 @@ def lambda_handler(event, context):
             'body': json.dumps('Missing required environment variables')
         }
     
+    if event.get('action') == 'check_ingestion_job':
+        return check_ingestion_job(knowledge_base_id, data_source_id)
+
     logger.info(f"Processing S3 event for knowledge base {knowledge_base_id}, data source {data_source_id}")
     logger.info(f"Event details: {json.dumps(event)}")
     
@@ -29,7 +64,7 @@ def lambda_handler(event, context):
         time.sleep(2)
         
         # Start the ingestion job
-        response = bedrock_agent.start_ingestion_job(
+        response = aws_clients.client('bedrock-agent').start_ingestion_job(
             dataSourceId=data_source_id,
             knowledgeBaseId=knowledge_base_id,
             description=f"Auto-triggered ingestion job from S3 event at {time.strftime('%Y-%m-%d %H:%M:%S')}",
@@ -39,6 +74,11 @@ def lambda_handler(event, context):
         ingestion_job_id = response['ingestionJob']['ingestionJobId']
         logger.info(f"Started ingestion job with ID: {ingestion_job_id}")
         
+        # Cached agent answers may be based on the documents being replaced. None are cached
+        # until the job has finished (see check_ingestion_job).
+        if answer_cache.is_enabled():
+            answer_cache.invalidate(ingestion_job_id)
+        
         return {
             'statusCode': 200,
             'body': json.dumps({
@@ -0,0 +1,112 @@
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import aws_clients
+from inventory_store import scan_inventory
+
+logger = logging.getLogger()
+
+# Set to "false" to stop preloading dealership context into the agent's prompt
+SESSION_CONTEXT_ENABLED = os.environ.get('SESSION_CONTEXT_ENABLED', 'true').lower() == 'true'
+DEALERSHIP_TIMEZONE = os.environ.get('DEALERSHIP_TIMEZONE', 'Europe/London')
+
+# The inventory digest is only built if the car inventory table is configured
+INVENTORY_TABLE_NAME = os.environ.get('INVENTORY_TABLE_NAME')
+DIGEST_TTL_SECONDS = int(os.environ.get('INVENTORY_DIGEST_TTL_SECONDS', '300'))
+PRICE_BAND_GBP = 5000
+# Keep the digest small enough for the prompt as stock grows
+DIGEST_MAX_LINES = int(os.environ.get('INVENTORY_DIGEST_MAX_LINES', '200'))
+
+aws_clients.prime_on_init(services=['dynamodb'] if SESSION_CONTEXT_ENABLED and INVENTORY_TABLE_NAME else [])
+
+# Per-container cache of the inventory digest
+digest_cache = {'digest': None, 'expires_at': 0}
+
+def get_prompt_session_attributes():
+    """
+    Build the prompt session attributes preloaded into every agent turn.
+
+    These are substituted into the orchestration prompt ($prompt_session_attributes$) so the
+    agent can answer date questions and "what do you have" questions without calling the
+    get_todays_date or query_inventory action groups.
+
+    :return: Dict of attribute name to string value, or None if disabled.
+    """
+    if not SESSION_CONTEXT_ENABLED:
+        return None
+
+    try:
+        timezone = ZoneInfo(DEALERSHIP_TIMEZONE)
+    except ZoneInfoNotFoundError:
+        logger.warning(f"Unknown timezone {DEALERSHIP_TIMEZONE}, using UTC")
+        timezone = ZoneInfo('UTC')
+
+    attributes = {
+        'currentDateTime': datetime.now(timezone).strftime("%A %Y-%m-%d %H:%M"),
+        'dealershipTimezone': str(timezone)
+    }
+
+    digest = get_inventory_digest()
+    if digest:
+        attributes['inventoryDigest'] = digest
+
+    return attributes
+
+def get_inventory_digest():
+    """Get the inventory digest, rebuilding it at most once per TTL per container"""
+    if not INVENTORY_TABLE_NAME:
+        return None
+
+    if digest_cache['digest'] is not None and digest_cache['expires_at'] > time.time():
+        return digest_cache['digest']
+
+    try:
+        digest_cache['digest'] = build_inventory_digest(scan_inventory_summary())
+        digest_cache['expires_at'] = time.time() + DIGEST_TTL_SECONDS
+    except Exception as e:
+        # Serve the previous digest (if any) rather than failing the turn
+        logger.error(f"Error building inventory digest: {str(e)}")
+
+    return digest_cache['digest']
+
+def scan_inventory_summary():
+    """Scan only the attributes the digest needs from the car inventory table, in parallel"""
+    return scan_inventory(
+        INVENTORY_TABLE_NAME,
+        ProjectionExpression='make, model, price_gbp, #status',
+        ExpressionAttributeNames={'#status': 'status'}
+    )
+
+def price_band(price):
+    """Describe a price as a £5k band, e.g. £40-45k"""
+    lower = int(price // PRICE_BAND_GBP) * PRICE_BAND_GBP
+    return f"£{lower // 1000}-{(lower + PRICE_BAND_GBP) // 1000}k"
+
+def build_inventory_digest(items):
+    """
+    Build a compact, one line per group, digest of the inventory.
+
+    Vehicles with the same make, model, price band and status are collapsed into one line
+    with a count, e.g. "BMW 5 Series | £40-45k | available | x2".
+    """
+    groups = Counter(
+        (item.get('make', ''), item.get('model', ''), price_band(item.get('price_gbp', 0)), item.get('status', ''))
+        for item in items
+    )
+
+    lines = []
+    for (make, model, band, status), count in sorted(groups.items()):
+        line = f"{make} {model} | {band} | {status}"
+        if count > 1:
+            line += f" | x{count}"
+        lines.append(line)
+
+    if len(lines) > DIGEST_MAX_LINES:
+        omitted = len(lines) - DIGEST_MAX_LINES
+        lines = lines[:DIGEST_MAX_LINES] + [f"... and {omitted} more groups, query the inventory for the full list"]
+
+    return "\n".join(lines)
@@ -0,0 +1,88 @@
+import logging
+import os
+
+import jwt
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Cognito configuration used to verify the ID token presented when the WebSocket connects
+USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
+CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
+REGION = os.environ.get('AWS_REGION')
+
+# The user pool's signing keys (JSON Web Key Set) are fetched on first use and kept for the
+# life of the container, refetched when a token names a key not seen yet
+JWKS_CACHE_SECONDS = int(os.environ.get('COGNITO_JWKS_CACHE_SECONDS', '3600'))
+jwks_client = None
+
+def issuer():
+    """The issuer (iss claim) of the user pool's tokens"""
+    return f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+
+def get_jwks_client():
+    """Get the container's PyJWKClient for the user pool's JSON Web Key Set"""
+    global jwks_client
+    if jwks_client is None:
+        jwks_client = jwt.PyJWKClient(f"{issuer()}/.well-known/jwks.json", lifespan=JWKS_CACHE_SECONDS, timeout=5)
+    return jwks_client
+
+def verify_id_token(token):
+    """
+    Verify a Cognito ID token with PyJWT: its RS256 signature against the user pool's signing
+    keys, its expiry, issuer and audience (the website's app client), and that it is an ID token.
+
+    :param token: The encoded JWT.
+    :return: The token claims.
+    :raises jwt.PyJWTError: If the token is not valid.
+    """
+    signing_key = get_jwks_client().get_signing_key_from_jwt(token)
+    claims = jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=['RS256'],
+        audience=CLIENT_ID,
+        issuer=issuer(),
+        options={'require': ['exp', 'iss', 'aud', 'sub']}
+    )
+    if claims.get('token_use') != 'id':
+        raise jwt.InvalidTokenError("Token is not an ID token")
+    return claims
+
+def policy(principal_id, effect, method_arn, context=None):
+    """An API Gateway authorizer response allowing or denying the connection"""
+    response = {
+        'principalId': principal_id,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{'Action': 'execute-api:Invoke', 'Effect': effect, 'Resource': method_arn}]
+        }
+    }
+    if context:
+        response['context'] = context
+    return response
+
+def lambda_handler(event, context):
+    """
+    REQUEST authorizer for the agent streaming WebSocket API's $connect route. The Cognito ID
+    token is passed in the token query string parameter, since browsers cannot set headers on
+    a WebSocket handshake.
+
+    :param event: Authorizer event from the API Gateway WebSocket API
+    :param context: Lambda context
+    :return: IAM policy allowing the connection for the token's user, or denying it
+    """
+    token = (event.get('queryStringParameters') or {}).get('token')
+    if not token:
+        logger.error("Connection rejected: missing token")
+        return policy('anonymous', 'Deny', event['methodArn'])
+
+    try:
+        claims = verify_id_token(token)
+    except jwt.PyJWTError as e:
+        logger.error(f"Connection rejected: {str(e)}")
+        return policy('anonymous', 'Deny', event['methodArn'])
+
+    logger.info(f"Connection authorised for user {claims['sub']}")
+    return policy(claims['sub'], 'Allow', event['methodArn'], {'sub': claims['sub']})
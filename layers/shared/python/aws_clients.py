@@ -0,0 +1,141 @@
+import os
+import threading
+
+# boto3 and botocore.config are imported on first use: together they add a few hundred
+# milliseconds to init, which functions that never call AWS would otherwise pay.
+
+# Connect and read timeouts (seconds) per service. The Bedrock Agent runtime streams long
+# multi-step turns, so its read timeout has to cover the gap before the first chunk.
+SERVICE_TIMEOUTS = {
+    'bedrock-agent-runtime': (2, 120),
+    'bedrock-agent': (2, 30),
+    'dynamodb': (1, 5),
+    'lambda': (2, 30),
+    'apigatewaymanagementapi': (1, 5),
+    's3': (2, 30)
+}
+DEFAULT_TIMEOUTS = (2, 30)
+
+# Total attempts per service, including the first. Adaptive mode also rate limits the
+# client when the service starts throttling.
+SERVICE_MAX_ATTEMPTS = {
+    'bedrock-agent-runtime': 4,
+    'dynamodb': 5
+}
+DEFAULT_MAX_ATTEMPTS = 3
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_CLIENT_MAX_POOL_CONNECTIONS', '10'))
+
+# "lazy" builds clients on first use. "prime" builds the clients each function declares
+# with prime_on_init during init instead, which pays off with provisioned concurrency or
+# SnapStart where init happens before any request arrives.
+COLD_START_MODE = os.environ.get('COLD_START_MODE', 'lazy').lower()
+
+# Clients, resources and tables built so far in this container
+clients = {}
+resources = {}
+tables = {}
+lock = threading.RLock()
+session = None
+
+# Clients and tables declared by the function's modules with prime_on_init
+prime_targets = {'services': [], 'tables': [], 'credentials': False}
+
+def client_config(service_name):
+    """Build the botocore config for a service: pooled keep-alive connections, adaptive retries and tuned timeouts"""
+    from botocore.config import Config
+
+    connect_timeout, read_timeout = SERVICE_TIMEOUTS.get(service_name, DEFAULT_TIMEOUTS)
+    return Config(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={
+            'mode': 'adaptive',
+            'total_max_attempts': SERVICE_MAX_ATTEMPTS.get(service_name, DEFAULT_MAX_ATTEMPTS)
+        },
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True
+    )
+
+def get_session():
+    """Get the boto3 session shared by every client in the container"""
+    global session
+    if session is None:
+        with lock:
+            if session is None:
+                import boto3
+                session = boto3.session.Session()
+    return session
+
+def client(service_name, endpoint_url=None):
+    """
+    Get a low-level client for a service, building it on first use.
+
+    :param service_name: The service, e.g. 'bedrock-agent-runtime'.
+    :param endpoint_url: Optional endpoint, e.g. for the API Gateway Management API.
+    :return: The client, shared by every caller in the container.
+    """
+    key = (service_name, endpoint_url)
+    if key not in clients:
+        with lock:
+            if key not in clients:
+                clients[key] = get_session().client(
+                    service_name,
+                    endpoint_url=endpoint_url,
+                    config=client_config(service_name)
+                )
+    return clients[key]
+
+def resource(service_name):
+    """Get a resource for a service, building it on first use"""
+    if service_name not in resources:
+        with lock:
+            if service_name not in resources:
+                resources[service_name] = get_session().resource(
+                    service_name,
+                    config=client_config(service_name)
+                )
+    return resources[service_name]
+
+def table(table_name):
+    """Get a DynamoDB Table resource, building it on first use"""
+    if table_name not in tables:
+        tables[table_name] = resource('dynamodb').Table(table_name)
+    return tables[table_name]
+
+def credentials():
+    """Get the container's AWS credentials, e.g. for signing requests with SigV4. They are refreshed when they expire."""
+    return get_session().get_credentials()
+
+def set_client(service_name, stub, endpoint_url=None):
+    """Use a stand-in for a service's client, e.g. in the offline load test"""
+    clients[(service_name, endpoint_url)] = stub
+
+def set_table(table_name, stub):
+    """Use a stand-in for a DynamoDB table, e.g. in the offline benchmarks"""
+    tables[table_name] = stub
+
+def prime_on_init(services=(), tables=(), credentials=False):
+    """
+    Declare the clients and tables a module uses, building them now if COLD_START_MODE is "prime".
+
+    :param services: Service names to build low-level clients for.
+    :param tables: DynamoDB table names. Empty names (e.g. an unconfigured optional table) are skipped.
+    :param credentials: Also resolve the session credentials, e.g. for SigV4 signing.
+    """
+    tables = [name for name in tables if name]
+    prime_targets['services'].extend(services)
+    prime_targets['tables'].extend(tables)
+    prime_targets['credentials'] = prime_targets['credentials'] or credentials
+
+    if COLD_START_MODE == 'prime':
+        prime(services, tables, credentials)
+
+def prime(services=(), tables=(), credentials=False):
+    """Build the given clients and tables (and resolve credentials) ahead of the first request"""
+    for service_name in services:
+        client(service_name)
+    for table_name in tables:
+        table(table_name)
+    if credentials:
+        get_session().get_credentials()
@@ -0,0 +1,127 @@
+import base64
+import gzip
+import os
+import zlib
+
+# brotli is not part of the Lambda Python runtime; br is only offered if it has been added
+# to a layer. gzip and deflate are always available.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this (bytes) are not worth compressing. The REST APIs'
+# minimumCompressionSize is set to the same value.
+MIN_COMPRESSION_SIZE = int(os.environ.get('RESPONSE_MIN_COMPRESSION_SIZE', '1024'))
+
+# gzip level 6 (zlib's default) gets most of level 9's saving for a fraction of the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def supported_encodings():
+    """Content codings this module can produce, in order of preference"""
+    return ('br', 'gzip', 'deflate') if brotli else ('gzip', 'deflate')
+
+def choose_encoding(accept_encoding, available=()):
+    """
+    Choose the content coding for a response from an Accept-Encoding header.
+
+    :param accept_encoding: The request's Accept-Encoding header, e.g. "gzip, deflate, br;q=0.9".
+    :param available: Codings the body is already compressed with, preferred when acceptable.
+    :return: The coding, or None to send the body uncompressed.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    def weight(coding):
+        return weights.get(coding, weights.get('*', 0.0))
+
+    acceptable = [coding for coding in supported_encodings() if weight(coding) > 0]
+    if not acceptable:
+        return None
+    precompressed = [coding for coding in acceptable if coding in available]
+    candidates = precompressed or acceptable
+    return max(candidates, key=lambda coding: (weight(coding), -candidates.index(coding)))
+
+def compress(data, encoding):
+    """Compress bytes with a content coding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(data, GZIP_LEVEL)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+def decompress(data, encoding):
+    """Decompress bytes with a content coding (None or identity returns them as they are)"""
+    if not encoding or encoding == 'identity':
+        return data
+    if encoding == 'br':
+        return brotli.decompress(data)
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'deflate':
+        return zlib.decompress(data)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+def header(event, name):
+    """A request header from an API Gateway proxy event, ignoring case"""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def request_body(event):
+    """
+    The request body of an API Gateway proxy event as text. The APIs treat every media type
+    as binary (so responses can be compressed), so request bodies arrive base64 encoded.
+    """
+    body = event.get('body')
+    if body is None or not event.get('isBase64Encoded'):
+        return body
+    return base64.b64decode(body).decode('utf-8')
+
+def compress_response(event, response, precompressed=None):
+    """
+    Compress an API Gateway proxy response for the request's Accept-Encoding, returning it
+    base64 encoded as API Gateway expects for binary bodies. Small bodies, and requests that
+    do not accept a supported coding, are returned unchanged.
+
+    :param precompressed: Optional {coding: bytes} of the body already compressed, e.g. the
+        inventory snapshot's gzip copy, used instead of compressing it again.
+    """
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded'):
+        return response
+
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+    data = body.encode('utf-8') if isinstance(body, str) else body
+    if len(data) < MIN_COMPRESSION_SIZE:
+        return response
+
+    precompressed = precompressed or {}
+    encoding = choose_encoding(header(event, 'accept-encoding'), available=tuple(precompressed))
+    if encoding is None:
+        return response
+
+    compressed = precompressed.get(encoding) or compress(data, encoding)
+    headers['Content-Encoding'] = encoding
+    # The compressed representation is equivalent, not byte for byte the same
+    if headers.get('ETag', '').startswith('"'):
+        headers['ETag'] = 'W/' + headers['ETag']
+    return dict(response, body=base64.b64encode(compressed).decode('ascii'), isBase64Encoded=True)
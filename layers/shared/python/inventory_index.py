@@ -0,0 +1,220 @@
+import bisect
+import json
+import logging
+import os
+import time
+from decimal import Decimal
+
+from inventory_snapshot import get_snapshot, line_car_id, render, snapshot_line
+from inventory_store import (
+    RANGE_FILTERS, TEXT_FILTERS, check_ordering, compact_car, cursor_after, get_inventory_json, matches, scan_pages
+)
+
+logger = logging.getLogger()
+
+# Columnar inventory index: every car held once per container as NumPy arrays, so lists of
+# cars are filtered with a few array operations rather than a Python check of each item.
+#
+# - Numeric fields are float arrays (NaN where a car has none).
+# - Categorical fields are dictionary encoded: each car's code into the field's distinct values.
+# - Each distinct value has a bitmap index (packed bits) of the cars with it, so equality
+#   filters are ANDs and ORs of bitmaps.
+#
+# The cars' JSON text is kept as a snapshot document, with each car's offsets, to render the
+# matching cars without serialising them again. NumPy is imported on first use, from the
+# NumPy layer.
+NUMERIC_FIELDS = {
+    'price_gbp': ('price_gbp',),
+    'year': ('year',),
+    'mileage': ('mileage',),
+    'power_bhp': ('engine', 'power_bhp'),
+    'fuel_economy_mpg': ('fuel_economy_mpg',),
+    'co2_emissions_gkm': ('co2_emissions_gkm',),
+    'previous_owners': ('previous_owners',)
+}
+CATEGORY_FIELDS = {name: (name,) for name in TEXT_FILTERS + ('status', 'transmission')}
+CATEGORY_FIELDS['fuel_type'] = ('engine', 'type')
+
+# With INVENTORY_COLUMNAR_INDEX, the inventory API and the action group's direct DynamoDB mode
+# answer lists of cars (filtered, paged or compact) from the index rather than the table. It is
+# loaded from the inventory snapshot, again whenever its version changes, or else from a scan
+# of the table, again after INVENTORY_INDEX_REFRESH_SECONDS. Recommendations always use it.
+INDEX_ENABLED = os.environ.get('INVENTORY_COLUMNAR_INDEX', 'false').lower() == 'true'
+REFRESH_SECONDS = float(os.environ.get('INVENTORY_INDEX_REFRESH_SECONDS', '60'))
+index_cache = {'index': None}
+
+def car_field(car, path):
+    """A field of a car (deserialised) by its path, or None"""
+    for name in path:
+        car = car.get(name) if isinstance(car, dict) else None
+    return car
+
+def build_index(document, version=None):
+    """
+    Build the columnar index of the cars in a snapshot document (see inventory_snapshot.render).
+
+    :return: Dict of document, starts and ends (each car's JSON text in the document), numbers
+        ({field: float array}), low and high ({field: lowest and highest value}), categories
+        ({field: (codes, distinct values)}), bitmaps ({field: packed bitmap per distinct value,
+        as rows of a uint8 array}), count, version and built_at.
+    """
+    import numpy as np
+
+    decoder = json.JSONDecoder()
+    starts, ends = [], []
+    numbers = {name: [] for name in NUMERIC_FIELDS}
+    dictionaries = {name: {} for name in CATEGORY_FIELDS}
+    codes = {name: [] for name in CATEGORY_FIELDS}
+
+    position = document.find('{')
+    while position >= 0:
+        car, end = decoder.raw_decode(document, position)
+        starts.append(position)
+        ends.append(end)
+        for name, path in NUMERIC_FIELDS.items():
+            numbers[name].append(car_field(car, path))
+        for name, path in CATEGORY_FIELDS.items():
+            value = str(car_field(car, path) or '')
+            codes[name].append(dictionaries[name].setdefault(value, len(dictionaries[name])))
+        position = document.find('{', end)
+
+    count = len(starts)
+    index = {
+        'document': document,
+        'starts': np.array(starts, dtype=np.int64),
+        'ends': np.array(ends, dtype=np.int64),
+        'numbers': {}, 'low': {}, 'high': {}, 'categories': {}, 'bitmaps': {},
+        'count': count,
+        'version': version,
+        'built_at': time.time()
+    }
+    for name, values in numbers.items():
+        column = np.array(values, dtype=np.float64)
+        known = column[~np.isnan(column)]
+        index['numbers'][name] = column
+        index['low'][name] = float(known.min()) if len(known) else 0.0
+        index['high'][name] = float(known.max()) if len(known) else 0.0
+    for name, dictionary in dictionaries.items():
+        column = np.array(codes[name], dtype=np.uint16 if len(dictionary) <= 65536 else np.uint32)
+        index['categories'][name] = (column, list(dictionary))
+        bitmaps = np.zeros((len(dictionary), (count + 7) // 8), dtype=np.uint8)
+        for code in range(len(dictionary)):
+            bitmaps[code] = np.packbits(column == code)
+        index['bitmaps'][name] = bitmaps
+    return index
+
+def get_index(table_name):
+    """
+    The container's columnar index of the inventory (see build_index), from the inventory
+    snapshot if there is one, or else a parallel scan of the table.
+    """
+    snapshot = get_snapshot()
+    index = index_cache['index']
+    if snapshot:
+        stale = index is None or index['version'] != snapshot['version']
+    else:
+        stale = index is None or index['version'] is not None or time.time() - index['built_at'] >= REFRESH_SECONDS
+    if not stale:
+        return index
+
+    start_time = time.perf_counter()
+    if snapshot:
+        index = build_index(snapshot['body'], snapshot['version'])
+    else:
+        lines = {}
+        for page in scan_pages(table_name):
+            for item in page:
+                lines[item['id']['S']] = snapshot_line(item)
+        index = build_index(render(lines))
+    logger.info(f"Indexed {index['count']} cars in {(time.perf_counter() - start_time) * 1000:.0f} ms")
+    index_cache['index'] = index
+    return index
+
+def filter_rows(index, filters):
+    """
+    The rows (positions, in car ID order) of the cars passing every filter, as matches() would.
+    Each categorical filter is checked once per distinct value, with matches(), and the bitmaps
+    of the values passing are ORed; the fields' bitmaps are then ANDed, and the range filters
+    compared against the numeric arrays.
+    """
+    import numpy as np
+
+    bits = None
+    for name, path in CATEGORY_FIELDS.items():
+        if name not in filters:
+            continue
+        _, values = index['categories'][name]
+        passing = [
+            code for code, value in enumerate(values)
+            if matches({path[0]: {path[1]: value}} if len(path) == 2 else {path[0]: value}, {name: filters[name]})
+        ]
+        field_bits = np.bitwise_or.reduce(index['bitmaps'][name][passing], axis=0) if passing else \
+            np.zeros((index['count'] + 7) // 8, dtype=np.uint8)
+        bits = field_bits if bits is None else bits & field_bits
+
+    mask = np.unpackbits(bits, count=index['count']).view(bool) if bits is not None else \
+        np.ones(index['count'], dtype=bool)
+    for name, (field, operator, _) in RANGE_FILTERS.items():
+        if name in filters:
+            # NaN (a missing value) fails both comparisons
+            column = index['numbers'][field]
+            mask &= column >= float(filters[name]) if operator == 'gte' else column <= float(filters[name])
+    return np.flatnonzero(mask)
+
+def car_text(index, row, view='full'):
+    """JSON text of the car at a row of the index, in a view (see inventory_store.VIEWS)"""
+    text = index['document'][index['starts'][row]:index['ends'][row]]
+    return json.dumps(compact_car(json.loads(text))) if view == 'compact' else text
+
+def list_ordering():
+    """The ordering (see inventory_store.ORDERINGS) lists of cars are read in when the index loads"""
+    return 'id' if INDEX_ENABLED else 'table'
+
+def index_inventory_json(index, filters=None, page=None, view='full'):
+    """
+    A list of cars from the columnar index, as get_inventory_json returns it from the table.
+    The cars are in car ID order, and a page's next_cursor continues after its last car in
+    that order (the "id" ordering, which the table does not read on from).
+
+    :param filters: Optional filters from parse_filters.
+    :param page: Optional page from parse_page, whose start key's car ID the page starts after.
+    :param view: "full" or "compact".
+    :return: Tuple of (HTTP status code, JSON response body).
+    :raises InvalidFilter: If the page's cursor was issued in the table's order.
+    """
+    check_ordering(page, 'id')
+    rows = filter_rows(index, filters or {})
+    if not page:
+        return 200, '[' + ', '.join([car_text(index, row, view) for row in rows.tolist()]) + ']'
+
+    first = 0
+    start_key = page['start_key']
+    if start_key and 'S' in start_key.get('id', {}):
+        first = bisect.bisect_right(
+            rows, start_key['id']['S'],
+            key=lambda row: line_car_id(index['document'][index['starts'][row]:index['ends'][row]])
+        )
+    selected = rows[first:first + page['limit']].tolist()
+    cars = [car_text(index, row, view) for row in selected]
+
+    next_cursor = None
+    if first + page['limit'] < len(rows):
+        last = car_text(index, selected[-1]) if view == 'compact' else cars[-1]
+        next_cursor = cursor_after(json.loads(last, parse_float=Decimal, parse_int=Decimal), filters, 'id')
+    return 200, '{"cars": [' + ', '.join(cars) + '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+def inventory_json(table_name, car_id=None, filters=None, car_ids=None, page=None, view='full'):
+    """
+    get_inventory_json, answering lists of cars from the columnar index when INDEX_ENABLED.
+    Single cars and lookups by ID are read from the table, as is every request if the index
+    cannot be loaded. A cursor is only read on in the ordering that issued it: one issued by
+    the other path is rejected (InvalidFilter) rather than skipping or repeating cars.
+    """
+    if INDEX_ENABLED and not car_id and not car_ids:
+        try:
+            index = get_index(table_name)
+        except Exception as e:
+            logger.warning(f"Error loading the inventory index, reading the table: {str(e)}")
+        else:
+            return index_inventory_json(index, filters, page, view)
+    return get_inventory_json(table_name, car_id, filters, car_ids, page, view)
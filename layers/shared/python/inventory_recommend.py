@@ -0,0 +1,149 @@
+from inventory_index import NUMERIC_FIELDS, car_text, filter_rows, get_index
+from inventory_store import InvalidFilter, parse_filters, parse_view
+
+# Recommendations (/cars/recommend): the cars passing the filters (hard constraints), ranked by
+# how close they are to the customer's preferences on their numeric attributes, over the
+# columnar inventory index (inventory_index)
+RECOMMEND_ATTRIBUTES = tuple(NUMERIC_FIELDS)
+DEFAULT_PREFERENCES = 'price_gbp:low,mileage:low,year:high'
+DEFAULT_RECOMMEND_LIMIT = 5
+MAX_RECOMMEND_LIMIT = 50
+
+def parse_preferences(value):
+    """
+    Parse the prefer query parameter: comma separated attribute:target[:weight] preferences,
+    e.g. "price_gbp:low,fuel_economy_mpg:high:2,year:2021". The target is "low", "high" or a
+    number to be close to; the weight (default 1) is how much the preference counts.
+
+    :return: List of (attribute, target, weight), target being "low", "high" or a float.
+        DEFAULT_PREFERENCES if none are given.
+    :raises InvalidFilter: If a preference is invalid, or a value is given with none.
+    """
+    value = str(value or '').strip() or DEFAULT_PREFERENCES
+    preferences = {}
+    for preference in value.split(','):
+        parts = [part.strip() for part in preference.split(':')]
+        if not parts[0]:
+            continue
+        if parts[0] not in RECOMMEND_ATTRIBUTES:
+            raise InvalidFilter(f"Invalid prefer: {parts[0]} (expected one of {', '.join(RECOMMEND_ATTRIBUTES)})")
+        if len(parts) not in (2, 3):
+            raise InvalidFilter(f"Invalid prefer: {preference.strip()} (expected attribute:target[:weight])")
+
+        target = parts[1].lower()
+        if target not in ('low', 'high'):
+            try:
+                target = float(target)
+            except ValueError:
+                raise InvalidFilter(f"Invalid prefer: the target of {parts[0]} must be low, high or a number")
+        try:
+            weight = float(parts[2]) if len(parts) == 3 else 1.0
+        except ValueError:
+            weight = -1.0
+        if not 0 < weight < float('inf'):
+            raise InvalidFilter(f"Invalid prefer: the weight of {parts[0]} must be a positive number")
+        preferences[parts[0]] = (parts[0], target, weight)
+    if not preferences:
+        raise InvalidFilter("Invalid prefer: no preferences given (expected attribute:target[:weight])")
+    return list(preferences.values())
+
+def format_preferences(preferences):
+    """The prefer query parameter of parsed preferences"""
+    def number(value):
+        return f"{value:g}"
+    return ','.join([
+        f"{attribute}:{target if isinstance(target, str) else number(target)}"
+        + (f":{number(weight)}" if weight != 1 else '')
+        for attribute, target, weight in preferences
+    ])
+
+def parse_recommendation(params, default_view='full'):
+    """
+    Parse the /cars/recommend query parameters: the filters (as for /cars), prefer, limit (the
+    number of cars, default DEFAULT_RECOMMEND_LIMIT) and view. Only available cars are
+    recommended unless a status is given.
+
+    :param params: Query string parameters (or action group parameters); may be None.
+    :param default_view: The view if none is given.
+    :return: Dict of filters, preferences, limit and view.
+    :raises InvalidFilter: If a parameter is invalid.
+    """
+    filters = parse_filters(params)
+    filters.setdefault('status', 'available')
+
+    limit = str((params or {}).get('limit') or DEFAULT_RECOMMEND_LIMIT).strip()
+    try:
+        count = int(limit)
+    except ValueError:
+        raise InvalidFilter(f"Invalid limit: {limit} is not a whole number")
+    if not 1 <= count <= MAX_RECOMMEND_LIMIT:
+        raise InvalidFilter(f"Invalid limit: {limit} (expected 1 to {MAX_RECOMMEND_LIMIT})")
+
+    return {
+        'filters': filters,
+        'preferences': parse_preferences((params or {}).get('prefer')),
+        'limit': count,
+        'view': parse_view(params, default_view)
+    }
+
+def recommendation_query(request):
+    """The query string parameters of a parsed recommendation request, in a fixed order"""
+    query = {name: str(value) for name, value in request['filters'].items()}
+    query['prefer'] = format_preferences(request['preferences'])
+    query['limit'] = str(request['limit'])
+    query['view'] = request['view']
+    return query
+
+def rank(index, filters, preferences, limit):
+    """
+    Rank the cars passing the filters by their weighted normalised distance from the
+    preferences: per attribute, how far the car is from the target (the lowest or highest
+    value in stock, or a number) as a fraction of the attribute's range in stock, combined as
+    a weighted root mean square. A missing value counts as the furthest.
+
+    :param index: The columnar inventory index (see inventory_index.build_index).
+    :return: Tuple of (rows of the best cars, best first, their match scores from 1 for an
+        exact match down to 0, and the number of cars passing the filters).
+    """
+    import numpy as np
+
+    candidates = filter_rows(index, filters)
+    if not len(candidates):
+        return candidates, np.zeros(0), 0
+
+    total = np.zeros(len(candidates))
+    for attribute, target, weight in preferences:
+        low, high = index['low'][attribute], index['high'][attribute]
+        target = low if target == 'low' else high if target == 'high' else target
+        distances = np.abs(index['numbers'][attribute][candidates] - target) / (high - low if high > low else 1.0)
+        total += weight * np.nan_to_num(np.minimum(distances, 1.0), nan=1.0) ** 2
+    scores = np.sqrt(total / sum(weight for _, _, weight in preferences))
+
+    # The best cars by partial sort (all those scoring as well as the last one kept), then in
+    # order, equal scores by position (i.e. car ID)
+    if limit < len(candidates):
+        best = np.flatnonzero(scores <= np.partition(scores, limit - 1)[limit - 1])
+    else:
+        best = np.arange(len(candidates))
+    best = best[np.lexsort((best, scores[best]))][:limit]
+    return candidates[best], 1.0 - scores[best], len(candidates)
+
+def recommend_json(table_name, request):
+    """
+    Recommend cars: the best matches to the preferences among the cars passing the filters.
+    Shared by the inventory API (get_vehicle_inventory) and the query_inventory action group's
+    direct DynamoDB mode.
+
+    :param table_name: The car inventory table, read if there is no inventory snapshot.
+    :param request: Parsed request from parse_recommendation.
+    :return: Tuple of (HTTP status code, JSON response body): an object of the cars, best
+        first, each with its match_score, and the number of candidates passing the filters.
+    """
+    index = get_index(table_name)
+    rows, scores, candidates = rank(index, request['filters'], request['preferences'], request['limit'])
+
+    cars = [
+        f'{car_text(index, row, request["view"])[:-1]}, "match_score": {round(score, 3)}}}'
+        for row, score in zip(rows.tolist(), scores.tolist())
+    ]
+    return 200, '{"cars": [' + ', '.join(cars) + '], "candidates": ' + str(candidates) + '}'
@@ -0,0 +1,244 @@
+import gzip
+import json
+import logging
+import os
+import time
+
+import aws_clients
+from inventory_store import content_version, item_json, scan_pages
+
+logger = logging.getLogger()
+
+# The inventory snapshot: the full /cars list, pre-serialised to JSON in S3 so it can be served
+# without reading the table. build_inventory_snapshot keeps it up to date from the car
+# inventory table's DynamoDB stream and rebuilds it on a schedule. Readers fall back to the
+# table when no bucket is configured, there is no snapshot yet, or the snapshot is stale.
+SNAPSHOT_BUCKET = os.environ.get('INVENTORY_SNAPSHOT_BUCKET')
+SNAPSHOT_KEY = os.environ.get('INVENTORY_SNAPSHOT_KEY', 'snapshot/inventory.json')
+SNAPSHOT_GZIP = os.environ.get('INVENTORY_SNAPSHOT_GZIP', 'false').lower() == 'true'
+
+# Every write, including the scheduled rebuild, refreshes the snapshot's updated-at time, so a
+# snapshot older than this means it is no longer being maintained
+SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get('INVENTORY_SNAPSHOT_MAX_AGE_SECONDS', '7200'))
+
+# How long a container serves its copy of the snapshot before revalidating it with S3
+SNAPSHOT_CHECK_SECONDS = float(os.environ.get('INVENTORY_SNAPSHOT_CHECK_SECONDS', '5'))
+
+# Attempts at a conditional write before giving up, when other writers keep getting in first
+SNAPSHOT_WRITE_ATTEMPTS = 5
+
+# Each car is written on its own line, starting with its ID, so the stream processor can
+# update the snapshot without parsing every car
+ID_PREFIX = '{"id": "'
+
+class SnapshotConflict(Exception):
+    """The snapshot changed between reading and writing it"""
+
+# The container's copy of the snapshot and when it was last checked with S3
+snapshot_cache = {'snapshot': None, 'checked_at': 0.0}
+
+def snapshot_line(item):
+    """JSON text of a DynamoDB JSON item for the snapshot, with the car's ID first"""
+    return item_json({'id': item['id'], **{name: value for name, value in item.items() if name != 'id'}})
+
+def line_car_id(line):
+    """The car ID at the start of a snapshot line"""
+    if line.startswith(ID_PREFIX):
+        end = line.find('"', len(ID_PREFIX))
+        if end > 0 and '\\' not in line[len(ID_PREFIX):end]:
+            return line[len(ID_PREFIX):end]
+    return json.loads(line)['id']
+
+def render(lines):
+    """The snapshot document: a JSON list of the cars, one per line, in ID order"""
+    if not lines:
+        return '[]'
+    return '[\n' + ',\n'.join([lines[car_id] for car_id in sorted(lines)]) + '\n]'
+
+def parse_lines(body):
+    """The cars in a snapshot document, as {car ID: line}"""
+    lines = {}
+    for line in body.split('\n'):
+        if line in ('[', ']', '[]', ''):
+            continue
+        if line.endswith(','):
+            line = line[:-1]
+        lines[line_car_id(line)] = line
+    return lines
+
+def error_code(error):
+    """The error code of a botocore ClientError"""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+def snapshot_metadata(response):
+    """The version, updated-at time and number of cars from the snapshot's object metadata"""
+    metadata = response.get('Metadata', {})
+    return {
+        'version': metadata.get('version'),
+        'updated_at': float(metadata.get('updated-at', 0)),
+        'cars': int(metadata.get('cars', 0)),
+        'etag': response['ETag']
+    }
+
+def load_snapshot(held=None):
+    """
+    Read the snapshot from S3.
+
+    :param held: A copy of the snapshot already held. It is checked with a HEAD request and
+        only downloaded again if it has changed. (The scheduled rebuild can rewrite the same
+        document. Its bytes, and so its ETag, are unchanged, since the gzip header is written
+        without a timestamp, but its updated-at metadata moves on. So the metadata is read,
+        rather than relying on If-None-Match.)
+    :return: Dict of body, version, updated_at, cars and etag, and compressed ({coding: bytes}
+        of the stored copy, if compressed), or None if there is no snapshot.
+    """
+    from botocore.exceptions import ClientError
+
+    s3 = aws_clients.client('s3')
+    try:
+        if held:
+            head = snapshot_metadata(s3.head_object(Bucket=SNAPSHOT_BUCKET, Key=SNAPSHOT_KEY))
+            if head['etag'] == held['etag']:
+                return dict(held, **head)
+        response = s3.get_object(Bucket=SNAPSHOT_BUCKET, Key=SNAPSHOT_KEY)
+    except ClientError as e:
+        if error_code(e) in ('NoSuchKey', '404'):
+            return None
+        raise
+
+    body = response['Body'].read()
+    compressed = {}
+    if response.get('ContentEncoding') == 'gzip':
+        # Kept to send to clients that accept gzip without compressing it again
+        compressed['gzip'] = body
+        body = gzip.decompress(body)
+    return dict(snapshot_metadata(response), body=body.decode('utf-8'), compressed=compressed)
+
+def get_snapshot():
+    """
+    Get the inventory snapshot to serve the full list of cars from.
+
+    The container keeps its copy for INVENTORY_SNAPSHOT_CHECK_SECONDS, then revalidates it,
+    only downloading the snapshot again if it has changed.
+
+    :return: The snapshot (see load_snapshot), or None to read the table instead.
+    """
+    if not SNAPSHOT_BUCKET:
+        return None
+
+    now = time.time()
+    snapshot = snapshot_cache['snapshot']
+    if snapshot is None or now - snapshot_cache['checked_at'] >= SNAPSHOT_CHECK_SECONDS:
+        try:
+            snapshot = load_snapshot(snapshot)
+            snapshot_cache['snapshot'] = snapshot
+            snapshot_cache['checked_at'] = now
+        except Exception as e:
+            # Keep serving the copy held, as long as it is not stale
+            logger.warning(f"Error reading the inventory snapshot: {str(e)}")
+
+    if snapshot is None:
+        return None
+    if now - snapshot['updated_at'] > SNAPSHOT_MAX_AGE_SECONDS:
+        logger.warning(f"Inventory snapshot {snapshot['version']} is stale, reading the table")
+        return None
+    return snapshot
+
+def write_snapshot(lines, etag=None):
+    """
+    Write the snapshot if it has not changed since it was read, tagged with a version (a hash
+    of the document) and the time of the write.
+
+    :param lines: The cars, as {car ID: line}.
+    :param etag: ETag of the snapshot read, or None if there was no snapshot.
+    :return: Dict of version and cars.
+    :raises SnapshotConflict: If another writer updated the snapshot first.
+    """
+    from botocore.exceptions import ClientError
+
+    body = render(lines).encode('utf-8')
+    version = content_version(body)
+    kwargs = {
+        'Bucket': SNAPSHOT_BUCKET,
+        'Key': SNAPSHOT_KEY,
+        'ContentType': 'application/json',
+        'Metadata': {'version': version, 'updated-at': str(int(time.time())), 'cars': str(len(lines))}
+    }
+    if SNAPSHOT_GZIP:
+        # Without a timestamp in the header, the same document compresses to the same bytes
+        body = gzip.compress(body, mtime=0)
+        kwargs['ContentEncoding'] = 'gzip'
+    if etag:
+        kwargs['IfMatch'] = etag
+    else:
+        kwargs['IfNoneMatch'] = '*'
+
+    try:
+        aws_clients.client('s3').put_object(Body=body, **kwargs)
+    except ClientError as e:
+        if error_code(e) in ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409'):
+            raise SnapshotConflict(str(e))
+        raise
+    return {'version': version, 'cars': len(lines)}
+
+def with_retries(update):
+    """Run a read-modify-write of the snapshot, retrying it when another writer gets in first"""
+    for attempt in range(1, SNAPSHOT_WRITE_ATTEMPTS + 1):
+        try:
+            return update()
+        except SnapshotConflict:
+            if attempt == SNAPSHOT_WRITE_ATTEMPTS:
+                raise
+            logger.info(f"Inventory snapshot changed while updating it, retrying (attempt {attempt})")
+
+def rebuild_snapshot(table_name):
+    """
+    Rebuild the snapshot from a parallel scan of the table.
+
+    :return: Dict of version and cars.
+    """
+    from botocore.exceptions import ClientError
+
+    def rebuild():
+        etag = None
+        try:
+            etag = aws_clients.client('s3').head_object(Bucket=SNAPSHOT_BUCKET, Key=SNAPSHOT_KEY)['ETag']
+        except ClientError as e:
+            if error_code(e) not in ('NoSuchKey', '404'):
+                raise
+
+        lines = {}
+        for page in scan_pages(table_name):
+            for item in page:
+                lines[item['id']['S']] = snapshot_line(item)
+        return write_snapshot(lines, etag)
+
+    return with_retries(rebuild)
+
+def apply_changes(table_name, records):
+    """
+    Apply a batch of DynamoDB stream records (NEW_IMAGE or NEW_AND_OLD_IMAGES) to the
+    snapshot. Only the changed cars are serialised. If there is no snapshot yet, it is
+    rebuilt from the table instead, which already holds the changes.
+
+    :return: Dict of version and cars.
+    """
+    def apply():
+        snapshot = load_snapshot()
+        if snapshot is None:
+            return None
+
+        lines = parse_lines(snapshot['body'])
+        for record in records:
+            change = record['dynamodb']
+            car_id = change['Keys']['id']['S']
+            if record['eventName'] == 'REMOVE':
+                lines.pop(car_id, None)
+            else:
+                lines[car_id] = snapshot_line(change['NewImage'])
+        return write_snapshot(lines, snapshot['etag'])
+
+    result = with_retries(apply)
+    if result is None:
+        return rebuild_snapshot(table_name)
+    return result
@@ -0,0 +1,676 @@
+import base64
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+
+import aws_clients
+
+# Custom JSON encoder for Decimal type
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+class InvalidFilter(ValueError):
+    """A filter query parameter has an invalid value"""
+
+# Filter query parameters on /cars. Text filters match exactly (make, model and location are
+# case sensitive, as listed in the inventory). fuel_type matches every word given, ignoring
+# case, so "hybrid" matches Petrol Hybrid and Petrol Plug-in Hybrid. transmission is
+# "manual", "automatic" (every other gearbox, e.g. DSG or PDK) or a gearbox name.
+TEXT_FILTERS = ('make', 'model', 'location')
+RANGE_FILTERS = {
+    'year_min': ('year', 'gte', int),
+    'year_max': ('year', 'lte', int),
+    'price_min': ('price_gbp', 'gte', Decimal),
+    'price_max': ('price_gbp', 'lte', Decimal),
+    'mileage_max': ('mileage', 'lte', int)
+}
+STATUSES = ('available', 'sold', 'reserved', 'in_transit')
+FILTER_NAMES = TEXT_FILTERS + tuple(RANGE_FILTERS) + ('fuel_type', 'transmission', 'status')
+
+# Global secondary indexes on the car inventory table as (partition key, sort key), in order
+# of preference. Only the indexes deployed, listed in INVENTORY_INDEXES, are queried.
+INVENTORY_INDEXES = {
+    'make-model-index': ('make', 'model'),
+    'location-status-index': ('location', 'status'),
+    'status-price-index': ('status', 'price_gbp')
+}
+DEPLOYED_INDEXES = [name.strip() for name in os.environ.get('INVENTORY_INDEXES', '').split(',') if name.strip()]
+
+# Parallel scan segments (one thread each) for full inventory exports
+EXPORT_SEGMENTS = int(os.environ.get('INVENTORY_EXPORT_SEGMENTS', '8'))
+
+# BatchGetItem reads at most 100 keys per request, which is also the most IDs /cars?ids= takes.
+# Keys DynamoDB leaves unprocessed are retried with jittered exponential backoff.
+MAX_BATCH_IDS = 100
+BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BACKOFF_SECONDS = 0.05
+
+# Pages of /cars (?limit= and ?cursor=): at most MAX_PAGE_LIMIT cars per page, DEFAULT_PAGE_LIMIT
+# when only a cursor is given. Filtered pages read at least PAGE_READ_ITEMS items per request,
+# since DynamoDB's Limit counts the items read before filtering.
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+PAGE_READ_ITEMS = 100
+
+# Orderings of a list of cars that a cursor continues in: "table" is the table's own order (a
+# scan's, or a global secondary index's key order), "id" is car ID order (the columnar inventory
+# index). A cursor is only read on in the ordering that issued it.
+ORDERINGS = ('table', 'id')
+
+# Views of the cars in a list (?view=). "full" is the whole record. "compact" keeps what is
+# needed to list, compare and pick cars, leaving out the features, colours, emissions, tax band
+# and engine details, which cost the agent tokens on every car. A single car is always full.
+VIEWS = ('full', 'compact')
+COMPACT_FIELDS = (
+    'id', 'make', 'model', 'variant', 'year', 'price_gbp', 'mileage', 'engine', 'transmission', 'location', 'status'
+)
+COMPACT_ENGINE_FIELDS = ('type',)
+
+# JSON text of the DynamoDB numbers and attribute names already seen, which repeat a lot
+# across cars (years, prices, engine sizes...)
+TEXT_CACHE_SIZE = 65536
+number_cache = {}
+name_cache = {}
+
+def parse_filters(params):
+    """
+    Parse the /cars filter query parameters, ignoring any others.
+
+    :param params: Query string parameters (or action group parameters); may be None.
+    :return: Dict of filter name to value, with numbers parsed. Empty when there are no filters.
+    :raises InvalidFilter: If a filter value is invalid.
+    """
+    filters = {}
+    for name in FILTER_NAMES:
+        value = (params or {}).get(name)
+        if value is None or str(value).strip() == '':
+            continue
+        value = str(value).strip()
+
+        if name in RANGE_FILTERS:
+            parse = RANGE_FILTERS[name][2]
+            try:
+                value = parse(value)
+                if isinstance(value, Decimal) and not value.is_finite():
+                    raise ValueError(value)
+            except Exception:
+                raise InvalidFilter(f"Invalid {name}: {value} is not a number")
+            if value < 0:
+                raise InvalidFilter(f"Invalid {name}: {value} is negative")
+        elif name == 'status':
+            value = value.lower()
+            if value not in STATUSES:
+                raise InvalidFilter(f"Invalid status: {value} (expected one of {', '.join(STATUSES)})")
+        filters[name] = value
+
+    for low, high in (('year_min', 'year_max'), ('price_min', 'price_max')):
+        if low in filters and high in filters and filters[low] > filters[high]:
+            raise InvalidFilter(f"Invalid range: {low} is greater than {high}")
+
+    return filters
+
+def parse_ids(value):
+    """
+    Parse the ids query parameter: comma separated car IDs (brackets and quotes around them,
+    as the agent sometimes sends, are ignored).
+
+    :return: List of the car IDs in the order given, without duplicates. Empty if there are none.
+    :raises InvalidFilter: If there are more than MAX_BATCH_IDS.
+    """
+    if value is None:
+        return []
+    car_ids = []
+    for car_id in str(value).strip().strip('[]').split(','):
+        car_id = car_id.strip().strip('\'"').strip()
+        if car_id and car_id not in car_ids:
+            car_ids.append(car_id)
+    if len(car_ids) > MAX_BATCH_IDS:
+        raise InvalidFilter(f"Invalid ids: at most {MAX_BATCH_IDS} cars can be looked up at once")
+    return car_ids
+
+def page_fingerprint(filters, ordering='table'):
+    """
+    Tag of the filters, the ordering of the list (see ORDERINGS) and the index it is read
+    from, that a cursor belongs to. A cursor only makes sense for the same query in the same
+    order; the start key's attributes depend on the index.
+    """
+    index = choose_index(filters) if filters and ordering == 'table' else None
+    query = {name: str(value) for name, value in (filters or {}).items()}
+    return content_version(json.dumps([ordering, index[0] if index else None, query], sort_keys=True))
+
+def encode_cursor(start_key, filters, ordering='table'):
+    """An opaque cursor for the page starting after a DynamoDB key, in an ordering (see ORDERINGS)"""
+    data = json.dumps({'k': start_key, 'f': page_fingerprint(filters, ordering)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """The start key and fingerprint of a cursor from encode_cursor"""
+    data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    return data['k'], data['f']
+
+def cursor_ordering(cursor, filters=None):
+    """The ordering (see ORDERINGS) a cursor for the filters was issued in, or None"""
+    try:
+        _, fingerprint = decode_cursor(str(cursor or '').strip())
+    except Exception:
+        return None
+    return next((ordering for ordering in ORDERINGS if fingerprint == page_fingerprint(filters, ordering)), None)
+
+def parse_page(params, filters=None):
+    """
+    Parse the limit and cursor query parameters of /cars.
+
+    :param params: Query string parameters (or action group parameters); may be None.
+    :param filters: The filters from parse_filters, which the cursor must have been issued for.
+    :return: Dict of limit, start_key (the DynamoDB key to read on from, or None for the first
+        page) and ordering (that the cursor was issued in, or None), or None if neither
+        parameter is given (the full list).
+    :raises InvalidFilter: If the limit or cursor is invalid.
+    """
+    limit = str((params or {}).get('limit') or '').strip()
+    cursor = str((params or {}).get('cursor') or '').strip()
+    if not limit and not cursor:
+        return None
+
+    page = {'limit': DEFAULT_PAGE_LIMIT, 'start_key': None, 'ordering': None}
+    if limit:
+        try:
+            page['limit'] = int(limit)
+        except ValueError:
+            raise InvalidFilter(f"Invalid limit: {limit} is not a whole number")
+        if not 1 <= page['limit'] <= MAX_PAGE_LIMIT:
+            raise InvalidFilter(f"Invalid limit: {limit} (expected 1 to {MAX_PAGE_LIMIT})")
+
+    if cursor:
+        try:
+            start_key, _ = decode_cursor(cursor)
+        except Exception:
+            raise InvalidFilter("Invalid cursor")
+        ordering = cursor_ordering(cursor, filters)
+        if not isinstance(start_key, dict) or not ordering:
+            raise InvalidFilter("Invalid cursor: it belongs to a search with different filters")
+        page['start_key'], page['ordering'] = start_key, ordering
+    return page
+
+def check_ordering(page, ordering):
+    """
+    Check that a page's cursor (if any) was issued in the ordering the list is read in.
+
+    :raises InvalidFilter: If it was issued in another, so reading on would skip or repeat cars.
+    """
+    if page and page.get('start_key') and page.get('ordering', 'table') != ordering:
+        raise InvalidFilter("Invalid cursor: the list is now in a different order; start again without a cursor")
+
+def parse_view(params, default='full'):
+    """
+    Parse the view query parameter of a list of cars.
+
+    :param params: Query string parameters (or action group parameters); may be None.
+    :param default: The view if none is given.
+    :raises InvalidFilter: If the view is not one of VIEWS.
+    """
+    view = str((params or {}).get('view') or default).strip().lower()
+    if view not in VIEWS:
+        raise InvalidFilter(f"Invalid view: {view} (expected one of {', '.join(VIEWS)})")
+    return view
+
+def compact_item(item):
+    """The compact view of a DynamoDB JSON item: COMPACT_FIELDS, with only the engine's type"""
+    compact = {name: item[name] for name in COMPACT_FIELDS if name in item}
+    if 'M' in compact.get('engine', {}):
+        engine = compact['engine']['M']
+        compact['engine'] = {'M': {name: engine[name] for name in COMPACT_ENGINE_FIELDS if name in engine}}
+    return compact
+
+def compact_car(car):
+    """The compact view of a car (deserialised, e.g. from the JSON of a full list)"""
+    compact = {name: car[name] for name in COMPACT_FIELDS if name in car}
+    if isinstance(compact.get('engine'), dict):
+        compact['engine'] = {name: car['engine'][name] for name in COMPACT_ENGINE_FIELDS if name in car['engine']}
+    return compact
+
+def cursor_after(car, filters=None, ordering='table'):
+    """
+    A cursor for the page of the filtered list starting after a car (deserialised, with
+    numbers as Decimals), e.g. to continue a page that was cut short, in the ordering (see
+    ORDERINGS) the page was read in.
+    """
+    from boto3.dynamodb.types import TypeSerializer
+
+    index = choose_index(filters) if filters and ordering == 'table' else None
+    key_names = ('id',) + (INVENTORY_INDEXES[index[0]] if index else ())
+    serializer = TypeSerializer()
+    return encode_cursor({name: serializer.serialize(car[name]) for name in key_names}, filters, ordering)
+
+def matches(car, filters):
+    """Whether a car passes every filter from parse_filters"""
+    for name in TEXT_FILTERS + ('status',):
+        if name in filters and car.get(name) != filters[name]:
+            return False
+
+    for name, (field, operator, _) in RANGE_FILTERS.items():
+        if name not in filters:
+            continue
+        value = car.get(field)
+        if value is None:
+            return False
+        if operator == 'gte' and value < filters[name]:
+            return False
+        if operator == 'lte' and value > filters[name]:
+            return False
+
+    if 'fuel_type' in filters:
+        fuel_type = str((car.get('engine') or {}).get('type', '')).lower().split()
+        if not all(word in fuel_type for word in filters['fuel_type'].lower().split()):
+            return False
+
+    if 'transmission' in filters:
+        wanted = filters['transmission'].lower()
+        transmission = str(car.get('transmission', '')).lower()
+        if wanted == 'automatic':
+            if not transmission or transmission == 'manual':
+                return False
+        elif transmission != wanted:
+            return False
+
+    return True
+
+def filter_view(item):
+    """The attributes of a DynamoDB JSON item that matches() reads, deserialised"""
+    view = {}
+    for name in TEXT_FILTERS + ('status', 'transmission'):
+        if 'S' in item.get(name, {}):
+            view[name] = item[name]['S']
+    for field, _, _ in RANGE_FILTERS.values():
+        if 'N' in item.get(field, {}):
+            view[field] = Decimal(item[field]['N'])
+    engine_type = item.get('engine', {}).get('M', {}).get('type', {})
+    if 'S' in engine_type:
+        view['engine'] = {'type': engine_type['S']}
+    return view
+
+def filter_expression(filters, exclude=()):
+    """
+    Build a DynamoDB FilterExpression for the filters DynamoDB can apply itself, so
+    non-matching cars are dropped before they leave the table. fuel_type and transmission
+    are only checked by matches(). Returns None if no filter applies.
+
+    :param exclude: Attributes to leave out, i.e. the keys of the index being queried.
+    """
+    from boto3.dynamodb.conditions import Attr
+
+    conditions = [
+        Attr(name).eq(filters[name])
+        for name in TEXT_FILTERS + ('status',) if name in filters and name not in exclude
+    ]
+    conditions += [
+        getattr(Attr(field), operator)(filters[name])
+        for name, (field, operator, _) in RANGE_FILTERS.items() if name in filters and field not in exclude
+    ]
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def choose_index(filters):
+    """
+    Choose the deployed index to query for the filters: the first whose partition key has
+    an equality filter.
+
+    :return: Tuple of (index name, KeyConditionExpression), or None to scan the table.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    for index_name, (partition_key, sort_key) in INVENTORY_INDEXES.items():
+        if index_name not in DEPLOYED_INDEXES or partition_key not in filters:
+            continue
+
+        condition = Key(partition_key).eq(filters[partition_key])
+        if sort_key == 'price_gbp':
+            low, high = filters.get('price_min'), filters.get('price_max')
+            if low is not None and high is not None:
+                condition &= Key(sort_key).between(low, high)
+            elif low is not None:
+                condition &= Key(sort_key).gte(low)
+            elif high is not None:
+                condition &= Key(sort_key).lte(high)
+        elif sort_key in filters:
+            condition &= Key(sort_key).eq(filters[sort_key])
+        return index_name, condition
+
+    return None
+
+def expression_parameters(key_condition=None, condition=None):
+    """
+    Build the low-level Query or Scan expression parameters for boto3 Key and Attr
+    conditions, as the Table resource does.
+    """
+    from boto3.dynamodb.conditions import ConditionExpressionBuilder
+    from boto3.dynamodb.types import TypeSerializer
+
+    builder = ConditionExpressionBuilder()
+    parameters, names, values = {}, {}, {}
+    for name, expression, is_key_condition in (
+        ('KeyConditionExpression', key_condition, True),
+        ('FilterExpression', condition, False)
+    ):
+        if expression is None:
+            continue
+        built = builder.build_expression(expression, is_key_condition=is_key_condition)
+        parameters[name] = built.condition_expression
+        names.update(built.attribute_name_placeholders)
+        values.update(built.attribute_value_placeholders)
+
+    if names:
+        parameters['ExpressionAttributeNames'] = names
+    if values:
+        serializer = TypeSerializer()
+        parameters['ExpressionAttributeValues'] = {k: serializer.serialize(v) for k, v in values.items()}
+    return parameters
+
+def read_request(table_name, filters=None):
+    """
+    The low-level read for the filters: a Query of an index when the filters allow it, so only
+    matching cars are read, otherwise a Scan of the table, filtered in DynamoDB where possible.
+
+    :return: Tuple of (client method, its parameters, names of the key attributes of an item).
+    """
+    client = aws_clients.client('dynamodb')
+    index = choose_index(filters) if filters else None
+    if index:
+        index_name, key_condition = index
+        read = client.query
+        kwargs = expression_parameters(key_condition, filter_expression(filters, exclude=INVENTORY_INDEXES[index_name]))
+        kwargs['IndexName'] = index_name
+        key_names = ('id',) + INVENTORY_INDEXES[index_name]
+    else:
+        read = client.scan
+        kwargs = expression_parameters(condition=filter_expression(filters) if filters else None)
+        key_names = ('id',)
+    kwargs['TableName'] = table_name
+    return read, kwargs, key_names
+
+def read_items(table_name, filters=None):
+    """
+    Read the cars matching the filters (all cars if there are none), as DynamoDB JSON items
+    from the low-level client.
+    """
+    read, kwargs, _ = read_request(table_name, filters)
+
+    while True:
+        response = read(**kwargs)
+        for item in response['Items']:
+            if not filters or matches(filter_view(item), filters):
+                yield item
+
+        # Handle pagination
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def read_page(table_name, filters=None, limit=DEFAULT_PAGE_LIMIT, start_key=None):
+    """
+    Read one page of the cars matching the filters, holding no more than a page in memory.
+
+    Unfiltered pages read exactly the cars returned. Filtered pages read PAGE_READ_ITEMS (or
+    limit, if more) items per request until the page is full; if the last request matched
+    more cars than fit, the page ends at the last car returned.
+
+    :param start_key: DynamoDB key to read on from (from parse_page), or None for the first page.
+    :return: Tuple of (DynamoDB JSON items, key the next page starts after or None if this is
+        the last page).
+    """
+    read, kwargs, key_names = read_request(table_name, filters)
+    kwargs['Limit'] = max(limit, PAGE_READ_ITEMS) if filters else limit
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+
+    items = []
+    while True:
+        if not filters:
+            kwargs['Limit'] = limit - len(items)
+        response = read(**kwargs)
+        for item in response['Items']:
+            if filters and not matches(filter_view(item), filters):
+                continue
+            items.append(item)
+            if len(items) == limit and item is not response['Items'][-1]:
+                return items, {name: item[name] for name in key_names if name in item}
+
+        if 'LastEvaluatedKey' not in response:
+            return items, None
+        if len(items) == limit:
+            return items, response['LastEvaluatedKey']
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def batch_get_items(table_name, car_ids):
+    """
+    Read cars by ID with BatchGetItem, MAX_BATCH_IDS keys per request. Unprocessed keys are
+    retried with jittered exponential backoff.
+
+    :param car_ids: Car IDs, without duplicates (BatchGetItem rejects them).
+    :return: Dict of car ID to DynamoDB JSON item, for the cars found.
+    """
+    client = aws_clients.client('dynamodb')
+    items = {}
+    for start in range(0, len(car_ids), MAX_BATCH_IDS):
+        request = {table_name: {'Keys': [{'id': {'S': car_id}} for car_id in car_ids[start:start + MAX_BATCH_IDS]]}}
+        for attempt in range(BATCH_GET_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, BATCH_GET_BACKOFF_SECONDS * 2 ** attempt))
+            response = client.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(table_name, []):
+                items[item['id']['S']] = item
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+        else:
+            raise RuntimeError(f"Car lookup incomplete: keys still unprocessed after {BATCH_GET_ATTEMPTS} attempts")
+    return items
+
+def get_inventory_json(table_name, car_id=None, filters=None, car_ids=None, page=None, view='full'):
+    """
+    Look up the car inventory. Shared by the inventory API (get_vehicle_inventory) and the
+    query_inventory action group's direct DynamoDB mode, so both return the same results.
+
+    Items are read with the low-level client and converted straight to JSON (item_json),
+    skipping boto3's deserialisation and DecimalEncoder.
+
+    :param table_name: The car inventory table.
+    :param car_id: Optional ID of a single car.
+    :param filters: Optional filters from parse_filters for the list of cars.
+    :param car_ids: Optional IDs from parse_ids, to list only those cars (in the order given;
+        unknown IDs are left out) with a batch lookup.
+    :param page: Optional page of the list of cars from parse_page. The body is then an object
+        of the cars and next_cursor (null on the last page) rather than a list.
+    :param view: "full" or "compact" (see VIEWS) for the cars in a list. A single car is
+        always full.
+    :return: Tuple of (HTTP status code, JSON response body).
+    """
+    def list_json(items):
+        if view == 'compact':
+            return '[' + ', '.join([item_json(compact_item(item)) for item in items]) + ']'
+        return '[' + ', '.join([item_json(item) for item in items]) + ']'
+
+    if car_ids:
+        items = batch_get_items(table_name, car_ids)
+        found = [items[car_id] for car_id in car_ids if car_id in items]
+        if filters:
+            found = [item for item in found if matches(filter_view(item), filters)]
+        return 200, list_json(found)
+
+    if car_id:
+        response = aws_clients.client('dynamodb').get_item(TableName=table_name, Key={'id': {'S': car_id}})
+
+        if 'Item' not in response:
+            return 404, json.dumps({'message': f'Car with ID {car_id} not found'})
+
+        return 200, item_json(response['Item'])
+
+    if page:
+        check_ordering(page, 'table')
+        items, next_key = read_page(table_name, filters, page['limit'], page['start_key'])
+        next_cursor = encode_cursor(next_key, filters) if next_key else None
+        return 200, '{"cars": ' + list_json(items) + ', "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+    return 200, list_json(read_items(table_name, filters))
+
+def content_version(body):
+    """A version tag for a response body or document: the start of its SHA-256 hash"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()[:16]
+
+def number_json(value):
+    """JSON text of a DynamoDB number, as DecimalEncoder writes it (always a float)"""
+    text = number_cache.get(value)
+    if text is None:
+        text = json.dumps(float(value))
+        if len(number_cache) >= TEXT_CACHE_SIZE:
+            number_cache.clear()
+        number_cache[value] = text
+    return text
+
+def name_json(name):
+    """JSON text of an attribute name, followed by the key separator"""
+    text = name_cache.get(name)
+    if text is None:
+        text = encode_basestring_ascii(name) + ': '
+        if len(name_cache) >= TEXT_CACHE_SIZE:
+            name_cache.clear()
+        name_cache[name] = text
+    return text
+
+def value_json(value):
+    """JSON text of a DynamoDB JSON value, checking the most common types first"""
+    if 'S' in value:
+        return encode_basestring_ascii(value['S'])
+    if 'N' in value:
+        return number_json(value['N'])
+    if 'M' in value:
+        return map_json(value['M'])
+    if 'L' in value:
+        return '[' + ', '.join([value_json(element) for element in value['L']]) + ']'
+    if 'BOOL' in value:
+        return 'true' if value['BOOL'] else 'false'
+    if 'NULL' in value:
+        return 'null'
+    # Sets and binary values fail as they do with DecimalEncoder
+    type_name = 'Binary' if 'B' in value else 'set'
+    raise TypeError(f'Object of type {type_name} is not JSON serializable')
+
+def map_json(value):
+    """JSON text of a DynamoDB map (or item)"""
+    return '{' + ', '.join([name_json(name) + value_json(attribute) for name, attribute in value.items()]) + '}'
+
+def item_json(item):
+    """
+    Convert a DynamoDB JSON item from the low-level client straight to JSON text. The output
+    is identical to json.dumps(item, cls=DecimalEncoder) of the deserialised item.
+    """
+    return map_json(item)
+
+def scan_pages(table_name, segments=None, **scan_kwargs):
+    """
+    Read the whole table with a parallel scan, one thread per segment, yielding pages of
+    DynamoDB JSON items as they arrive. Pages come in no particular order, and at most two
+    per segment are held in memory at a time.
+
+    :param table_name: The car inventory table.
+    :param segments: Number of scan segments. Defaults to INVENTORY_EXPORT_SEGMENTS.
+    :param scan_kwargs: Further low-level Scan parameters, e.g. ProjectionExpression.
+    :return: Generator of lists of items.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    segments = segments or EXPORT_SEGMENTS
+    # The low-level client is thread safe, unlike the Table resource
+    client = aws_clients.client('dynamodb')
+    pages = queue.Queue(maxsize=segments * 2)
+    stopped = threading.Event()
+
+    def put(page):
+        # Give up if the consumer has stopped, rather than block on a full queue
+        while not stopped.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment):
+        kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=segments)
+        try:
+            while not stopped.is_set():
+                response = client.scan(**kwargs)
+                put(response['Items'])
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix='inventory-scan') as executor:
+        for segment in range(segments):
+            executor.submit(scan_segment, segment)
+
+        try:
+            remaining = segments
+            while remaining:
+                page = pages.get()
+                if page is None:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stopped.set()
+
+def scan_inventory(table_name, segments=None, **scan_kwargs):
+    """
+    Read the whole table with a parallel scan (see scan_pages), yielding items as their
+    pages arrive.
+
+    :return: Generator of items, with numbers as Decimals.
+    """
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    for page in scan_pages(table_name, segments, **scan_kwargs):
+        for item in page:
+            yield {name: deserializer.deserialize(value) for name, value in item.items()}
+
+def export_inventory(table_name, out, filters=None, segments=None, view='full'):
+    """
+    Write the inventory to a text stream as NDJSON (one car per line), from a parallel scan.
+    Each page is written as it arrives, so the whole inventory is never held in memory.
+
+    :param table_name: The car inventory table.
+    :param out: Text stream to write to.
+    :param filters: Optional filters from parse_filters.
+    :param segments: Number of scan segments. Defaults to INVENTORY_EXPORT_SEGMENTS.
+    :param view: "full" or "compact" (see VIEWS).
+    :return: Number of cars written.
+    """
+    count = 0
+    for page in scan_pages(table_name, segments):
+        items = [item for item in page if not filters or matches(filter_view(item), filters)]
+        lines = [item_json(compact_item(item) if view == 'compact' else item) for item in items]
+        if lines:
+            out.write('\n'.join(lines))
+            out.write('\n')
+            count += len(lines)
+    return count
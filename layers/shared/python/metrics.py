@@ -0,0 +1,47 @@
+import json
+import os
+import time
+
+# CloudWatch namespace for the metrics emitted by the dealership functions
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'DealershipAI')
+
+def put_metrics(metrics, dimensions=None, properties=None, units=None, rollup=False):
+    """
+    Emit metrics using the CloudWatch Embedded Metric Format (EMF).
+
+    The record is printed to stdout as a single JSON line, which CloudWatch Logs extracts
+    into metrics asynchronously without any API calls from the function.
+
+    :param metrics: Dict of metric name to value.
+    :param dimensions: Dict of dimension name to value.
+    :param properties: Dict of additional searchable properties (e.g. sessionId) that are
+        logged with the record but are not metric dimensions.
+    :param units: Dict of metric name to CloudWatch unit. Defaults to Milliseconds.
+    :param rollup: Also publish the metrics without any dimensions, aggregated across all
+        dimension values (e.g. an overall hit rate alongside the per-route ones).
+    """
+    dimensions = dimensions or {}
+    units = units or {}
+
+    dimension_sets = [list(dimensions.keys())]
+    if rollup:
+        dimension_sets.append([])
+
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': dimension_sets,
+                'Metrics': [
+                    {'Name': name, 'Unit': units.get(name, 'Milliseconds')}
+                    for name in metrics
+                ]
+            }]
+        }
+    }
+    record.update(properties or {})
+    record.update(dimensions)
+    record.update(metrics)
+
+    print(json.dumps(record, default=str))
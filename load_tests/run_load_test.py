@@ -0,0 +1,227 @@
+"""
+Offline load test for the agent invoker Lambda function.
+
+Replays prompts from a JSONL file against agent_invoker.lambda_handler with a stub
+bedrock-agent-runtime client, so no network access or Bedrock quota is needed. Each
+worker process handles one request at a time, like a Lambda execution environment, and
+the report gives throughput, latency percentiles and per-request memory.
+
+Usage:
+    python load_tests/run_load_test.py --prompts load_tests/prompts.jsonl --requests 500 --concurrency 8
+"""
+import argparse
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+LOAD_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNCTIONS_DIR = os.path.join(os.path.dirname(LOAD_TEST_DIR), 'functions')
+SHARED_LAYER_DIR = os.path.join(os.path.dirname(LOAD_TEST_DIR), 'layers', 'shared', 'python')
+
+# Environment for the handler. Everything that would call another AWS service (answer
+# cache, intent router, session context, jobs) is switched off so only the agent path runs.
+HANDLER_ENVIRONMENT = {
+    'AGENT_ID': 'LOADTEST',
+    'AGENT_ALIAS': 'LOADTEST',
+    'AGENT_TRACE_ENABLED': 'false',
+    'INTENT_ROUTER_ENABLED': 'false',
+    'SESSION_CONTEXT_ENABLED': 'false',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_EC2_METADATA_DISABLED': 'true'
+}
+DISABLED_ENVIRONMENT = ['ANSWER_CACHE_TABLE', 'AGENT_JOBS_TABLE', 'INVENTORY_TABLE_NAME']
+
+# Per-process state, set up by init_worker
+worker = {}
+
+def load_prompts(path, field=None):
+    """
+    Load prompts from a JSONL file.
+
+    :param path: Path to the JSONL file.
+    :param field: Record field holding the prompt. Defaults to 'prompt', falling back to
+        'title' so backlog style files (request_id, title, body) can be replayed too.
+    :return: List of prompt strings.
+    """
+    prompts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                prompts.append(record)
+                continue
+            prompt = record.get(field) if field else record.get('prompt') or record.get('title')
+            if prompt:
+                prompts.append(prompt)
+
+    if not prompts:
+        raise ValueError(f"No prompts found in {path}")
+    return prompts
+
+def init_worker(stub_options, measure_memory):
+    """Import the handler in a worker process and replace its Bedrock client with the stub"""
+    os.environ.update(HANDLER_ENVIRONMENT)
+    for name in DISABLED_ENVIRONMENT:
+        os.environ.pop(name, None)
+    sys.path[:0] = [FUNCTIONS_DIR, SHARED_LAYER_DIR, LOAD_TEST_DIR]
+
+    # Log records are still created, as they are in Lambda, but not written anywhere
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    import agent_invoker
+    import aws_clients
+    from stub_bedrock import StubBedrockAgentRuntime
+
+    aws_clients.set_client('bedrock-agent-runtime', StubBedrockAgentRuntime(**stub_options))
+    worker['handler'] = agent_invoker.lambda_handler
+
+    if measure_memory:
+        tracemalloc.start()
+
+def run_request(task):
+    """Send one prompt to the handler and measure its latency and memory"""
+    index, prompt = task
+    body = json.dumps({
+        'prompt': prompt,
+        'sessionId': f"load-test-{os.getpid()}-{index}",
+        'turnIndex': 0
+    })
+    # As API Gateway sends it: every media type is binary on the API, so the body is base64 encoded
+    event = {
+        'httpMethod': 'POST',
+        'headers': {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip, deflate, br'},
+        'requestContext': {'authorizer': {'claims': {'sub': 'load-test'}}},
+        'body': base64.b64encode(body.encode('utf-8')).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+    measure_memory = tracemalloc.is_tracing()
+    if measure_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    start_time = time.perf_counter()
+    response = worker['handler'](event, None)
+    latency_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        'statusCode': response['statusCode'],
+        'latencyMs': latency_ms,
+        'peakKb': (tracemalloc.get_traced_memory()[1] - baseline) / 1024 if measure_memory else None,
+        'pid': os.getpid(),
+        # ru_maxrss is in KB on Linux and bytes on macOS
+        'maxRssKb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1)
+    }
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def build_report(results, duration_s, concurrency, stub):
+    """Summarise the results of a load test run"""
+    latencies = [r['latencyMs'] for r in results]
+    peaks = [r['peakKb'] for r in results if r['peakKb'] is not None]
+    max_rss = {}
+    for r in results:
+        max_rss[r['pid']] = max(max_rss.get(r['pid'], 0), r['maxRssKb'])
+
+    status_counts = {}
+    for r in results:
+        status_counts[str(r['statusCode'])] = status_counts.get(str(r['statusCode']), 0) + 1
+
+    return {
+        'requests': len(results),
+        'concurrency': concurrency,
+        'durationS': round(duration_s, 3),
+        'throughputRps': round(len(results) / duration_s, 2) if duration_s else None,
+        'statusCodes': status_counts,
+        'latencyMs': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(max(latencies), 2)
+        },
+        'requestPeakKb': {
+            'p50': round(percentile(peaks, 50), 1),
+            'p95': round(percentile(peaks, 95), 1),
+            'max': round(max(peaks), 1)
+        } if peaks else None,
+        'workerMaxRssKb': round(max(max_rss.values())),
+        'stub': stub
+    }
+
+def print_report(report):
+    """Print the report as a table"""
+    print(f"Requests:     {report['requests']} at concurrency {report['concurrency']} in {report['durationS']}s")
+    print(f"Throughput:   {report['throughputRps']} requests/s")
+    print(f"Status codes: {', '.join(f'{code} x{count}' for code, count in sorted(report['statusCodes'].items()))}")
+    latency = report['latencyMs']
+    print(f"Latency (ms): p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    if report['requestPeakKb']:
+        peak = report['requestPeakKb']
+        print(f"Request peak Python memory (KB): p50 {peak['p50']}  p95 {peak['p95']}  max {peak['max']}")
+    print(f"Worker max RSS (KB): {report['workerMaxRssKb']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for agent_invoker.lambda_handler")
+    parser.add_argument('--prompts', default=os.path.join(LOAD_TEST_DIR, 'prompts.jsonl'),
+                        help="JSONL file of prompts to replay")
+    parser.add_argument('--field', help="Record field holding the prompt (default: prompt, then title)")
+    parser.add_argument('--requests', type=int, help="Total requests to send, cycling through the prompts (default: one per prompt)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Number of worker processes")
+    parser.add_argument('--chunk-count', type=int, default=8, help="Completion chunks per turn")
+    parser.add_argument('--chunk-size', type=int, default=64, help="Bytes per completion chunk")
+    parser.add_argument('--ttfb-ms', type=float, default=500, help="Stub time to first byte")
+    parser.add_argument('--chunk-interval-ms', type=float, default=20, help="Stub time between chunks")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of calls throttled by the stub")
+    parser.add_argument('--seed', type=int, help="Random seed for throttling")
+    parser.add_argument('--no-memory', action='store_true', help="Skip tracemalloc, which slows the handler down")
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.prompts, args.field)
+    total = args.requests or len(prompts)
+    tasks = [(index, prompts[index % len(prompts)]) for index in range(total)]
+
+    stub_options = {
+        'chunk_count': args.chunk_count,
+        'chunk_size': args.chunk_size,
+        'ttfb_ms': args.ttfb_ms,
+        'chunk_interval_ms': args.chunk_interval_ms,
+        'throttle_rate': args.throttle_rate,
+        'seed': args.seed
+    }
+
+    with multiprocessing.Pool(args.concurrency, initializer=init_worker,
+                              initargs=(stub_options, not args.no_memory)) as pool:
+        # Make sure every worker has imported the handler before timing starts
+        pool.map(time.sleep, [0.1] * args.concurrency)
+
+        start_time = time.perf_counter()
+        results = list(pool.imap_unordered(run_request, tasks))
+        duration_s = time.perf_counter() - start_time
+
+    report = build_report(results, duration_s, args.concurrency, stub_options)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+
+# Synthetic completion text. Includes a multi-byte character (£) so chunks split mid
+# character, as real Bedrock chunks can be.
+WORDS = [
+    'the', 'BMW', '5', 'Series', 'is', 'available', 'for', '£42,995', 'with', 'a', 'hybrid',
+    'engine', 'and', 'we', 'can', 'book', 'you', 'a', 'test', 'drive', 'at', 'our', 'showroom'
+]
+
+class StubBedrockAgentRuntime:
+    """
+    Offline stand-in for the bedrock-agent-runtime client.
+
+    invoke_agent returns the same response shape as boto3: a dict whose 'completion' member
+    is an iterable of events, each with a 'chunk' carrying UTF-8 'bytes'. Nothing is sent
+    over the network.
+
+    :param chunk_count: Number of completion chunks per turn.
+    :param chunk_size: Size of each chunk in bytes.
+    :param ttfb_ms: Time to first byte, slept before the first chunk is yielded.
+    :param chunk_interval_ms: Time slept between subsequent chunks.
+    :param throttle_rate: Fraction (0-1) of calls rejected with a throttlingException.
+    :param seed: Random seed for the throttling decisions, combined with the process ID so
+        each load test worker throttles a different sequence of calls.
+    """
+
+    def __init__(self, chunk_count=8, chunk_size=64, ttfb_ms=500, chunk_interval_ms=20, throttle_rate=0.0, seed=None):
+        self.chunk_count = chunk_count
+        self.chunk_size = chunk_size
+        self.ttfb_ms = ttfb_ms
+        self.chunk_interval_ms = chunk_interval_ms
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(None if seed is None else f"{seed}-{os.getpid()}")
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    def invoke_agent(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            throttle = self.random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+
+        if throttle:
+            raise ClientError(
+                {'Error': {'Code': 'throttlingException', 'Message': 'Rate exceeded'},
+                 'ResponseMetadata': {'HTTPStatusCode': 429}},
+                'InvokeAgent'
+            )
+
+        return {
+            'completion': self.stream_completion(),
+            'contentType': 'application/json',
+            'sessionId': kwargs.get('sessionId')
+        }
+
+    def stream_completion(self):
+        """Yield chunk events, sleeping for the time to first byte and between chunks"""
+        payload = self.build_payload()
+        time.sleep(self.ttfb_ms / 1000)
+
+        for index in range(self.chunk_count):
+            if index:
+                time.sleep(self.chunk_interval_ms / 1000)
+            yield {'chunk': {'bytes': payload[index * self.chunk_size:(index + 1) * self.chunk_size]}}
+
+    def build_payload(self):
+        """Build chunk_count * chunk_size bytes of synthetic completion text"""
+        size = self.chunk_count * self.chunk_size
+        text = ''
+        while len(text.encode('utf-8')) < size:
+            text += ' '.join(WORDS) + '. '
+        return text.encode('utf-8')[:size].rstrip(b'\xc2')
@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks'))
+
+from local_inventory import InMemoryDynamoDBClient, load_seed_items, setup_offline_environment
+
+setup_offline_environment()
+
+import aws_clients
+import get_vehicle_inventory
+import inventory_index
+import query_inventory
+from inventory_recommend import parse_preferences, rank
+from inventory_store import InvalidFilter, matches, parse_filters, parse_page
+
+CAR_COUNT = 300
+
+items = load_seed_items(CAR_COUNT)
+
+@pytest.fixture(autouse=True)
+def inventory(monkeypatch):
+    """The seed inventory in an in-memory table, read without the columnar index or the snapshot"""
+    aws_clients.set_client('dynamodb', InMemoryDynamoDBClient(items, page_size=50, indexes={}))
+    monkeypatch.setattr(inventory_index, 'INDEX_ENABLED', False)
+    monkeypatch.setattr(inventory_index, 'index_cache', {'index': None})
+    monkeypatch.setattr(query_inventory, 'INVENTORY_ACCESS_MODE', 'dynamodb')
+    monkeypatch.setattr(query_inventory, 'CACHE_MAX_BYTES', 0)
+
+@pytest.fixture(params=[False, True], ids=['table', 'index'])
+def columnar_index(request, monkeypatch):
+    """Lists of cars read from the table, then from the columnar inventory index"""
+    monkeypatch.setattr(inventory_index, 'INDEX_ENABLED', request.param)
+    return request.param
+
+def get_cars(query, resource='/cars'):
+    event = {'resource': resource, 'pathParameters': None, 'queryStringParameters': query, 'headers': {}}
+    response = get_vehicle_inventory.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+def walk(query, limit):
+    """The IDs of every car on the pages of a list, following next_cursor"""
+    ids, cursor = [], None
+    while True:
+        status_code, body = get_cars(dict(query, limit=str(limit), **({'cursor': cursor} if cursor else {})))
+        assert status_code == 200, body
+        assert len(body['cars']) <= limit
+        ids.extend(car['id'] for car in body['cars'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids
+
+def row_ids(index, rows):
+    """The car IDs of rows of the columnar index"""
+    return [json.loads(inventory_index.car_text(index, row))['id'] for row in rows.tolist()]
+
+def action_group_event(api_path, parameters):
+    return {
+        'messageVersion': '1.0',
+        'agent': {'name': 'test'},
+        'actionGroup': 'query_vehicle_inventory',
+        'apiPath': api_path,
+        'httpMethod': 'GET',
+        'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in parameters.items()]
+    }
+
+def query(api_path, parameters):
+    response = query_inventory.lambda_handler(action_group_event(api_path, parameters), None)
+    return response, json.loads(response['response']['responseBody']['application/json']['body'])
+
+@pytest.mark.parametrize('filters', [{}, {'make': 'BMW'}, {'fuel_type': 'hybrid', 'price_max': '40000'}])
+def test_paged_walk_equals_full_list(columnar_index, filters):
+    expected = sorted(item['id'] for item in items if matches(item, parse_filters(filters)))
+    ids = walk(filters, limit=7)
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == expected
+
+def test_index_pages_are_in_car_id_order(columnar_index):
+    ids = walk({}, limit=25)
+    if columnar_index:
+        assert ids == sorted(ids)
+
+def test_cursor_with_different_filters_is_rejected(columnar_index):
+    status_code, body = get_cars({'make': 'BMW', 'limit': '5'})
+    assert status_code == 200 and body['next_cursor']
+
+    status_code, body = get_cars({'make': 'Audi', 'limit': '5', 'cursor': body['next_cursor']})
+    assert status_code == 400
+    assert 'different filters' in body['message']
+
+def test_parse_page_checks_the_cursor_filters():
+    _, body = get_cars({'make': 'BMW', 'limit': '5'})
+    assert parse_page({'cursor': body['next_cursor']}, {'make': 'BMW'})['start_key']
+    with pytest.raises(InvalidFilter):
+        parse_page({'cursor': body['next_cursor']}, {'make': 'Audi'})
+    with pytest.raises(InvalidFilter):
+        parse_page({'cursor': body['next_cursor']}, {})
+
+def test_cursor_from_another_ordering_is_rejected(monkeypatch):
+    _, body = get_cars({'limit': '5'})
+    monkeypatch.setattr(inventory_index, 'INDEX_ENABLED', True)
+    status_code, _ = get_cars({'limit': '5', 'cursor': body['next_cursor']})
+    assert status_code == 400
+
+def test_malformed_cursor_is_rejected():
+    status_code, body = get_cars({'limit': '5', 'cursor': 'not-a-cursor'})
+    assert status_code == 400
+
+@pytest.mark.parametrize('limit', ['0', '101', '-1', 'ten'])
+def test_invalid_limit_is_rejected(limit):
+    status_code, body = get_cars({'limit': limit})
+    assert status_code == 400
+    assert body['message'].startswith('Invalid limit')
+
+    response, _ = query('/cars', {'limit': limit})
+    assert response['response']['httpStatusCode'] == 400
+
+@pytest.mark.parametrize('limit', ['1', '100'])
+def test_limit_bounds_are_accepted(limit):
+    status_code, body = get_cars({'limit': limit})
+    assert status_code == 200
+    assert len(body['cars']) == int(limit)
+
+def test_large_page_is_truncated_within_budget(columnar_index):
+    response, body = query('/cars', {'limit': '100', 'view': 'full'})
+    assert len(json.dumps(response).encode('utf-8')) <= query_inventory.RESPONSE_BUDGET_BYTES
+    assert body['truncated'] is True
+    assert query_inventory.MIN_TRUNCATED_CARS <= len(body['cars']) < 100
+
+    # The next page starts straight after the cars kept
+    expected = walk({}, limit=100)[:len(body['cars']) + 5]
+    _, next_page = get_cars({'limit': '5', 'cursor': body['next_cursor']})
+    assert [car['id'] for car in body['cars'] + next_page['cars']] == expected
+
+def test_large_batch_is_truncated_within_budget():
+    ids = [item['id'] for item in items if query_inventory.validate_car_id(item['id'])][:100]
+    response, body = query('/cars/batch', {'ids': ','.join(ids), 'view': 'full'})
+    assert len(json.dumps(response).encode('utf-8')) <= query_inventory.RESPONSE_BUDGET_BYTES
+    assert body['truncated'] is True
+    listed = [car['id'] for car in body['cars']]
+    assert sorted(listed + body['remaining_ids'].split(',')) == sorted(ids)
+
+def test_small_budget_falls_back_to_summary(monkeypatch):
+    monkeypatch.setattr(query_inventory, 'RESPONSE_BUDGET_BYTES', 1000)
+    response, body = query('/cars', {'limit': '100', 'view': 'full'})
+    assert len(json.dumps(response).encode('utf-8')) <= 1500
+    assert body['summary']['cars'] == 100
+    assert body['next_cursor']
+
+@pytest.mark.parametrize('prefer', [',', ' , ,', ':low'])
+def test_empty_preferences_are_rejected(prefer):
+    with pytest.raises(InvalidFilter):
+        parse_preferences(prefer)
+
+    status_code, body = get_cars({'prefer': prefer}, resource='/cars/recommend')
+    assert status_code == 400
+    assert body['message'].startswith('Invalid prefer')
+
+    response, _ = query('/cars/recommend', {'prefer': prefer})
+    assert response['response']['httpStatusCode'] == 400
+
+def test_invalid_preferences_are_rejected():
+    for prefer in ('colour:low', 'price_gbp', 'price_gbp:cheap', 'price_gbp:low:0', 'price_gbp:low:x'):
+        with pytest.raises(InvalidFilter):
+            parse_preferences(prefer)
+
+def test_preferences_are_parsed():
+    assert parse_preferences('price_gbp:low, year:2021:2,price_gbp:high') == [
+        ('price_gbp', 'high', 1.0), ('year', 2021.0, 2.0)
+    ]
+
+def test_recommendations_rank_by_preference():
+    status_code, body = get_cars({'prefer': 'price_gbp:low', 'limit': '10'}, resource='/cars/recommend')
+    assert status_code == 200
+
+    available = [item for item in items if item.get('status') == 'available']
+    expected = sorted(available, key=lambda item: (item['price_gbp'], item['id']))[:10]
+    assert [car['id'] for car in body['cars']] == [item['id'] for item in expected]
+    assert body['candidates'] == len(available)
+    scores = [car['match_score'] for car in body['cars']]
+    assert scores == sorted(scores, reverse=True)
+
+def test_rank_respects_filters():
+    index = inventory_index.get_index('car-inventory')
+    filters = {'make': 'BMW', 'status': 'available'}
+    rows, scores, candidates = rank(index, filters, parse_preferences('mileage:low'), 50)
+    assert candidates == len([item for item in items if matches(item, filters)])
+    assert set(row_ids(index, rows)) <= {item['id'] for item in items if matches(item, filters)}
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'make': 'BMW'},
+    {'status': 'available', 'price_max': '30000'},
+    {'fuel_type': 'hybrid'},
+    {'transmission': 'automatic', 'year_min': '2021'},
+    {'transmission': 'manual', 'mileage_max': '20000'},
+    {'location': 'Nowhere'}
+])
+def test_filter_rows_agree_with_matches(filters):
+    index = inventory_index.get_index('car-inventory')
+    filters = parse_filters(filters)
+    assert row_ids(index, inventory_index.filter_rows(index, filters)) == sorted(item['id'] for item in items if matches(item, filters))
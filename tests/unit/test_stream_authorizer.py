@@ -0,0 +1,104 @@
+import base64
+import json
+import os
+import sys
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'functions'))
+
+import stream_authorizer
+
+REGION = 'eu-west-2'
+USER_POOL_ID = 'eu-west-2_TESTPOOL'
+CLIENT_ID = 'test-client'
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+METHOD_ARN = 'arn:aws:execute-api:eu-west-2:123456789012:abcdef/prod/$connect'
+
+signing_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def public_jwk(private_key, kid):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return dict(jwk, kid=kid, alg='RS256', use='sig')
+
+@pytest.fixture(autouse=True)
+def user_pool(monkeypatch):
+    """The authorizer configured for a test user pool, whose JWKS is served without a network call"""
+    monkeypatch.setattr(stream_authorizer, 'REGION', REGION)
+    monkeypatch.setattr(stream_authorizer, 'USER_POOL_ID', USER_POOL_ID)
+    monkeypatch.setattr(stream_authorizer, 'CLIENT_ID', CLIENT_ID)
+    monkeypatch.setattr(stream_authorizer, 'jwks_client', None)
+    monkeypatch.setattr(jwt.PyJWKClient, 'fetch_data', lambda self: {'keys': [public_jwk(signing_key, 'key-1')]})
+
+def id_token(key=signing_key, kid='key-1', algorithm='RS256', **claims):
+    now = int(time.time())
+    payload = {
+        'sub': 'user-1', 'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id',
+        'iat': now, 'exp': now + 3600
+    }
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm=algorithm, headers={'kid': kid})
+
+def authorize(token):
+    event = {'methodArn': METHOD_ARN, 'queryStringParameters': {'token': token} if token else None}
+    return stream_authorizer.lambda_handler(event, None)
+
+def effect(response):
+    return response['policyDocument']['Statement'][0]['Effect']
+
+def test_valid_token_is_allowed():
+    response = authorize(id_token())
+    assert effect(response) == 'Allow'
+    assert response['principalId'] == 'user-1'
+    assert response['policyDocument']['Statement'][0]['Resource'] == METHOD_ARN
+
+def test_missing_token_is_denied():
+    assert effect(authorize(None)) == 'Deny'
+
+def test_expired_token_is_denied():
+    assert effect(authorize(id_token(exp=int(time.time()) - 60))) == 'Deny'
+
+def test_token_without_expiry_is_denied():
+    token = id_token()
+    header, payload, _ = token.split('.')
+    claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    del claims['exp']
+    assert effect(authorize(jwt.encode(claims, signing_key, algorithm='RS256', headers={'kid': 'key-1'}))) == 'Deny'
+
+def test_wrong_audience_is_denied():
+    assert effect(authorize(id_token(aud='another-client'))) == 'Deny'
+
+def test_wrong_issuer_is_denied():
+    assert effect(authorize(id_token(iss='https://cognito-idp.eu-west-2.amazonaws.com/another-pool'))) == 'Deny'
+
+def test_access_token_is_denied():
+    assert effect(authorize(id_token(token_use='access'))) == 'Deny'
+
+def test_unknown_kid_is_denied():
+    assert effect(authorize(id_token(key=other_key, kid='key-2'))) == 'Deny'
+
+def test_token_signed_by_another_key_is_denied():
+    assert effect(authorize(id_token(key=other_key))) == 'Deny'
+
+def test_tampered_signature_is_denied():
+    header, payload, signature = id_token().split('.')
+    tampered = signature[:-4] + ('AAAA' if not signature.endswith('AAAA') else 'BBBB')
+    assert effect(authorize(f"{header}.{payload}.{tampered}")) == 'Deny'
+
+def test_tampered_claims_are_denied():
+    header, _, signature = id_token().split('.')
+    claims = {'sub': 'admin', 'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id', 'exp': int(time.time()) + 3600}
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode('utf-8')).decode('ascii').rstrip('=')
+    assert effect(authorize(f"{header}.{payload}.{signature}")) == 'Deny'
+
+def test_unsigned_token_is_denied():
+    token = jwt.encode({'sub': 'user-1', 'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id',
+                        'exp': int(time.time()) + 3600}, None, algorithm='none', headers={'kid': 'key-1'})
+    assert effect(authorize(token)) == 'Deny'
+
+def test_malformed_token_is_denied():
+    assert effect(authorize('not-a-jwt')) == 'Deny'
@@ -33,6 +33,20 @@ document.addEventListener('DOMContentLoaded', function() {
     // Flag to track if a request is in progress
     let isRequestInProgress = false;
     
+    // Number of completed turns in this chat session, and the turns answered without the
+    // agent that still need to be replayed to the agent as conversation history
+    let turnIndex = 0;
+    let replayTurns = [];
+    
+    // Buffered requests give up just before API Gateway's 29s integration timeout and
+    // collect the answer from the agent jobs API instead. Once a turn has run long, later
+    // turns use async mode straight away.
+    const SYNC_TIMEOUT_MS = 28000;
+    const LONG_TURN_MS = 20000;
+    const JOB_POLL_INTERVAL_MS = 1500;
+    const JOB_POLL_TIMEOUT_MS = 300000;
+    let preferAsync = false;
+    
     // Initialize auth state on page load
     updateAuthUI(!!idToken);
 
@@ -183,15 +197,45 @@ document.addEventListener('DOMContentLoaded', function() {
         
         scrollToBottom();
         
-        // Call the API Gateway endpoint to invoke the Bedrock Agent
-        callBedrockAgentAPI(message)
+        // Stream the response over the WebSocket API, rendering chunks as they arrive
+        let streamedText = '';
+        let streamedMessage = null;
+        
+        const renderText = text => {
+            if (!streamedMessage) {
+                removeLoadingIndicator();
+                streamedMessage = addMessage('', 'bot');
+            }
+            streamedText = text;
+            updateMessage(streamedMessage, streamedText);
+        };
+        
+        streamBedrockAgentAPI(message, chunk => renderText(streamedText + chunk))
+            .catch(error => {
+                // Only fall back to the buffered API if nothing has been streamed yet
+                if (streamedMessage) {
+                    throw error;
+                }
+                console.warn('Streaming unavailable, falling back to buffered API:', error);
+                // Partial completions of long turns are rendered while polling the job
+                return callBedrockAgentAPI(message, renderText);
+            })
             .then(response => {
                 // Safely remove loading indicator
                 removeLoadingIndicator();
                 
+                if (streamedMessage) {
+                    if (response && response.completion) {
+                        renderText(response.completion);
+                    }
+                    recordTurn(message, streamedText, response && (response.cached || response.routed));
+                    return;
+                }
+                
                 // Add bot response
                 if (response && response.completion) {
                     addMessage(response.completion, 'bot');
+                    recordTurn(message, response.completion, response.cached || response.routed);
                 } else {
                     throw new Error("Invalid response from agent");
                 }
@@ -210,6 +254,17 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
     
+    // Track completed turns. Answers from the answer cache or the intent router never
+    // reached the agent, so they are kept and sent as history with the next request.
+    function recordTurn(prompt, completion, replay) {
+        if (replay) {
+            replayTurns.push({ prompt: prompt, completion: completion });
+        } else {
+            replayTurns = [];
+        }
+        turnIndex++;
+    }
+    
     // Safely remove loading indicator
     function removeLoadingIndicator() {
         // Find and remove all loading indicators to be safe
@@ -245,6 +300,14 @@ document.addEventListener('DOMContentLoaded', function() {
         
         chatMessages.appendChild(messageDiv);
         scrollToBottom();
+        
+        return messageText;
+    }
+    
+    // Replace the text of an existing message, e.g. while a response is streaming in
+    function updateMessage(messageText, text) {
+        messageText.replaceChildren(formatMessage(text));
+        scrollToBottom();
     }
     
     function formatMessage(text) {
@@ -283,31 +346,68 @@ document.addEventListener('DOMContentLoaded', function() {
     
     /**
      * Calls the API Gateway endpoint that invokes the Bedrock Agent
+     * 
+     * Turns that outlast the API Gateway timeout are collected from the agent jobs API,
+     * using the request ID sent with the turn as the job ID.
      * @param {string} message - The user's message
+     * @param {function(string)} onProgress - Called with the partial completion of a long turn
      * @returns {Promise<{sessionId: string, completion: string}>}
      */
-    async function callBedrockAgentAPI(message) {
+    async function callBedrockAgentAPI(message, onProgress) {
         // Replace with your actual API Gateway URL
         const apiEndpoint = window.API_ENDPOINT + '/agent';
+        const requestId = crypto.randomUUID();
+        const startTime = Date.now();
+        
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), SYNC_TIMEOUT_MS);
         
         try {
-            const response = await fetch(apiEndpoint, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    // Add Authorization header with the ID token
-                    'Authorization': idToken
-                },
-                body: JSON.stringify({ 
-                    prompt: message,
-                    sessionId: sessionId
-                })
-            });
+            let response;
+            try {
+                response = await fetch(apiEndpoint, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        // Add Authorization header with the ID token
+                        'Authorization': idToken
+                    },
+                    body: JSON.stringify({ 
+                        prompt: message,
+                        sessionId: sessionId,
+                        turnIndex: turnIndex,
+                        history: replayTurns,
+                        requestId: requestId,
+                        mode: preferAsync ? 'async' : 'sync'
+                    }),
+                    signal: controller.signal
+                });
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    throw error;
+                }
+                // The turn is still running, collect it from the job
+                preferAsync = true;
+                return await pollAgentJob(requestId, onProgress);
+            } finally {
+                clearTimeout(timer);
+            }
+            
+            // Async mode, or the turn outlasted the API Gateway timeout
+            if (response.status === 202 || response.status === 504) {
+                preferAsync = true;
+                const jobId = response.status === 202 ? (await response.json()).jobId : requestId;
+                return await pollAgentJob(jobId, onProgress);
+            }
             
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
+            if (Date.now() - startTime > LONG_TURN_MS) {
+                preferAsync = true;
+            }
+            
             const data = await response.json();
             
             // Return data in the expected format
@@ -319,6 +419,116 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    /**
+     * Polls an agent job until it completes
+     * @param {string} jobId - The job ID (the request ID of the turn)
+     * @param {function(string)} onProgress - Called with the partial completion
+     * @returns {Promise<{sessionId: string, completion: string}>}
+     */
+    async function pollAgentJob(jobId, onProgress) {
+        const jobEndpoint = `${window.API_ENDPOINT}/agent/jobs/${encodeURIComponent(jobId)}`;
+        const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+        let notFound = 0;
+        
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+            
+            const response = await fetch(jobEndpoint, {
+                headers: { 'Authorization': idToken }
+            });
+            
+            // The job may not have been recorded yet
+            if (response.status === 404 && ++notFound < 5) {
+                continue;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const job = await response.json();
+            
+            if (job.status === 'complete') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Agent job failed');
+            }
+            if (job.completion && onProgress) {
+                onProgress(job.completion);
+            }
+        }
+        
+        throw new Error('Timed out waiting for the agent');
+    }
+    
+    // WebSocket connection used to stream agent responses
+    let streamSocket = null;
+    
+    /**
+     * Opens (or reuses) the WebSocket connection to the agent streaming API
+     * @returns {Promise<WebSocket>}
+     */
+    function openStreamSocket() {
+        if (!window.AGENT_STREAM_ENDPOINT) {
+            return Promise.reject(new Error('Streaming endpoint is not configured'));
+        }
+        
+        if (streamSocket && streamSocket.readyState === WebSocket.OPEN) {
+            return Promise.resolve(streamSocket);
+        }
+        
+        return new Promise((resolve, reject) => {
+            const socket = new WebSocket(`${window.AGENT_STREAM_ENDPOINT}?token=${encodeURIComponent(idToken)}`);
+            
+            socket.onopen = () => {
+                streamSocket = socket;
+                resolve(socket);
+            };
+            socket.onerror = () => reject(new Error('Failed to connect to streaming endpoint'));
+            socket.onclose = () => {
+                if (streamSocket === socket) {
+                    streamSocket = null;
+                }
+            };
+        });
+    }
+    
+    /**
+     * Invokes the Bedrock Agent over the WebSocket API, streaming the completion
+     * @param {string} message - The user's message
+     * @param {function(string)} onChunk - Called with each completion chunk as it arrives
+     * @returns {Promise<{sessionId: string}>}
+     */
+    async function streamBedrockAgentAPI(message, onChunk) {
+        const socket = await openStreamSocket();
+        
+        return new Promise((resolve, reject) => {
+            socket.onmessage = event => {
+                const data = JSON.parse(event.data);
+                
+                if (data.type === 'chunk') {
+                    onChunk(data.text);
+                } else if (data.type === 'done') {
+                    resolve(data);
+                } else if (data.type === 'error') {
+                    reject(new Error(data.error));
+                }
+            };
+            socket.onclose = () => {
+                streamSocket = null;
+                reject(new Error('Streaming connection closed'));
+            };
+            
+            socket.send(JSON.stringify({
+                action: 'sendMessage',
+                prompt: message,
+                sessionId: sessionId,
+                turnIndex: turnIndex,
+                history: replayTurns
+            }));
+        });
+    }
+    
     // Add car-related functionality
     const viewButtons = document.querySelectorAll('.secondary-button');
     viewButtons.forEach(button => {